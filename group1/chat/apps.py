@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ChatConfig(AppConfig):
     name = 'chat'
+
+    def ready(self):
+        # Registers the signal handlers that keep the room cache and the
+        # history current.
+        from chat import history  # noqa
+        from chat import registry  # noqa
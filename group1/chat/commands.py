@@ -0,0 +1,188 @@
+"""Chat slash commands that change the issue tracker.
+
+chat_send only parses a command against the table below and checks its
+parameters, which needs neither the database nor the user; the command is
+then queued on the chat.command channel and the sender gets an
+acknowledgement straight away.  chat_command, run by `manage.py runworker`,
+makes the change and sends the result to the room.
+
+Every run records how long the command waited on the channel and how long
+it took, per command, in the CHAT_COMMAND_STATS_CACHE cache, which the
+worker processes share, under a lock they share too; see
+get_command_stats() and `manage.py chat_command_stats`.
+"""
+import logging
+import re
+import time
+
+from channels import Channel
+from group1.shared_cache import get_shared_cache
+from group1.shared_cache import shared_lock
+from issue_tracker import models as it_models
+
+from .exceptions import ClientError
+
+COMMAND_CHANNEL = 'chat.command'
+
+STATS_KEY = 'chat:command:%s:%s'
+# The counters kept for every command, the times in milliseconds.
+STATS_FIELDS = ('count', 'errors', 'queued_ms', 'run_ms', 'max_run_ms')
+
+COMMAND_RE = re.compile(r"^/[a-zA-Z0-9-]+")
+
+logger = logging.getLogger(__name__)
+
+
+class Command(object):
+    """A slash command: the pattern of its parameters and what it does.
+
+    Args:
+      pattern: The regular expression the whole message has to match; its
+        named groups are the parameters.
+      usage: What the parameters should look like, for the error message.
+      run: A function of the parameters and the user, returning the text
+        to send to the room.
+      choices: Optionally, the allowed values of parameters, by name.
+    """
+
+    def __init__(self, pattern, usage, run, choices=None):
+        self.pattern = re.compile(pattern)
+        self.usage = usage
+        self.run = run
+        self.choices = choices or {}
+
+
+def _invalid(name, requires):
+    return ClientError("Invalid parameters used with the {0} command. Requires {1}.".format(name, requires))
+
+
+def _get_issue(issue_id):
+    try:
+        return it_models.Issue.objects.get(id=issue_id)
+    except it_models.Issue.DoesNotExist:
+        raise ClientError("ISSUE_INVALID")
+
+
+def new_issue(params, user):
+    issue = it_models.Issue(title=params['title'], reporter=user)
+    issue.save()
+    return "{0} submitted a new issue to the tracker: Issue #{1}, Title: {2}".format(
+        user.username, issue.pk, issue.title)
+
+
+def issue_comment(params, user):
+    issue = _get_issue(params['issue_id'])
+    comment = it_models.IssueComment(comment=params['comment'], issue_id=issue, poster=user)
+    comment.save()
+    return "{0} added a comment to issue #{1}: {2}".format(user.username, issue.pk, comment.comment)
+
+
+def _issue_setter(field, label):
+    def run(params, user):
+        issue = _get_issue(params['issue_id'])
+        setattr(issue, field, params['value'])
+        issue.save(update_fields=[field])
+        return "{0} updated {1} of issue #{2} to: {3}".format(user.username, label, issue.pk, params['value'])
+    return run
+
+
+COMMANDS = {
+    '/new-issue': Command(
+        r".*(title|name)=\'(?P<title>[^\']+)\'",
+        """title='foo'"" or ""name='bar'""", new_issue),
+    '/issue-comment': Command(
+        r".*issue=(?P<issue_id>[0-9]+).*comment=\'(?P<comment>[^\']+)\'",
+        """issue=id"" and ""comment='comment text'""", issue_comment),
+    '/set-issue-status': Command(
+        r".*issue=(?P<issue_id>[0-9]+).*status=\'(?P<value>[^\']+)\'",
+        """issue=id"" and ""status='valid status'""", _issue_setter('status', 'status'),
+        {'value': ('status', it_models.STATUSES)}),
+    '/set-issue-priority': Command(
+        r".*issue=(?P<issue_id>[0-9]+).*priority=\'(?P<value>[^\']+)\'",
+        """issue=id"" and ""priority='valid priority'""", _issue_setter('priority', 'priority'),
+        {'value': ('priority', it_models.PRIORITIES)}),
+    '/set-issue-type': Command(
+        r".*issue=(?P<issue_id>[0-9]+).*type=\'(?P<value>[^\']+)\'",
+        """issue=id"" and ""type='valid type'""", _issue_setter('issue_type', 'type'),
+        {'value': ('type', it_models.TYPES)}),
+}
+
+
+def parse_command(message_text):
+    """Return the name and parameters of the command in the message.
+
+    Returns:
+      None when the message is not a command.
+
+    Raises:
+      ClientError: The command is unknown or its parameters are invalid.
+    """
+    command_match = COMMAND_RE.match(message_text)
+    if not command_match:
+        return None
+    name = command_match.group()
+    command = COMMANDS.get(name)
+    if command is None:
+        raise ClientError("Invalid command: {0}".format(name))
+    match = command.pattern.match(message_text)
+    if not match:
+        raise _invalid(name, command.usage)
+    params = match.groupdict()
+    for param, (label, choices) in command.choices.items():
+        allowed = [choice[0] for choice in choices]
+        if params[param] not in allowed:
+            raise _invalid(name, "{0} to be one of: {1}".format(label, ", ".join(allowed)))
+    return name, params
+
+
+def queue_command(name, params, room, member, reply_channel):
+    """Send the command to the chat.command channel."""
+    Channel(COMMAND_CHANNEL).send({
+        'command': name,
+        'params': params,
+        'room': room.id,
+        'user_id': member.user_id,
+        'reply_channel': reply_channel.name,
+        'queued_at': time.time(),
+    })
+
+
+def _stats_cache():
+    return get_shared_cache('CHAT_COMMAND_STATS_CACHE')
+
+
+def record_latency(name, queued_ms, run_ms, failed=False):
+    """Add one run of the command to its counters."""
+    cache = _stats_cache()
+    keys = dict((field, STATS_KEY % (name, field)) for field in STATS_FIELDS)
+    # The cache's own incr may read and then write, losing the other workers' runs.
+    with shared_lock(cache, STATS_KEY % (name, 'lock')):
+        values = cache.get_many(keys.values())
+        counters = dict((field, values.get(key, 0)) for field, key in keys.items())
+        counters['count'] += 1
+        counters['errors'] += 1 if failed else 0
+        counters['queued_ms'] += int(round(queued_ms))
+        counters['run_ms'] += int(round(run_ms))
+        counters['max_run_ms'] = max(counters['max_run_ms'], int(round(run_ms)))
+        cache.set_many(dict((keys[field], value) for field, value in counters.items()), None)
+    logger.debug('%s waited %.1f ms and ran %.1f ms', name, queued_ms, run_ms)
+
+
+def get_command_stats():
+    """Return {command: counters} with the average wait and run time of every command that ran."""
+    cache = _stats_cache()
+    keys = [STATS_KEY % (name, field) for name in COMMANDS for field in STATS_FIELDS]
+    values = cache.get_many(keys)
+    stats = {}
+    for name in sorted(COMMANDS):
+        counters = dict((field, values.get(STATS_KEY % (name, field), 0)) for field in STATS_FIELDS)
+        if not counters['count']:
+            continue
+        counters['avg_queued_ms'] = round(float(counters['queued_ms']) / counters['count'], 1)
+        counters['avg_run_ms'] = round(float(counters['run_ms']) / counters['count'], 1)
+        stats[name] = counters
+    return stats
+
+
+def reset_command_stats():
+    _stats_cache().delete_many([STATS_KEY % (name, field) for name in COMMANDS for field in STATS_FIELDS])
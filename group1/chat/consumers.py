@@ -1,15 +1,18 @@
 import json
-import re
-
-from issue_tracker.serializers import IssueSerializer
-from issue_tracker import models as it_models
+import time
 
 from channels import Channel
 from channels.auth import channel_session_user_from_http, channel_session_user
-
-from .settings import MSG_TYPE_LEAVE, MSG_TYPE_ENTER, NOTIFY_USERS_ON_ENTER_OR_LEAVE_ROOMS, MSG_TYPE_MUTED
-from .models import Room
-from .utils import get_room_or_error, catch_client_error
+from channels.sessions import channel_session
+from django.contrib.auth.models import User
+
+from .settings import MSG_TYPE_MUTED
+from . import presence
+from .history import replay
+from .commands import COMMANDS, parse_command, queue_command, record_latency
+from .models import room_group
+from .registry import registry
+from .utils import get_room_or_error, get_member, catch_client_error
 from .exceptions import ClientError
 
 
@@ -39,17 +42,17 @@ def ws_receive(message):
     Channel("chat.receive").send(payload)
 
 
-@channel_session_user
+@channel_session
 def ws_disconnect(message):
-    # Unsubscribe from any connected rooms
-    for room_id in message.channel_session.get("rooms", set()):
-        try:
-            room = Room.objects.get(pk=room_id)
-            # Removes us from the room's send group. If this doesn't get run,
-            # we'll get removed once our first reply message expires.
-            room.websocket_group.discard(message.reply_channel)
-        except Room.DoesNotExist:
-            pass
+    # Unsubscribe from any connected rooms. The registry knows them; the
+    # channel session too, should the registry have lost the connection.
+    member = registry.remove(message.reply_channel.name)
+    rooms = member.rooms if member is not None else message.channel_session.get("rooms", [])
+    for room_id in rooms:
+        # Removes us from the room's send group. If this doesn't get run,
+        # we'll get removed once our first reply message expires.
+        room_group(room_id).discard(message.reply_channel)
+        presence.leave(room_id, message.reply_channel.name)
 
 
 ### Chat channel handling ###
@@ -67,14 +70,15 @@ def chat_join(message):
     # object that works just like request.user would. Security!
     room = get_room_or_error(message["room"], message.user)
 
-    # Send a "enter message" to the room if available
-    if NOTIFY_USERS_ON_ENTER_OR_LEAVE_ROOMS:
-        room.send_message(None, message.user, MSG_TYPE_ENTER)
-
     # OK, add them in. The websocket_group is what we'll send messages
     # to so that everyone in the chat room gets them.
     room.websocket_group.add(message.reply_channel)
-    message.channel_session['rooms'] = list(set(message.channel_session['rooms']).union([room.id]))
+    registry.join(message.reply_channel.name, message.user, room.id)
+    # The room hears about it with the next presence diff (see chat.presence)
+    presence.enter(room.id, message.reply_channel.name, message.user.username)
+    # The session keeps the rooms too, to restore the registry from.
+    if room.id not in message.channel_session['rooms']:
+        message.channel_session['rooms'] = message.channel_session['rooms'] + [room.id]
     # Send a message back that will prompt them to open the room
     # Done server-side so that we could, for example, make people
     # join rooms automatically.
@@ -84,6 +88,23 @@ def chat_join(message):
             "title": room.title,
         }),
     })
+    # And the last messages of the room, from memory (see chat.history).
+    # The history endpoint goes on from the oldest one: by its id once it
+    # was written, else by when it was sent.
+    messages = replay(room.id)
+    oldest = messages[0] if messages else {}
+    message.reply_channel.send({
+        "text": json.dumps({
+            "history": str(room.id),
+            "messages": messages,
+            "before": oldest.get("id"),
+            "until": oldest.get("created") if oldest.get("id") is None else None,
+        }),
+    })
+    # And who is in it
+    message.reply_channel.send({
+        "text": json.dumps(presence.snapshot(room.id)),
+    })
 
 
 @channel_session_user
@@ -92,12 +113,11 @@ def chat_leave(message):
     # Reverse of join - remove them from everything.
     room = get_room_or_error(message["room"], message.user)
 
-    # Send a "leave message" to the room if available
-    if NOTIFY_USERS_ON_ENTER_OR_LEAVE_ROOMS:
-        room.send_message(None, message.user, MSG_TYPE_LEAVE)
-
     room.websocket_group.discard(message.reply_channel)
-    message.channel_session['rooms'] = list(set(message.channel_session['rooms']).difference([room.id]))
+    presence.leave(room.id, message.reply_channel.name)
+    registry.leave(message.reply_channel.name, message.user, room.id)
+    if room.id in message.channel_session['rooms']:
+        message.channel_session['rooms'] = [r for r in message.channel_session['rooms'] if r != room.id]
     # Send a message back that will prompt them to close the room
     message.reply_channel.send({
         "text": json.dumps({
@@ -106,129 +126,61 @@ def chat_leave(message):
     })
 
 
-@channel_session_user
+# Clients send a heartbeat every CHAT_PRESENCE_HEARTBEAT seconds to stay
+# present in their rooms. Like chat_send it only reads the registry.
+@catch_client_error
+def chat_heartbeat(message):
+    member = get_member(message)
+    for room_id in member.rooms:
+        presence.enter(room_id, message.reply_channel.name, member.username)
+
+
+# Sending only reads the registry and the room cache, so relaying a message
+# does not touch the database; nor does it load the channel session or the
+# user. Slash commands are only checked here and run by chat_command.
 @catch_client_error
 def chat_send(message):
+    member = get_member(message)
     # Check that the user in the room
-    if int(message['room']) not in message.channel_session['rooms']:
+    if int(message['room']) not in member.rooms:
         raise ClientError("ROOM_ACCESS_DENIED")
     # Find the room they're sending to, check perms
-    room = get_room_or_error(message["room"], message.user)
+    room = get_room_or_error(message["room"], member)
     # Intercept the message, check for special key prefixes
-    muted_text = parse_for_special_actions(message)
-    if muted_text:
-        # Send the muted message
-        room.send_message(muted_text, message.user, MSG_TYPE_MUTED)
+    command = parse_command(message["message"])
+    if command:
+        name, params = command
+        queue_command(name, params, room, member, message.reply_channel)
+        # Only the sender hears about it until the command has run.
+        message.reply_channel.send({
+            "text": json.dumps({
+                "room": str(room.id),
+                "command": name,
+                "message": "Running {0}...".format(name),
+                "msg_type": MSG_TYPE_MUTED,
+            }),
+        })
     else:
         # Send the message along
-        room.send_message(message["message"], message.user)
-
-def parse_for_special_actions(message):
-    def raise_error(alternatives):
-        raise ClientError("Invalid parameters used with the {0} command. Requires {1}.".format(command, alternatives))
-
-    def new_issue():
-        pattern = re.compile(r".*(title|name)=\'(?P<title>[^\']+)\'")
-        match = pattern.match(message_text)
-        if match:
-            title = match.group('title')
-            issue = it_models.Issue(title=title,reporter=message.user)
-            issue.save()
-            m = "{0} submitted a new issue to the tracker: Issue #{1}, Title: {2}".format(message.user.username, issue.pk, issue.title)
-            print m
-            return m
-        else:
-            raise_error("""title='foo'"" or ""name='bar'""")
-
-    def issue_comment():
-        pattern = re.compile(r".*issue=(?P<issue_id>[0-9]+).*comment=\'(?P<comment>[^\']+)\'")
-        match = pattern.match(message_text)
-        if match and len(match.groups()) == 2:
-            issue_id = match.group('issue_id')
-            comment = match.group('comment')
-            issue = it_models.Issue.objects.get(id=issue_id)
-            issue_comment = it_models.IssueComment(comment=comment, issue_id=issue, poster=message.user)
-            issue_comment.save()
-            m = "{0} added a comment to issue #{1}: {2}".format(message.user.username, issue.pk, issue_comment.comment)
-            print m
-            return m
-        else:
-            raise_error("""issue=id"" and ""comment='comment text'""")
-
-    def issue_status():
-        pattern = re.compile(r".*issue=(?P<id>[0-9]+).*status=\'(?P<status>[^\']+)\'")
-        match = pattern.match(message_text)
-        if match and len(match.groups()) == 2:
-            id = match.group('id')
-            status = match.group('status')
-            ok_statuses = [s[0] for s in it_models.STATUSES]
-            if not status in ok_statuses:
-                raise_error("status to be one of: {0}".format(", ".join(ok_statuses)))
-            issue = it_models.Issue.objects.get(id=id)
-            issue.status = status
-            issue.save(update_fields=['status'])
-            m = "{0} updated status of issue #{1} to: {2}".format(message.user.username, issue.pk, issue.status)
-            print m
-            return m
-        else:
-            raise_error("""issue=id"" and ""status='valid status'""")
-
-    def issue_priority():
-        pattern = re.compile(r".*issue=(?P<id>[0-9]+).*priority=\'(?P<priority>[^\']+)\'")
-        match = pattern.match(message_text)
-        m = None
-        if match and len(match.groups()) == 2:
-            id = match.group('id')
-            priority = match.group('priority')
-            ok_priorities = [p[0] for p in it_models.PRIORITIES]
-            if not priority in ok_priorities:
-                raise_error("priority to be one of: {0}".format(", ".join(ok_priorities)))
-            issue = it_models.Issue.objects.get(id=id)
-            issue.priority = priority
-            issue.save(update_fields=['priority'])
-            m = "{0} updated priority of issue #{1} to: {2}".format(message.user.username, issue.pk, issue.priority)
-            print m
-        else:
-            raise_error("""issue=id"" and ""priority='valid priority'""")
-        return m
-
-    def issue_type():
-        pattern = re.compile(r".*issue=(?P<id>[0-9]+).*type=\'(?P<type>[^\']+)\'")
-        match = pattern.match(message_text)
-        m = None
-        if match and len(match.groups()) == 2:
-            id = match.group('id')
-            issue_type = match.group('type')
-            ok_types = [t[0] for t in it_models.TYPES]
-            if not issue_type in ok_types:
-                raise_error("type to be one of: {0}".format(", ".join(ok_types)))
-            issue = it_models.Issue.objects.get(id=id)
-            issue.issue_type = issue_type
-            issue.save(update_fields=['issue_type'])
-            m = "{0} updated type of issue #{1} to: {2}".format(message.user.username, issue.pk, issue.issue_type)
-            print m
-        else:
-            raise_error("""issue=id"" and ""type='valid type'""")
-        return m
-
-    message_text = message["message"]
-    command_pattern = re.compile(r"^/[a-zA-Z0-9-]+")
-    command_match = command_pattern.match(message_text)
-    if command_match:
-        command = command_match.group()
-        print "Command found in chat input: {0}".format(command)
-        if command == "/new-issue":
-            return new_issue()
-        elif command == "/issue-comment":
-            return issue_comment()
-        elif command == "/set-issue-status":
-            return issue_status()
-        elif command == "/set-issue-priority":
-            return issue_priority()
-        elif command == "/set-issue-type":
-            return issue_type()
-        else:
-            raise ClientError("Invalid command: {0}".format(command))
-    else:
-        return None
+        room.send_message(message["message"], member)
+
 
+# Runs the slash commands chat_send queued, off the chat message path, and
+# sends what they did to the room.
+@catch_client_error
+def chat_command(message):
+    started = time.time()
+    failed = True
+    try:
+        try:
+            user = User.objects.get(pk=message["user_id"])
+        except User.DoesNotExist:
+            raise ClientError("USER_HAS_TO_LOGIN")
+        room = get_room_or_error(message["room"], user)
+        text = COMMANDS[message["command"]].run(message["params"], user)
+        room.send_message(text, user, MSG_TYPE_MUTED)
+        failed = False
+    finally:
+        finished = time.time()
+        record_latency(message["command"], (started - message["queued_at"]) * 1000,
+                       (finished - started) * 1000, failed)
@@ -0,0 +1,180 @@
+"""The message history of the rooms.
+
+Room.send_message hands every message to record_message, which
+
+  * appends it to the write-behind buffer, written to the database with one
+    INSERT once CHAT_HISTORY_BATCH_SIZE messages are waiting or the oldest
+    waited CHAT_HISTORY_FLUSH_INTERVAL seconds, whichever comes first;
+  * appends it to the ring buffer of the room, holding its last
+    CHAT_HISTORY_REPLAY messages, which chat_join replays to whoever joins.
+
+Both are kept per process.  A ring is loaded from the database when the
+process replays the room, and loaded again once it is CHAT_HISTORY_RING_TTL
+seconds old; in between it only sees the messages this process sent, so
+the messages other workers sent are replayed at most CHAT_HISTORY_RING_TTL
+plus CHAT_HISTORY_FLUSH_INTERVAL seconds late.  Replayed messages that were
+loaded from the database carry their id.  Older messages are paged through
+with get_history, newest first, by message id.  Messages reach the
+database, and so get_history, at most CHAT_HISTORY_FLUSH_INTERVAL seconds
+after being sent.
+"""
+import atexit
+import collections
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils.dateparse import parse_datetime
+
+from .models import Message
+from .models import Room
+from .settings import MSG_TYPE_ENTER, MSG_TYPE_LEAVE
+
+# Joining and leaving is not worth keeping.
+SKIPPED_TYPES = (MSG_TYPE_ENTER, MSG_TYPE_LEAVE)
+
+
+def _replay_size():
+    return getattr(settings, 'CHAT_HISTORY_REPLAY', 50)
+
+
+class WriteBehindBuffer(object):
+    """Messages waiting to be written, with the timer that writes them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    def add(self, message):
+        with self._lock:
+            self._pending.append(message)
+            full = len(self._pending) >= getattr(settings, 'CHAT_HISTORY_BATCH_SIZE', 100)
+            if not full and self._timer is None:
+                self._timer = threading.Timer(getattr(settings, 'CHAT_HISTORY_FLUSH_INTERVAL', 1.0),
+                                              self._flush_in_thread)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def discard(self, room_id):
+        with self._lock:
+            self._pending = [message for message in self._pending if message.room_id != room_id]
+
+    def pending(self, room_id):
+        with self._lock:
+            return [message for message in self._pending if message.room_id == room_id]
+
+    def flush(self):
+        """Write the waiting messages and return how many there were."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if pending:
+            Message.objects.bulk_create(pending)
+        return len(pending)
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread has a connection of its own; don't leave it open.
+            connection.close()
+
+
+class RingBuffers(object):
+    """The last CHAT_HISTORY_REPLAY messages of every room, as broadcast."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Room id: (when the ring was loaded, ring).
+        self._rooms = {}
+
+    def append(self, room_id, entry):
+        with self._lock:
+            loaded = self._rooms.get(room_id)
+            if loaded is not None:
+                loaded[1].append(entry)
+
+    def get(self, room_id):
+        """Return the room's last messages, oldest first, loading them when the ring is missing or old."""
+        with self._lock:
+            loaded = self._rooms.get(room_id)
+            if loaded is not None and loaded[0] > time.time() - getattr(settings, 'CHAT_HISTORY_RING_TTL', 5):
+                return list(loaded[1])
+        size = _replay_size()
+        started = time.time()
+        stored = list(Message.objects.filter(room_id=room_id).order_by('-id')[:size])
+        entries = [message.to_dict() for message in reversed(stored)]
+        entries.extend(message.to_dict() for message in buffer.pending(room_id))
+        with self._lock:
+            loaded = self._rooms.get(room_id)
+            # Another thread may have loaded it meanwhile.
+            if loaded is None or loaded[0] < started:
+                loaded = self._rooms[room_id] = (started, collections.deque(entries, maxlen=size))
+            return list(loaded[1])
+
+    def discard(self, room_id):
+        with self._lock:
+            self._rooms.pop(room_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._rooms.clear()
+
+
+buffer = WriteBehindBuffer()
+rings = RingBuffers()
+
+# Write what is left when the worker stops.
+atexit.register(buffer.flush)
+
+
+def record_message(room_id, user_id, entry):
+    """Keep a message Room.send_message broadcast."""
+    if entry['msg_type'] in SKIPPED_TYPES:
+        return
+    rings.append(room_id, entry)
+    buffer.add(Message(room_id=room_id, user_id=user_id, username=entry['username'],
+                       message=entry['message'], msg_type=entry['msg_type'],
+                       created=parse_datetime(entry['created'])))
+
+
+def replay(room_id):
+    """Return the last messages of the room, oldest first."""
+    return rings.get(room_id)
+
+
+def get_history(room_id, before=None, until=None, limit=None):
+    """Return a page of the room's stored messages, newest first.
+
+    Args:
+      room_id: The id of the room.
+      before: Only messages with a smaller id; the cursor of the previous page.
+      until: Only messages sent before this datetime, e.g. the oldest one replayed.
+      limit: The page size, CHAT_HISTORY_PAGE_SIZE by default.
+
+    Returns:
+      The messages and the cursor of the next page, None on the last page.
+    """
+    limit = limit or getattr(settings, 'CHAT_HISTORY_PAGE_SIZE', 50)
+    messages = Message.objects.filter(room_id=room_id)
+    if before is not None:
+        messages = messages.filter(id__lt=before)
+    if until is not None:
+        messages = messages.filter(created__lt=until)
+    page = list(messages.order_by('-id')[:limit + 1])
+    next_before = page[limit - 1].id if len(page) > limit else None
+    return page[:limit], next_before
+
+
+@receiver(post_delete, sender=Room)
+def _room_deleted(sender, instance, **kwargs):
+    buffer.discard(instance.pk)
+    rings.discard(instance.pk)
@@ -0,0 +1,184 @@
+"""Time the chat consumers relaying messages between simulated clients.
+
+THIS SCRIPT IS FOR DEVELOPMENT PURPOSES ONLY.
+
+Connects the requested number of WebSocket clients through ws_connect, has
+each join one of the rooms, then has them send messages in bursts through
+ws_receive and chat_send.  The consumers run in this process, on a fresh
+in-memory channel layer unless --configured-layer is given.  Reports the
+messages relayed and delivered per second, the fan-out latency from a
+client sending a message to each member of the room receiving it, and the
+memory of the process.  Everything runs in a transaction that is rolled
+back at the end.
+
+To run:
+        python manage.py bench_chat --clients 200 --rooms 10 --messages 20
+"""
+from __future__ import unicode_literals
+
+import collections
+import optparse
+import resource
+import time
+
+from asgiref.inmemory import ChannelLayer as InMemoryChannelLayer
+from channels import DEFAULT_CHANNEL_LAYER
+from channels import channel_layers
+from channels.asgi import ChannelLayerWrapper
+from channels.message import Message
+from channels.tests import HttpClient
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from chat import history
+from chat import presence
+from chat.models import Room
+from chat.registry import registry
+from chat.registry import room_cache
+
+# The channels the consumers listen on; the clients' reply channels are
+# read by the clients themselves.
+WORKER_CHANNELS = ['websocket.connect', 'websocket.receive', 'websocket.disconnect', 'chat.receive',
+                   'chat.command']
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class Command(BaseCommand):
+    """A command for benchmarking the chat consumers."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--clients', action='store', type='int',
+            dest='clients', default=100,
+            help='The number of connected clients.'),
+        optparse.make_option(
+            '--rooms', action='store', type='int',
+            dest='rooms', default=10,
+            help='The number of rooms the clients are spread over.'),
+        optparse.make_option(
+            '--messages', action='store', type='int',
+            dest='messages', default=10,
+            help='The number of messages every client sends.'),
+        optparse.make_option(
+            '--burst', action='store', type='int',
+            dest='burst', default=10,
+            help='The number of messages sent before the consumers run and the clients read.'),
+        optparse.make_option(
+            '--configured-layer', action='store_true',
+            dest='configured_layer', default=False,
+            help='Use the CHANNEL_LAYERS default layer instead of a fresh in-memory one.'),
+        )
+
+    def _work(self, layer):
+        """Run the consumers until no message is left for them."""
+        while True:
+            channel, content = layer.receive_many(WORKER_CHANNELS, block=False)
+            if channel is None:
+                return
+            message = Message(content, channel, layer)
+            consumer, kwargs = layer.router.match(message)
+            consumer(message, **kwargs)
+
+    def _drain(self, client, sent, latencies):
+        """Read what the client received, timing the benchmark messages."""
+        while True:
+            content = client.receive()
+            if content is None:
+                return
+            if (content.get('message') or '').startswith('bench '):
+                latencies.append(time.time() - sent[int(content['message'][6:])])
+
+    def _connect(self, options, layer):
+        rooms = [Room.objects.create(title='Bench room %d' % i) for i in xrange(options['rooms'])]
+        names = ['bench_chat_%d' % i for i in xrange(options['clients'])]
+        User.objects.bulk_create(User(username=name) for name in names)
+        clients = []
+        for i, user in enumerate(User.objects.filter(username__in=names).order_by('id')):
+            client = HttpClient()
+            client.force_login(user)
+            client.send('websocket.connect', path='/chat/stream')
+            # The layer hands out the messages of different channels in any
+            # order; joining has to wait for ws_connect.
+            self._work(layer)
+            client.send('websocket.receive', text={'command': 'join', 'room': rooms[i % len(rooms)].id},
+                        path='/chat/stream')
+            self._work(layer)
+            clients.append((client, rooms[i % len(rooms)]))
+        # Drop the join replies and who entered the rooms.
+        presence.diffs.flush()
+        for client, room in clients:
+            while client.receive() is not None:
+                pass
+        return clients
+
+    def _run(self, options, layer):
+        start = time.time()
+        clients = self._connect(options, layer)
+        self.stdout.write('%d clients in %d rooms connected in %.1f s' % (
+            len(clients), options['rooms'], time.time() - start))
+        rss_before = _max_rss_mb()
+
+        sent = []
+        latencies = []
+        outgoing = [(client, room) for _ in xrange(options['messages']) for client, room in clients]
+        start = time.time()
+        for offset in xrange(0, len(outgoing), options['burst']):
+            for client, room in outgoing[offset:offset + options['burst']]:
+                client.send('websocket.receive', path='/chat/stream', text={
+                    'command': 'send', 'room': room.id, 'message': 'bench %d' % len(sent)})
+                sent.append(time.time())
+            self._work(layer)
+            for client, room in clients:
+                self._drain(client, sent, latencies)
+        elapsed = time.time() - start
+        history.buffer.flush()
+
+        latencies.sort()
+        members = collections.Counter(room.id for client, room in clients)
+        expected = sum(members[room.id] for client, room in outgoing)
+        self.stdout.write('%d messages sent, %d of %d deliveries in %.2f s' % (
+            len(sent), len(latencies), expected, elapsed))
+        self.stdout.write('%-10s %10.0f messages/s  %10.0f deliveries/s' % (
+            'relayed:', len(sent) / elapsed, len(latencies) / elapsed))
+        if latencies:
+            self.stdout.write('%-10s %8.2f ms p50  %8.2f ms p99  %8.2f ms max' % (
+                'fan-out:', _percentile(latencies, 0.5) * 1000, _percentile(latencies, 0.99) * 1000,
+                latencies[-1] * 1000))
+        self.stdout.write('%-10s %8.1f MB max RSS (%.1f MB before sending)' % ('memory:', _max_rss_mb(),
+                                                                             rss_before))
+
+    def handle(self, *args, **options):
+        if not options['configured_layer']:
+            # Room members get up to a burst of messages between reads.
+            old_layer = channel_layers.set(DEFAULT_CHANNEL_LAYER, ChannelLayerWrapper(
+                InMemoryChannelLayer(capacity=max(100, options['burst'])), DEFAULT_CHANNEL_LAYER,
+                settings.CHANNEL_LAYERS[DEFAULT_CHANNEL_LAYER]['ROUTING']))
+        cache.clear()
+        registry.cache.clear()
+        room_cache.clear()
+        history.rings.clear()
+        try:
+            # The history is written at the end, inside the transaction, and
+            # presence diffs are sent once everyone joined.
+            with override_settings(CHAT_HISTORY_FLUSH_INTERVAL=3600, CHAT_PRESENCE_INTERVAL=3600), \
+                    transaction.atomic():
+                self._run(options, channel_layers[DEFAULT_CHANNEL_LAYER])
+                transaction.set_rollback(True)
+        finally:
+            if not options['configured_layer']:
+                channel_layers.set(DEFAULT_CHANNEL_LAYER, old_layer)
+            room_cache.clear()
+            history.rings.clear()
+            presence.diffs.clear()
@@ -0,0 +1,35 @@
+"""Print how long each chat slash command waited on its channel and ran.
+
+The counters cover every run since they were last reset, across the workers
+sharing the CHAT_COMMAND_STATS_CACHE cache.
+
+To run:
+        python manage.py chat_command_stats [--reset]
+"""
+import optparse
+
+from django.core.management.base import BaseCommand
+
+from chat import commands
+
+
+class Command(BaseCommand):
+    """A command for reporting the chat command latencies."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--reset', action='store_true',
+            dest='reset', default=False,
+            help='Clear the counters after printing them.'),
+        )
+
+    def handle(self, *args, **options):
+        stats = commands.get_command_stats()
+        if not stats:
+            self.stdout.write('No chat command ran yet.')
+        for name, counters in sorted(stats.items()):
+            self.stdout.write('%-20s %6d runs  %4d errors  %8.1f ms queued  %8.1f ms run  %6d ms max' % (
+                name, counters['count'], counters['errors'], counters['avg_queued_ms'],
+                counters['avg_run_ms'], counters['max_run_ms']))
+        if options['reset']:
+            commands.reset_command_stats()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Message',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('msg_type', models.IntegerField(default=0, choices=[(0, 'MESSAGE'), (1, 'WARNING'), (2, 'ALERT'), (3, 'MUTED'), (4, 'ENTER'), (5, 'LEAVE')])),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('room', models.ForeignKey(related_name='messages', to='chat.Room')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.SET_NULL, blank=True, to=settings.AUTH_USER_MODEL, null=True)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='message',
+            index_together=set([('room', 'id')]),
+        ),
+    ]
@@ -1,9 +1,18 @@
 import json
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.utils.six import python_2_unicode_compatible
 from channels import Group
 
-from .settings import MSG_TYPE_MESSAGE
+from .settings import MSG_TYPE_MESSAGE, MESSAGE_TYPES_CHOICES
+
+
+def room_group(room_id):
+    """
+    Returns the Channels Group of the room with the given id.
+    """
+    return Group("room-%s" % room_id)
 
 
 @python_2_unicode_compatible
@@ -27,15 +36,46 @@ class Room(models.Model):
         Returns the Channels Group that sockets should subscribe to to get sent
         messages as they are generated.
         """
-        return Group("room-%s" % self.id)
+        return room_group(self.id)
 
     def send_message(self, message, user, msg_type=MSG_TYPE_MESSAGE):
         """
         Called to send a message to the room on behalf of a user.
         """
-        final_msg = {'room': str(self.id), 'message': message, 'username': user.username, 'msg_type': msg_type}
+        # Imported here as the history imports the models.
+        from .history import record_message
+
+        final_msg = {'room': str(self.id), 'message': message, 'username': user.username, 'msg_type': msg_type,
+                     'created': timezone.now().isoformat()}
 
         # Send out the message to everyone in the room
         self.websocket_group.send(
             {"text": json.dumps(final_msg)}
         )
+        # Keep it for the history, see chat.history
+        record_message(self.id, user.pk, final_msg)
+
+
+class Message(models.Model):
+    """
+    A message sent to a room, written in batches by chat.history.
+    """
+
+    room = models.ForeignKey(Room, related_name='messages')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    # The name it was sent under, which stays when the user goes
+    username = models.CharField(max_length=255)
+    message = models.TextField()
+    msg_type = models.IntegerField(choices=MESSAGE_TYPES_CHOICES, default=MSG_TYPE_MESSAGE)
+    created = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # The history of a room is paged through by id
+        index_together = (('room', 'id'),)
+
+    def to_dict(self):
+        """
+        Returns the message as Room.send_message broadcast it.
+        """
+        return {'room': str(self.room_id), 'message': self.message, 'username': self.username,
+                'msg_type': self.msg_type, 'created': self.created.isoformat(), 'id': self.id}
@@ -0,0 +1,192 @@
+"""Who is online in each room.
+
+The tracker keeps a key per connection (reply channel) in a room, holding
+the user behind it, which times out CHAT_PRESENCE_TIMEOUT seconds after it
+was last set, and an index of the room's connections.  Joining a room and
+the heartbeat clients send every CHAT_PRESENCE_HEARTBEAT seconds set the
+key; only a connection that is new to the room, or whose key timed out,
+changes the index.  So does leaving the room, and a sweep of the room, run
+by the first heartbeat every CHAT_PRESENCE_HEARTBEAT seconds, that drops
+the connections whose keys timed out.  It all lives in the
+CHAT_PRESENCE_CACHE cache, which the worker processes share, and the index
+is changed under a lock they share too, see group1.shared_cache.shared_lock.
+
+Users entering and leaving are not sent to the room one by one.  Each
+process collects them per room and sends one presence diff per room every
+CHAT_PRESENCE_INTERVAL seconds, in which a user leaving and coming back, as
+after a deploy, cancels out.  Joining clients get a snapshot of the room's
+members from the tracker instead.
+"""
+import json
+import threading
+
+from django.conf import settings
+
+from group1.shared_cache import get_shared_cache
+from group1.shared_cache import shared_lock
+
+from .models import room_group
+from .settings import NOTIFY_USERS_ON_ENTER_OR_LEAVE_ROOMS
+
+# The room's connections, {reply channel: username}.
+INDEX_KEY = 'chat:presence:%s'
+# The username behind a connection in a room, while it is present.
+CONNECTION_KEY = 'chat:presence:%s:%s'
+# The lock held while the room's index is being changed.
+LOCK_KEY = 'chat:presence:%s:lock'
+# Set while the room is not due for a sweep.
+SWEEP_KEY = 'chat:presence:%s:swept'
+
+
+class PresenceTracker(object):
+    """The connections in each room, in the CHAT_PRESENCE_CACHE cache."""
+
+    @property
+    def cache(self):
+        return get_shared_cache('CHAT_PRESENCE_CACHE')
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CHAT_PRESENCE_TIMEOUT', 90)
+
+    @property
+    def heartbeat(self):
+        return getattr(settings, 'CHAT_PRESENCE_HEARTBEAT', 30)
+
+    def _alive(self, cache, room_id, index):
+        """Return the index without the connections whose keys timed out."""
+        alive = cache.get_many([CONNECTION_KEY % (room_id, channel) for channel in index])
+        return dict((channel, username) for channel, username in index.items()
+                    if CONNECTION_KEY % (room_id, channel) in alive)
+
+    def _change(self, room_id, update):
+        cache = self.cache
+        with shared_lock(cache, LOCK_KEY % room_id):
+            before = cache.get(INDEX_KEY % room_id) or {}
+            after = self._alive(cache, room_id, before)
+            update(after)
+            # The index outlives its connections' keys by a sweep at most.
+            if after:
+                cache.set(INDEX_KEY % room_id, after, self.timeout + self.heartbeat)
+            else:
+                cache.delete(INDEX_KEY % room_id)
+        old = set(before.values())
+        new = set(after.values())
+        return new - old, old - new
+
+    def touch(self, room_id, reply_channel, username):
+        """Record the connection as in the room now.
+
+        Returns:
+          The usernames that entered the room and those that left it, which
+          includes the users whose connections timed out.
+        """
+        cache = self.cache
+        key = CONNECTION_KEY % (room_id, reply_channel)
+        if cache.add(key, username, self.timeout):
+            # New to the room, or back after timing out.
+            def update(index):
+                index[reply_channel] = username
+            return self._change(room_id, update)
+        cache.set(key, username, self.timeout)
+        if cache.add(SWEEP_KEY % room_id, True, self.heartbeat):
+            return self._change(room_id, lambda index: None)
+        return set(), set()
+
+    def remove(self, room_id, reply_channel):
+        """Record the connection as gone from the room, returning who entered and left like touch."""
+        self.cache.delete(CONNECTION_KEY % (room_id, reply_channel))
+
+        def update(index):
+            index.pop(reply_channel, None)
+        return self._change(room_id, update)
+
+    def members(self, room_id):
+        """Return the usernames in the room, sorted."""
+        cache = self.cache
+        index = self._alive(cache, room_id, cache.get(INDEX_KEY % room_id) or {})
+        return sorted(set(index.values()))
+
+
+class PresenceDiffs(object):
+    """The users that entered and left each room since the last diffs were sent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms = {}
+        self._timer = None
+
+    def add(self, room_id, entered, left):
+        if not entered and not left:
+            return
+        with self._lock:
+            diff = self._rooms.setdefault(room_id, {'entered': set(), 'left': set()})
+            for username in entered:
+                if username in diff['left']:
+                    diff['left'].discard(username)
+                else:
+                    diff['entered'].add(username)
+            for username in left:
+                if username in diff['entered']:
+                    diff['entered'].discard(username)
+                else:
+                    diff['left'].add(username)
+            if self._timer is None:
+                self._timer = threading.Timer(getattr(settings, 'CHAT_PRESENCE_INTERVAL', 2.0), self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Send the diff of every room that changed and return how many were sent."""
+        with self._lock:
+            rooms, self._rooms = self._rooms, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        sent = 0
+        for room_id, diff in rooms.items():
+            if diff['entered'] or diff['left']:
+                room_group(room_id).send({
+                    "text": json.dumps({
+                        "presence": str(room_id),
+                        "entered": sorted(diff['entered']),
+                        "left": sorted(diff['left']),
+                    }),
+                })
+                sent += 1
+        return sent
+
+    def clear(self):
+        """Drop the diffs without sending them."""
+        with self._lock:
+            self._rooms = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+tracker = PresenceTracker()
+diffs = PresenceDiffs()
+
+
+def _publish(room_id, change):
+    if NOTIFY_USERS_ON_ENTER_OR_LEAVE_ROOMS:
+        diffs.add(room_id, *change)
+
+
+def enter(room_id, reply_channel, username):
+    """Record the connection as in the room, e.g. on joining it or on a heartbeat."""
+    _publish(room_id, tracker.touch(room_id, reply_channel, username))
+
+
+def leave(room_id, reply_channel):
+    """Record the connection as gone from the room."""
+    _publish(room_id, tracker.remove(room_id, reply_channel))
+
+
+def snapshot(room_id):
+    """Return the message telling a client who is in the room."""
+    return {
+        "presence": str(room_id),
+        "members": tracker.members(room_id),
+    }
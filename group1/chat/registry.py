@@ -0,0 +1,164 @@
+"""Rooms and room memberships, kept out of the database on the message path.
+
+room_cache holds the rooms this process looked up, for CHAT_ROOM_CACHE_TTL
+seconds at most.  Saving or deleting a room drops it from the cache of the
+process that did it; other processes see the change once their entry expires.
+
+The membership registry records, per WebSocket connection (reply channel),
+the user behind it and the rooms it joined.  It is what chat_send checks
+access against.  It lives in the cache named by CHAT_REGISTRY_CACHE, which the
+worker processes share, so that a connection leaving a room on one worker is
+seen by the others; entries that expired or were evicted are restored from
+the connection's channel session.  Whether the user is staff is read again
+once it is CHAT_MEMBER_STAFF_TTL seconds old.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from group1.authentication import LRUCache
+from group1.shared_cache import get_shared_cache
+
+from .models import Room
+
+MEMBER_KEY = 'chat:member:%s'
+
+# Stands for a room that does not exist in room_cache.
+_MISSING = object()
+
+
+class RoomCache(object):
+    """Rooms by id, loaded from the database once per CHAT_ROOM_CACHE_TTL seconds."""
+
+    def __init__(self):
+        self._rooms = LRUCache(getattr(settings, 'CHAT_ROOM_CACHE_SIZE', 1024),
+                               getattr(settings, 'CHAT_ROOM_CACHE_TTL', 60))
+
+    def get(self, room_id):
+        """Return the room, or None when there is no such room."""
+        room_id = int(room_id)
+        room = self._rooms.get(room_id)
+        if room is None:
+            room = Room.objects.filter(pk=room_id).first() or _MISSING
+            self._rooms.set(room_id, room)
+        return None if room is _MISSING else room
+
+    def invalidate(self, room_id):
+        self._rooms.delete(int(room_id))
+
+    def clear(self):
+        self._rooms.clear()
+
+
+room_cache = RoomCache()
+
+
+class Member(object):
+    """The user behind a connection and the ids of the rooms it joined.
+
+    It carries what the chat needs of the user, so that relaying a message
+    does not load the user; get_user() does, for the commands that write
+    to the issue tracker.
+    """
+
+    def __init__(self, user_id, username, is_staff, rooms=(), staff_checked=0):
+        self.user_id = user_id
+        self.username = username
+        self.is_staff = is_staff
+        self.rooms = list(rooms)
+        # When is_staff was read from the user.
+        self.staff_checked = staff_checked
+
+    @classmethod
+    def from_user(cls, user, rooms=()):
+        return cls(user.pk, user.username, user.is_staff, rooms, time.time())
+
+    @property
+    def pk(self):
+        return self.user_id
+
+    def is_authenticated(self):
+        return True
+
+    def get_user(self):
+        return User.objects.get(pk=self.user_id)
+
+    def staff_is_stale(self):
+        return self.staff_checked <= time.time() - getattr(settings, 'CHAT_MEMBER_STAFF_TTL', 60)
+
+    def to_dict(self):
+        return {'user_id': self.user_id, 'username': self.username, 'is_staff': self.is_staff,
+                'rooms': self.rooms, 'staff_checked': self.staff_checked}
+
+
+class MembershipRegistry(object):
+    """Members by reply channel name, in the CHAT_REGISTRY_CACHE cache."""
+
+    @property
+    def cache(self):
+        return get_shared_cache('CHAT_REGISTRY_CACHE')
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CHAT_REGISTRY_TIMEOUT', 24 * 60 * 60)
+
+    def get(self, reply_channel):
+        """Return the Member of the connection, or None when it is not registered."""
+        entry = self.cache.get(MEMBER_KEY % reply_channel)
+        return Member(**entry) if entry is not None else None
+
+    def set(self, reply_channel, member):
+        self.cache.set(MEMBER_KEY % reply_channel, member.to_dict(), self.timeout)
+
+    def refresh(self, reply_channel, member):
+        """Read again whether the member is staff and return it, or None when the user is gone."""
+        is_staff = User.objects.filter(pk=member.user_id).values_list('is_staff', flat=True).first()
+        if is_staff is None:
+            self.remove(reply_channel)
+            return None
+        member.is_staff = is_staff
+        member.staff_checked = time.time()
+        self.set(reply_channel, member)
+        return member
+
+    def _member(self, reply_channel, user):
+        # The user was just loaded, so whether it is staff is current.
+        member = self.get(reply_channel) or Member.from_user(user)
+        member.is_staff = user.is_staff
+        member.staff_checked = time.time()
+        return member
+
+    def join(self, reply_channel, user, room_id):
+        """Add the room to the connection's rooms and return its Member."""
+        member = self._member(reply_channel, user)
+        if room_id not in member.rooms:
+            member.rooms.append(room_id)
+        self.set(reply_channel, member)
+        return member
+
+    def leave(self, reply_channel, user, room_id):
+        """Remove the room from the connection's rooms and return its Member."""
+        member = self._member(reply_channel, user)
+        if room_id in member.rooms:
+            member.rooms.remove(room_id)
+        self.set(reply_channel, member)
+        return member
+
+    def remove(self, reply_channel):
+        """Forget the connection and return its Member, or None."""
+        member = self.get(reply_channel)
+        self.cache.delete(MEMBER_KEY % reply_channel)
+        return member
+
+
+registry = MembershipRegistry()
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def _room_changed(sender, instance, **kwargs):
+    room_cache.invalidate(instance.pk)
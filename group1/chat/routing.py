@@ -1,6 +1,6 @@
 from channels import route
 from channels import include
-from .consumers import ws_connect, ws_receive, ws_disconnect, chat_join, chat_leave, chat_send
+from .consumers import ws_connect, ws_receive, ws_disconnect, chat_join, chat_leave, chat_send, chat_command, chat_heartbeat
 
 
 # There's no path matching on these routes; we just rely on the matching
@@ -26,6 +26,10 @@ custom_routing = [
     route("chat.receive", chat_join, command="^join$"),
     route("chat.receive", chat_leave, command="^leave$"),
     route("chat.receive", chat_send, command="^send$"),
+    route("chat.receive", chat_heartbeat, command="^heartbeat$"),
+
+    # Slash commands chat_send queued (see chat.commands).
+    route("chat.command", chat_command),
 ]
 
 # The channel routing defines what channels get handled by what consumers,
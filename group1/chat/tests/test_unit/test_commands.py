@@ -0,0 +1,113 @@
+from __future__ import unicode_literals
+
+import threading
+
+from channels.tests import ChannelTestCase
+from channels.tests import HttpClient
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from issue_tracker.models import Issue
+
+from chat import commands
+from chat import history
+from chat import presence
+from chat.exceptions import ClientError
+from chat.models import Room
+from chat.registry import room_cache
+
+
+class ParseCommandTestCase(ChannelTestCase):
+
+    def test_plain_message(self):
+        self.assertIsNone(commands.parse_command('hello /new-issue'))
+
+    def test_parameters(self):
+        self.assertEqual(commands.parse_command("/set-issue-status issue=4 status='Open-New'"),
+                         ('/set-issue-status', {'issue_id': '4', 'value': 'Open-New'}))
+
+    def test_invalid_choice(self):
+        with self.assertRaises(ClientError) as raised:
+            commands.parse_command("/set-issue-priority issue=4 priority='urgent-ish'")
+        self.assertIn('priority to be one of', raised.exception.code)
+
+    def test_unknown_command(self):
+        with self.assertRaises(ClientError):
+            commands.parse_command("/drop-tables")
+
+
+# Keep the history and presence timers from running outside the test.
+@override_settings(CHAT_HISTORY_FLUSH_INTERVAL=60, CHAT_PRESENCE_INTERVAL=60)
+class CommandChannelTestCase(ChannelTestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        room_cache.clear()
+        history.rings.clear()
+        User.objects.create_user(username="alice", password="pass")
+        self.room = Room.objects.create(title="general")
+        self.client = HttpClient()
+        self.client.login(username="alice", password="pass")
+        self.client.send_and_consume('websocket.connect', path='/chat/stream')
+        self.send('join')
+
+    def tearDown(self):
+        history.buffer.flush()
+        presence.diffs.clear()
+
+    def send(self, command, **content):
+        content.update(command=command, room=self.room.id)
+        self.client.send_and_consume('chat.receive', content)
+        received = self.client.receive()
+        while received is not None:
+            reply, received = received, self.client.receive()
+        return reply
+
+    def test_send_acknowledges_and_queues(self):
+        with self.assertNumQueries(0):
+            reply = self.send('send', message="/new-issue title='Broken build'")
+        self.assertEqual(reply['command'], '/new-issue')
+        self.assertFalse(Issue.objects.exists())
+        self.client.consume('chat.command')
+        self.assertEqual(Issue.objects.get().title, 'Broken build')
+        self.assertIn('submitted a new issue', self.client.receive()['message'])
+        self.assertEqual(commands.get_command_stats()['/new-issue']['count'], 1)
+
+    def test_invalid_parameters_are_not_queued(self):
+        reply = self.send('send', message="/set-issue-type issue=1 type='nope'")
+        self.assertIn('Invalid parameters', reply['error'])
+        self.assertIsNone(self.get_next_message('chat.command'))
+
+    def test_missing_issue(self):
+        self.send('send', message="/issue-comment issue=99 comment='hi'")
+        self.client.consume('chat.command')
+        self.assertEqual(self.client.receive()['error'], 'ISSUE_INVALID')
+        self.assertEqual(commands.get_command_stats()['/issue-comment']['errors'], 1)
+
+    def test_missing_user(self):
+        self.send('send', message="/new-issue title='Broken build'")
+        User.objects.filter(username="alice").delete()
+        self.client.consume('chat.command')
+        self.assertEqual(self.client.receive()['error'], 'USER_HAS_TO_LOGIN')
+        self.assertFalse(Issue.objects.exists())
+        self.assertEqual(commands.get_command_stats()['/new-issue']['errors'], 1)
+
+    def test_concurrent_runs_are_all_counted(self):
+        def run():
+            for i in range(20):
+                commands.record_latency('/new-issue', 2, 3)
+        workers = [threading.Thread(target=run) for i in range(5)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        stats = commands.get_command_stats()['/new-issue']
+        self.assertEqual((stats['count'], stats['run_ms']), (100, 300))
+
+    def test_stats_are_kept_in_the_shared_cache(self):
+        with override_settings(CHAT_COMMAND_STATS_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                commands.get_command_stats()
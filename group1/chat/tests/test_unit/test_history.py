@@ -0,0 +1,132 @@
+from __future__ import unicode_literals
+
+import json
+
+from channels.tests import ChannelTestCase
+from channels.tests import HttpClient
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache import caches
+from django.test import override_settings
+
+from chat import history
+from chat import presence
+from chat.models import Message
+from chat.models import Room
+from chat.registry import room_cache
+
+
+@override_settings(CHAT_HISTORY_FLUSH_INTERVAL=60, CHAT_PRESENCE_INTERVAL=60, CHAT_HISTORY_BATCH_SIZE=3,
+                   CHAT_HISTORY_REPLAY=2, CHAT_HISTORY_PAGE_SIZE=2)
+class HistoryTestCase(ChannelTestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        room_cache.clear()
+        history.rings.clear()
+        self.user = User.objects.create_user(username="alice", password="pass")
+        self.room = Room.objects.create(title="general")
+
+    def tearDown(self):
+        history.buffer.flush()
+        presence.diffs.clear()
+
+    def send(self, *texts):
+        for text in texts:
+            self.room.send_message(text, self.user)
+
+    def join(self, reply=None):
+        client = HttpClient()
+        client.login(username="alice", password="pass")
+        client.send_and_consume('websocket.connect', path='/chat/stream')
+        client.send_and_consume('chat.receive', {'command': 'join', 'room': self.room.id})
+        received = client.receive()
+        while received is not None:
+            if reply in received:
+                return received
+            received = client.receive()
+
+    def test_writes_in_batches(self):
+        with self.assertNumQueries(0):
+            self.send('one', 'two')
+        with self.assertNumQueries(1):
+            self.send('three')
+        self.assertEqual(list(Message.objects.order_by('id').values_list('message', flat=True)),
+                         ['one', 'two', 'three'])
+        self.send('four')
+        self.assertEqual(history.buffer.flush(), 1)
+
+    def test_join_replays_the_last_messages(self):
+        self.send('one', 'two', 'three', 'four')
+        reply = self.join('history')
+        self.assertEqual(reply['history'], str(self.room.id))
+        self.assertEqual([message['message'] for message in reply['messages']], ['three', 'four'])
+        # 'three' was written, 'four' not yet.
+        self.assertEqual(reply['before'], Message.objects.get(message='three').id)
+        self.assertIsNone(reply['messages'][1]['id'])
+        self.assertIsNone(reply['until'])
+
+    def test_replay_comes_from_memory(self):
+        self.send('one')
+        history.replay(self.room.id)
+        self.send('two', 'three')
+        with self.assertNumQueries(0):
+            self.assertEqual([message['message'] for message in history.replay(self.room.id)],
+                             ['two', 'three'])
+
+    def test_replay_picks_up_other_workers(self):
+        self.send('one')
+        history.replay(self.room.id)
+        history.buffer.flush()
+        # Written by another worker.
+        Message.objects.create(room=self.room, username='bob', message='two')
+        self.assertEqual([message['message'] for message in history.replay(self.room.id)], ['one'])
+        with override_settings(CHAT_HISTORY_RING_TTL=0):
+            self.assertEqual([message['message'] for message in history.replay(self.room.id)], ['one', 'two'])
+
+    def test_enter_and_leave_are_not_kept(self):
+        self.join()
+        history.buffer.flush()
+        self.assertFalse(Message.objects.exists())
+
+    def test_keyset_pages(self):
+        self.send('one', 'two', 'three', 'four', 'five')
+        history.buffer.flush()
+        self.client.login(username="alice", password="pass")
+        pages = []
+        before = ''
+        while before is not None:
+            response = json.loads(self.client.get('/chat/history/%d?before=%s' % (self.room.id, before)).content)
+            pages.append([message['message'] for message in response['messages']])
+            before = response['before']
+        self.assertEqual(pages, [['five', 'four'], ['three', 'two'], ['one']])
+
+    def test_pages_from_the_replay(self):
+        self.send('one', 'two', 'three', 'four')
+        before = self.join('history')['before']
+        history.buffer.flush()
+        self.client.login(username="alice", password="pass")
+        response = self.client.get('/chat/history/%d' % self.room.id, {'before': before})
+        self.assertEqual([message['message'] for message in json.loads(response.content)['messages']],
+                         ['two', 'one'])
+
+    def test_pages_from_a_replay_not_written_yet(self):
+        self.send('one', 'two')
+        until = self.join('history')['until']
+        self.assertIsNotNone(until)
+        history.buffer.flush()
+        self.client.login(username="alice", password="pass")
+        response = self.client.get('/chat/history/%d' % self.room.id, {'until': until})
+        self.assertEqual(json.loads(response.content)['messages'], [])
+
+    def test_staff_only_room(self):
+        Room.objects.filter(id=self.room.id).update(staff_only=True)
+        room_cache.clear()
+        self.client.login(username="alice", password="pass")
+        self.assertEqual(self.client.get('/chat/history/%d' % self.room.id).status_code, 403)
+
+    def test_deleting_the_room_drops_its_pending_messages(self):
+        self.send('one')
+        self.room.delete()
+        self.assertEqual(history.buffer.flush(), 0)
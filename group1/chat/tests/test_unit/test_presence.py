@@ -0,0 +1,124 @@
+from __future__ import unicode_literals
+
+import threading
+
+from channels.tests import ChannelTestCase
+from channels.tests import HttpClient
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from chat import history
+from chat import presence
+from chat.models import Room
+from chat.registry import room_cache
+
+
+@override_settings(CHAT_HISTORY_FLUSH_INTERVAL=60, CHAT_PRESENCE_INTERVAL=60)
+class PresenceTestCase(ChannelTestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        room_cache.clear()
+        history.rings.clear()
+        presence.diffs.clear()
+        self.room = Room.objects.create(title="general")
+        self.alice = self.connect("alice")
+
+    def tearDown(self):
+        history.buffer.flush()
+        presence.diffs.clear()
+
+    def connect(self, username):
+        User.objects.create_user(username=username, password="pass")
+        client = HttpClient()
+        client.login(username=username, password="pass")
+        client.send_and_consume('websocket.connect', path='/chat/stream')
+        return client
+
+    def command(self, client, command):
+        client.send_and_consume('chat.receive', {'command': command, 'room': self.room.id})
+        return self.receive_all(client)
+
+    def receive_all(self, client):
+        received = []
+        content = client.receive()
+        while content is not None:
+            received.append(content)
+            content = client.receive()
+        return received
+
+    def test_join_gets_a_snapshot(self):
+        self.command(self.alice, 'join')
+        bob = self.connect("bob")
+        self.assertEqual(self.command(bob, 'join')[-1], {'presence': str(self.room.id),
+                                                         'members': ['alice', 'bob']})
+
+    def test_entering_is_sent_in_one_diff(self):
+        self.command(self.alice, 'join')
+        for username in ("bob", "carol"):
+            self.command(self.connect(username), 'join')
+        self.assertEqual(self.receive_all(self.alice), [])
+        self.assertEqual(presence.diffs.flush(), 1)
+        self.assertEqual(self.receive_all(self.alice), [{'presence': str(self.room.id),
+                                                         'entered': ['alice', 'bob', 'carol'], 'left': []}])
+
+    def test_leaving_and_coming_back_cancels_out(self):
+        self.command(self.alice, 'join')
+        presence.diffs.flush()
+        self.command(self.alice, 'leave')
+        self.command(self.alice, 'join')
+        self.assertEqual(presence.diffs.flush(), 0)
+
+    def test_heartbeat_does_not_query(self):
+        self.command(self.alice, 'join')
+        with self.assertNumQueries(0):
+            self.alice.send_and_consume('chat.receive', {'command': 'heartbeat'})
+
+    def test_silent_connections_expire(self):
+        self.command(self.alice, 'join')
+        bob = self.connect("bob")
+        self.command(bob, 'join')
+        presence.diffs.flush()
+        presence.tracker.cache.delete(presence.CONNECTION_KEY % (self.room.id, bob.reply_channel))
+        self.assertEqual(presence.tracker.members(self.room.id), ['alice'])
+        self.alice.send_and_consume('chat.receive', {'command': 'heartbeat'})
+        presence.diffs.flush()
+        self.assertEqual(self.receive_all(self.alice)[-1]['left'], ['bob'])
+        # Until it beats again.
+        bob.send_and_consume('chat.receive', {'command': 'heartbeat'})
+        self.assertEqual(presence.tracker.members(self.room.id), ['alice', 'bob'])
+
+    def test_heartbeat_leaves_the_index_alone(self):
+        self.command(self.alice, 'join')
+        # The first heartbeat sweeps the room, the next ones only set their key.
+        self.alice.send_and_consume('chat.receive', {'command': 'heartbeat'})
+        key = presence.INDEX_KEY % self.room.id
+        index = presence.tracker.cache.get(key)
+        presence.tracker.cache.delete(key)
+        self.alice.send_and_consume('chat.receive', {'command': 'heartbeat'})
+        self.assertIsNone(presence.tracker.cache.get(key))
+        self.assertEqual(index, {self.alice.reply_channel: 'alice'})
+
+    def test_concurrent_joins_are_all_kept(self):
+        def join(i):
+            presence.tracker.touch(self.room.id, 'websocket.send!%d' % i, 'user%d' % i)
+        workers = [threading.Thread(target=join, args=(i,)) for i in range(20)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(len(presence.tracker.members(self.room.id)), 20)
+
+    def test_process_local_cache_is_refused(self):
+        with override_settings(CHAT_PRESENCE_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                presence.tracker.members(self.room.id)
+
+    def test_disconnect_leaves(self):
+        self.command(self.alice, 'join')
+        self.alice.send_and_consume('websocket.disconnect', path='/chat/stream')
+        self.assertEqual(presence.tracker.members(self.room.id), [])
@@ -0,0 +1,93 @@
+from __future__ import unicode_literals
+
+from channels.tests import ChannelTestCase
+from channels.tests import HttpClient
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from chat import history
+from chat import presence
+from chat.models import Room
+from chat.registry import registry
+from chat.registry import room_cache
+
+
+# Keep the history and presence timers from running outside the test.
+@override_settings(CHAT_HISTORY_FLUSH_INTERVAL=60, CHAT_PRESENCE_INTERVAL=60)
+class RegistryTestCase(ChannelTestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        room_cache.clear()
+        history.rings.clear()
+        User.objects.create_user(username="alice", password="pass")
+        self.room = Room.objects.create(title="general")
+        self.client = HttpClient()
+        self.client.login(username="alice", password="pass")
+        self.client.send_and_consume('websocket.connect', path='/chat/stream')
+
+    def tearDown(self):
+        history.buffer.flush()
+        presence.diffs.clear()
+
+    def command(self, command, **content):
+        content['command'] = command
+        self.client.send_and_consume('chat.receive', content)
+        # The reply comes after any notifications sent to the room.
+        received = self.client.receive()
+        while received is not None:
+            reply, received = received, self.client.receive()
+        return reply
+
+    def test_join_registers_the_connection(self):
+        # Who is in the room comes last.
+        self.assertEqual(self.command('join', room=self.room.id)['presence'], str(self.room.id))
+        member = registry.get(self.client.reply_channel)
+        self.assertEqual((member.username, member.rooms), ('alice', [self.room.id]))
+
+    def test_send_does_not_query(self):
+        self.command('join', room=self.room.id)
+        with self.assertNumQueries(0):
+            received = self.command('send', room=self.room.id, message='hello')
+        self.assertEqual((received['message'], received['username']), ('hello', 'alice'))
+
+    def test_send_outside_the_room_is_denied(self):
+        self.command('join', room=self.room.id)
+        self.command('leave', room=self.room.id)
+        self.assertEqual(self.command('send', room=self.room.id, message='hello')['error'], 'ROOM_ACCESS_DENIED')
+
+    def test_registry_is_restored_from_the_session(self):
+        self.command('join', room=self.room.id)
+        registry.cache.clear()
+        self.assertEqual(self.command('send', room=self.room.id, message='hello')['message'], 'hello')
+        self.assertEqual(registry.get(self.client.reply_channel).rooms, [self.room.id])
+
+    def test_process_local_cache_is_refused(self):
+        with override_settings(CHAT_REGISTRY_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                registry.get(self.client.reply_channel)
+
+    def test_staff_is_read_again(self):
+        User.objects.filter(username="alice").update(is_staff=True)
+        room = Room.objects.create(title="staff", staff_only=True)
+        self.client.send_and_consume('websocket.connect', path='/chat/stream')
+        self.command('join', room=room.id)
+        User.objects.filter(username="alice").update(is_staff=False)
+        self.assertEqual(self.command('send', room=room.id, message='hello')['message'], 'hello')
+        with override_settings(CHAT_MEMBER_STAFF_TTL=0):
+            self.assertEqual(self.command('send', room=room.id, message='hello')['error'], 'ROOM_ACCESS_DENIED')
+
+    def test_room_changes_invalidate_the_cache(self):
+        room_id = self.room.id
+        self.command('join', room=room_id)
+        self.room.delete()
+        self.assertEqual(self.command('send', room=room_id, message='hello')['error'], 'ROOM_INVALID')
+
+    def test_disconnect_forgets_the_connection(self):
+        self.command('join', room=self.room.id)
+        self.client.send_and_consume('websocket.disconnect', path='/chat/stream')
+        self.assertIsNone(registry.get(self.client.reply_channel))
@@ -1,7 +1,11 @@
 from functools import wraps
 
+from channels.auth import channel_session_user
+
 from .exceptions import ClientError
-from .models import Room
+from .registry import Member
+from .registry import registry
+from .registry import room_cache
 
 
 def catch_client_error(func):
@@ -22,16 +26,45 @@ def catch_client_error(func):
 def get_room_or_error(room_id, user):
     """
     Tries to fetch a room for the user, checking permissions along the way.
+    The room comes from room_cache, so this only queries on a cache miss.
     """
     # Check if the user is logged in
     if not user.is_authenticated():
         raise ClientError("USER_HAS_TO_LOGIN")
     # Find the room they requested (by ID)
     try:
-        room = Room.objects.get(pk=room_id)
-    except Room.DoesNotExist:
+        room = room_cache.get(room_id)
+    except (TypeError, ValueError):
+        room = None
+    if room is None:
         raise ClientError("ROOM_INVALID")
     # Check permissions
     if room.staff_only and not user.is_staff:
         raise ClientError("ROOM_ACCESS_DENIED")
     return room
+
+
+def get_member(message):
+    """
+    Returns the registry Member of the connection the message came from,
+    restoring it from the channel session if the registry lost it, and
+    reading whether it is staff again once that is CHAT_MEMBER_STAFF_TTL
+    seconds old.
+    """
+    member = registry.get(message.reply_channel.name)
+    if member is None:
+        member = _member_from_session(message)
+    elif member.staff_is_stale():
+        member = registry.refresh(message.reply_channel.name, member)
+        if member is None:
+            raise ClientError("USER_HAS_TO_LOGIN")
+    return member
+
+
+@channel_session_user
+def _member_from_session(message):
+    if not message.user.is_authenticated():
+        raise ClientError("USER_HAS_TO_LOGIN")
+    member = Member.from_user(message.user, message.channel_session.get("rooms", []))
+    registry.set(message.reply_channel.name, member)
+    return member
@@ -1,8 +1,14 @@
+from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets
+from .exceptions import ClientError
+from .history import get_history
 from .models import Room
 from .serializers import RoomSerializer
+from .utils import get_room_or_error
 
 
 @login_required
@@ -16,6 +22,31 @@ def index(request):
     # Render that in the index template
     return render(request, "index.html", {
         "rooms": rooms,
+        "heartbeat_interval": getattr(settings, 'CHAT_PRESENCE_HEARTBEAT', 30),
+    })
+
+
+@login_required
+def room_history(request, room_id):
+    """
+    A page of the stored messages of a room, newest first. Pass the "before"
+    of the response, or of the history replayed on joining, to get the next
+    page; or the "until" (a message's "created") replayed instead when the
+    oldest message replayed was not written yet.
+    """
+    try:
+        room = get_room_or_error(room_id, request.user)
+    except ClientError as e:
+        return JsonResponse({"error": e.code}, status=404 if e.code == "ROOM_INVALID" else 403)
+    try:
+        before = int(request.GET["before"]) if request.GET.get("before") else None
+        until = parse_datetime(request.GET["until"]) if request.GET.get("until") else None
+    except ValueError:
+        return JsonResponse({"error": "INVALID_CURSOR"}, status=400)
+    messages, next_before = get_history(room.id, before=before, until=until)
+    return JsonResponse({
+        "messages": [message.to_dict() for message in messages],
+        "before": next_before,
     })
 
 
@@ -0,0 +1,142 @@
+"""Token authentication for the REST API that remembers tokens between requests.
+
+TokenAuthentication reads the token and its user from the database on every
+call.  CachedTokenAuthentication looks them up in two layers first:
+
+  * a small LRU dict in the process (API_TOKEN_LOCAL_SIZE entries), whose
+    entries are trusted for API_TOKEN_LOCAL_TTL seconds;
+  * the cache named by API_TOKEN_CACHE, for API_TOKEN_CACHE_TIMEOUT seconds,
+    which has to be shared by the processes (see group1.shared_cache).
+
+group1.signals drops a token from both layers when it is deleted or its user is
+saved, e.g. deactivated.  Other processes only see that in their shared cache,
+so their local copies may be used for up to API_TOKEN_LOCAL_TTL seconds more.
+
+The hit and miss counters of the process are served at /api-token-stats/ to
+staff users, see group1.views.
+"""
+import collections
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from group1.shared_cache import get_shared_cache
+
+CACHE_KEY = 'authtoken:%s'
+
+
+class LRUCache(object):
+    """A thread safe mapping holding the max_size most recently used entries,
+    each for at most ttl seconds."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                return None
+            # Popping and reinserting moves it to the most recent end.
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time() + self.ttl)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TokenCache(object):
+    """The two cache layers of token key -> Token, with its user loaded."""
+
+    def __init__(self):
+        self.local = LRUCache(getattr(settings, 'API_TOKEN_LOCAL_SIZE', 1024),
+                              getattr(settings, 'API_TOKEN_LOCAL_TTL', 10))
+        self.stats = collections.Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return get_shared_cache('API_TOKEN_CACHE')
+
+    def count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def get(self, key):
+        token = self.local.get(key)
+        if token is not None:
+            self.count('local_hits')
+            return token
+        token = self.shared.get(CACHE_KEY % key)
+        if token is not None:
+            self.count('shared_hits')
+            self.local.set(key, token)
+            return token
+        self.count('misses')
+        return None
+
+    def set(self, token):
+        self.local.set(token.key, token)
+        self.shared.set(CACHE_KEY % token.key, token, getattr(settings, 'API_TOKEN_CACHE_TIMEOUT', 300))
+
+    def invalidate(self, keys):
+        for key in keys:
+            self.local.delete(key)
+        self.shared.delete_many([CACHE_KEY % key for key in keys])
+        with self._stats_lock:
+            self.stats['invalidations'] += len(keys)
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict((name, self.stats[name])
+                         for name in ('local_hits', 'shared_hits', 'misses', 'invalidations'))
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = float(stats['local_hits'] + stats['shared_hits']) / lookups if lookups else None
+        stats['local_size'] = len(self.local)
+        return stats
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication reading the token and its user from token_cache."""
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            try:
+                token = self.model.objects.select_related('user').get(key=key)
+            except self.model.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token')
+            token_cache.set(token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted')
+
+        return (token.user, token)
+
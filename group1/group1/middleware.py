@@ -1,43 +1,49 @@
-from datetime import datetime, timedelta
+import time
+
+from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth import logout
 from .settings import EXPIRE_TIME
 
 
 class SessionSecurityMiddleware(object):
+    """Logs users out after EXPIRE_TIME seconds without a request.
+
+    The time of the last request is kept in the session as whole seconds and
+    only written back once it moved by SESSION_SECURITY_ACTIVITY_GRANULARITY
+    seconds, so most requests leave the session unmodified and the session
+    backend does not save it.  Sessions may therefore time out up to that many
+    seconds early.
+    """
+
     def process_request(self, request):
         if not request.user.is_authenticated():
             return
-        now = datetime.now()
+        now = int(time.time())
+        last_activity = self.get_last_activity(request.session)
 
-        if 'last_activity_time' not in request.session:
+        if last_activity is None:
             self.set_last_activity(request.session, now)
+            return
 
-        delta = now - self.get_last_activity(request.session)
-
-        expire_session = EXPIRE_TIME
-
-        if delta >= timedelta(seconds=expire_session):
+        if now - last_activity >= EXPIRE_TIME:
             logout(request)
             context = {'confirm_message': 'Time out! you should log in again!', 'button_desc': 'Sign in'}
             return render(request, 'TimeOut.html', context)
-        else:
+
+        granularity = getattr(settings, 'SESSION_SECURITY_ACTIVITY_GRANULARITY', 60)
+        if now - last_activity >= granularity:
             self.set_last_activity(request.session, now)
 
     @staticmethod
     def get_last_activity(session):
-        try:
-            return datetime.strptime(session['last_activity_time'], '%Y-%m-%dT%H:%M:%S.%f')
-        except AttributeError:
-            return datetime.now()
+        # Sessions from before the timestamps were integers hold a string;
+        # they start over.
+        value = session.get('last_activity_time')
+        if isinstance(value, (int, long)):
+            return value
+        return None
 
     @staticmethod
     def set_last_activity(session, now):
-        session['last_activity_time'] = now.strftime('%Y-%m-%dT%H:%M:%S.%f')
-
-
-
-
-
-
-
+        session['last_activity_time'] = now
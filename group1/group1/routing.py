@@ -0,0 +1,8 @@
+from channels import include
+
+
+# The channel routing of every app, see CHANNEL_LAYERS in settings.py.
+channel_routing = [
+    include("chat.routing.channel_routing"),
+    include("requirements.routing.channel_routing"),
+]
@@ -63,17 +63,84 @@ redis_host = os.environ.get('REDIS_HOST', 'localhost')
 
 # Channel layer definitions
 # http://channels.readthedocs.org/en/latest/deploying.html#setting-up-a-channel-backend
-CHANNEL_LAYERS = {
-    "default": {
+# CHANNEL_LAYER picks the layer: redis (every host), ipc (the processes of one
+# host, needs asgi_ipc) or inmemory (a single process, e.g. runserver, tests
+# and `manage.py bench_chat`).
+channel_layers = {
+    'redis': {
         # This example app uses the Redis channel layer implementation asgi_redis
         "BACKEND": "asgi_redis.RedisChannelLayer",
         "CONFIG": {
             "hosts": [(redis_host, 6379)],
         },
-        "ROUTING": "chat.routing.channel_routing",
+        "ROUTING": "group1.routing.channel_routing",
+    },
+    'ipc': {
+        "BACKEND": "asgi_ipc.IPCChannelLayer",
+        "CONFIG": {
+            "prefix": "group1",
+        },
+        "ROUTING": "group1.routing.channel_routing",
     },
+    'inmemory': {
+        "BACKEND": "asgiref.inmemory.ChannelLayer",
+        "ROUTING": "group1.routing.channel_routing",
+    },
+}
+
+CHANNEL_LAYERS = {
+    "default": channel_layers[os.environ.get('CHANNEL_LAYER', 'redis')],
 }
 
+# Caches
+# https://docs.djangoproject.com/en/1.8/topics/cache/
+# The 'ratelimit' cache holds the sign in attempt counters, which every process
+# has to share. RATELIMIT_CACHE picks where: file (shared by the processes of one
+# host) or redis (shared by every host, needs django-redis). The counters expire
+# by themselves; the file cache culls them once MAX_ENTRIES are held.
+ratelimit_caches = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'ratelimit_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://%s:6379/1' % redis_host,
+    },
+}
+
+# The 'shared' cache holds what every process has to see the same way, see
+# group1.shared_cache. SHARED_CACHE picks where: file (shared by the processes of
+# one host, in SHARED_CACHE_DIR) or redis (shared by every host). The file cache
+# unpickles what it finds in its directory, so only the app may write there.
+shared_caches = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SHARED_CACHE_DIR', os.path.join(BASE_DIR, 'shared_cache')),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://%s:6379/2' % redis_host,
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'ratelimit': ratelimit_caches[os.environ.get('RATELIMIT_CACHE', 'file')],
+    'shared': shared_caches[os.environ.get('SHARED_CACHE', 'file')],
+}
+
+# Sign in is blocked for LOGIN_RATELIMIT_WINDOW seconds after
+# LOGIN_RATELIMIT_ATTEMPTS failures from one address. After as many failures
+# for one username, it gets one try every LOGIN_RATELIMIT_SLOW_INTERVAL seconds.
+LOGIN_RATELIMIT_ATTEMPTS = 3
+LOGIN_RATELIMIT_WINDOW = 60
+LOGIN_RATELIMIT_SLOW_INTERVAL = 5
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -145,11 +212,77 @@ https://docs.djangoproject.com/en/1.7/ref/settings/
 EXPIRE_TIME = getattr(settings, 'SESSION_SECURITY_EXPIRE_AFTER', 600)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+# The idle timeout only writes the session when the last activity moved by
+# this many seconds.
+SESSION_SECURITY_ACTIVITY_GRANULARITY = 60
+
+# Sessions are read through the cache and only written to the database when
+# they change. SESSION_BACKEND=signed_cookies keeps them out of the database
+# entirely; db, cache and file work too. The cache is the 'shared' one, so that
+# signing out in one process ends the session in all of them.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get('SESSION_BACKEND', 'cached_db')
+SESSION_CACHE_ALIAS = 'shared'
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'group1.authentication.CachedTokenAuthentication',
     )
 }
+
+# CachedTokenAuthentication keeps up to API_TOKEN_LOCAL_SIZE tokens in each
+# process for API_TOKEN_LOCAL_TTL seconds, and every token in the
+# API_TOKEN_CACHE cache for API_TOKEN_CACHE_TIMEOUT seconds. That cache has to
+# be shared by the processes, or deleted tokens keep working in the others.
+API_TOKEN_LOCAL_SIZE = 1024
+API_TOKEN_LOCAL_TTL = 10
+API_TOKEN_CACHE = 'shared'
+API_TOKEN_CACHE_TIMEOUT = 300
+
+# The issue tracker sidebar counts are kept in the ISSUE_COUNTS_CACHE cache,
+# which has to be shared by the processes for a change to refresh them in all.
+ISSUE_COUNTS_CACHE = 'shared'
+
+# The chat keeps up to CHAT_ROOM_CACHE_SIZE rooms in each process for
+# CHAT_ROOM_CACHE_TTL seconds, and the rooms every connection joined in the
+# CHAT_REGISTRY_CACHE cache for CHAT_REGISTRY_TIMEOUT seconds. That cache has
+# to be shared by the processes, or a room left on one worker can still be
+# sent to through the others. Whether a user is staff is read again every
+# CHAT_MEMBER_STAFF_TTL seconds.
+CHAT_ROOM_CACHE_SIZE = 1024
+CHAT_ROOM_CACHE_TTL = 60
+CHAT_REGISTRY_CACHE = 'shared'
+CHAT_REGISTRY_TIMEOUT = 24 * 60 * 60
+CHAT_MEMBER_STAFF_TTL = 60
+
+# The chat slash command latencies are counted in this cache; it has to be
+# shared by the processes for `manage.py chat_command_stats` to see the
+# workers' counters. Every run updates them under a lock held across the
+# processes, see group1.shared_cache.shared_lock: with the file cache, only
+# the processes of one host share it, and runs of the same command wait on
+# each other to be counted.
+CHAT_COMMAND_STATS_CACHE = 'shared'
+
+# Chat messages are written in batches of up to CHAT_HISTORY_BATCH_SIZE, at
+# most CHAT_HISTORY_FLUSH_INTERVAL seconds after being sent. Joining a room
+# replays its last CHAT_HISTORY_REPLAY messages from memory, read again from
+# the database every CHAT_HISTORY_RING_TTL seconds to pick up what other
+# workers sent; the history endpoint pages through the rest
+# CHAT_HISTORY_PAGE_SIZE at a time.
+CHAT_HISTORY_BATCH_SIZE = 100
+CHAT_HISTORY_FLUSH_INTERVAL = 1.0
+CHAT_HISTORY_REPLAY = 50
+CHAT_HISTORY_RING_TTL = 5
+CHAT_HISTORY_PAGE_SIZE = 50
+
+# Chat clients send a heartbeat every CHAT_PRESENCE_HEARTBEAT seconds and
+# count as gone from their rooms after CHAT_PRESENCE_TIMEOUT seconds without
+# one. Who entered and left a room is sent to it at most once every
+# CHAT_PRESENCE_INTERVAL seconds. Presence is kept in the CHAT_PRESENCE_CACHE
+# cache, which has to be shared by the processes.
+CHAT_PRESENCE_CACHE = 'shared'
+CHAT_PRESENCE_HEARTBEAT = 30
+CHAT_PRESENCE_TIMEOUT = 90
+CHAT_PRESENCE_INTERVAL = 2.0
@@ -0,0 +1,82 @@
+"""The cache for state every worker process has to see the same way.
+
+Revoked API tokens, who is in which chat room and the like must not linger in
+one process after another one changed them, so they are kept in a cache the
+processes share: the 'shared' cache by default, see CACHES in the settings.
+
+The cache's own add and incr are not atomic on every backend; the file cache
+reads and then writes.  What has to read and change an entry without losing
+another process's change does so under shared_lock().
+"""
+import contextlib
+import errno
+import fcntl
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.encoding import force_bytes
+
+# How long a Redis lock outlives a process that died holding it, in seconds.
+REDIS_LOCK_TIMEOUT = 60
+
+
+def get_shared_cache(setting, default='shared'):
+    """Return the cache named by the setting.
+
+    Args:
+      setting: The name of the setting holding the cache alias.
+      default: The alias used when the setting is not set.
+
+    Raises:
+      ImproperlyConfigured: The cache is local to each process.
+    """
+    alias = getattr(settings, setting, default)
+    cache = caches[alias]
+    if isinstance(cache, LocMemCache):
+        raise ImproperlyConfigured(
+            "%s names the %r cache, which every process keeps to itself; point it at a cache the "
+            "worker processes share." % (setting, alias))
+    return cache
+
+
+@contextlib.contextmanager
+def shared_lock(cache, name):
+    """Hold the lock of that name, for every process using the cache.
+
+    The file cache locks a file in its directory with fcntl, which the lock
+    holder's death releases; Redis caches (django-redis) take a Redis lock.
+    Waits for the lock as long as it takes.
+
+    Args:
+      cache: A cache from get_shared_cache().
+      name: The name of the lock.
+
+    Raises:
+      ImproperlyConfigured: The cache cannot hold a lock for the processes.
+    """
+    if isinstance(cache, FileBasedCache):
+        try:
+            os.makedirs(cache._dir, 0o700)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+        # The cache's clear() only removes its .djcache files.
+        path = os.path.join(cache._dir, hashlib.md5(force_bytes(name)).hexdigest() + '.lock')
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    elif hasattr(cache, 'lock'):
+        with cache.lock(name, timeout=REDIS_LOCK_TIMEOUT):
+            yield
+    else:
+        raise ImproperlyConfigured(
+            "The %s cache cannot hold a lock for the worker processes; use the file or the redis "
+            "cache." % type(cache).__name__)
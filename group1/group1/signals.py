@@ -1,11 +1,26 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 from django.conf import settings
+from group1.authentication import token_cache
 
 # This code is triggered whenever a new user has been created and saved to the database
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_auth_token(sender, instance=None, created=False, **kwargs):
     if created:
-        Token.objects.create(user=instance)
\ No newline at end of file
+        Token.objects.create(user=instance)
+
+
+# Cached tokens carry their user, so they go whenever the token is deleted or
+# the user changes, e.g. is deactivated.
+
+@receiver(post_delete, sender=Token)
+def uncache_deleted_token(sender, instance=None, **kwargs):
+    token_cache.invalidate([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def uncache_user_tokens(sender, instance=None, created=False, **kwargs):
+    if not created:
+        token_cache.invalidate(list(Token.objects.filter(user=instance).values_list('key', flat=True)))
@@ -6,7 +6,9 @@ from requirements.views import home
 from issue_tracker.viewsets import UserViewSet
 from rest_framework.routers import DefaultRouter
 from chat.views import index
+from chat.views import room_history
 from rest_framework.authtoken import views
+from group1 import views as group1_views
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -21,8 +23,10 @@ urlpatterns = patterns(
     url(r'^admin/', include(admin.site.urls)),
     url(r'^$', home.home_page),
     url(r'^communication/', index),
+    url(r'^chat/history/(?P<room_id>\d+)$', room_history),
     url(r'^issue_tracker/', include('issue_tracker.urls')),
     url(r'^admin/doc/', include('django.contrib.admindocs.urls')),
     url(r'^api/', include(router.urls)),
-    url(r'^api-token-auth/', views.obtain_auth_token)
+    url(r'^api-token-auth/', views.obtain_auth_token),
+    url(r'^api-token-stats/$', group1_views.token_cache_stats)
 )
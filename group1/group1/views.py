@@ -0,0 +1,12 @@
+from rest_framework.decorators import api_view
+from rest_framework.decorators import permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from group1.authentication import token_cache
+
+
+@api_view(['GET'])
+@permission_classes((IsAdminUser,))
+def token_cache_stats(request):
+    """The API token cache counters of the process that served the request."""
+    return Response(token_cache.get_stats())
@@ -0,0 +1 @@
+default_app_config = 'issue_tracker.apps.IssueTrackerConfig'
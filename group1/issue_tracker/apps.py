@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class IssueTrackerConfig(AppConfig):
+    name = 'issue_tracker'
+
+    def ready(self):
+        # Registers the signal handlers that keep the sidebar counters and the
+        # search index current.
+        from issue_tracker import counters  # noqa
+        from issue_tracker import search
+        post_migrate.connect(search.create_index, sender=self)
@@ -0,0 +1,112 @@
+"""Per user issue counters shown in the issue tracker sidebar.
+
+The assigned, reported and verified counts of a user and the number of closed
+issues are computed with one conditional aggregate and kept in the
+ISSUE_COUNTS_CACHE cache, which the worker processes share. The post_save and
+post_delete handlers below drop the cached counts of every user an issue is or
+was attached to, so the next page view, in any process, recomputes them.
+"""
+from django.db.models import Case
+from django.db.models import IntegerField
+from django.db.models import Q
+from django.db.models import Sum
+from django.db.models import When
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_init
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from group1.shared_cache import get_shared_cache
+from issue_tracker.models import CLOSED_STATUSES
+from issue_tracker.models import Issue
+from issue_tracker.models import OPEN_STATUSES
+
+OPEN_STATUS_VALUES = [x[0] for x in OPEN_STATUSES]
+CLOSED_STATUS_VALUES = [x[0] for x in CLOSED_STATUSES]
+
+# Counts are also refreshed on every change, this only bounds stale entries.
+COUNTS_CACHE_TIMEOUT = 60 * 60
+
+CLOSED_COUNT_KEY = 'issue_tracker:counts:closed'
+
+
+def counts_cache():
+    return get_shared_cache('ISSUE_COUNTS_CACHE')
+
+
+def _user_key(user_id):
+    return 'issue_tracker:counts:user:%s' % user_id
+
+
+def _count(**lookups):
+    return Sum(Case(When(then=1, **lookups), default=0, output_field=IntegerField()))
+
+
+def compute_issue_counts(user):
+    """Compute the sidebar counts for the user in a single query.
+
+    Args:
+      user: The user the counts are for.
+    Returns:
+      A dict with the assigned, reported, verified and closed counts.
+    """
+    totals = Issue.objects.filter(
+        Q(assignee=user) | Q(reporter=user) | Q(verifier=user) | Q(status__in=CLOSED_STATUS_VALUES)
+    ).order_by().aggregate(
+        assigned=_count(assignee=user, status__in=OPEN_STATUS_VALUES),
+        reported=_count(reporter=user),
+        verified=_count(verifier=user),
+        closed=_count(status__in=CLOSED_STATUS_VALUES),
+    )
+    return dict((name, value or 0) for name, value in totals.items())
+
+
+def get_issue_counts(user):
+    """Return the sidebar counts for the user, from the cache when possible.
+
+    Args:
+      user: The user the counts are for.
+    Returns:
+      A dict with the assigned, reported, verified and closed counts.
+    """
+    cache = counts_cache()
+    user_key = _user_key(user.pk)
+    cached = cache.get_many([user_key, CLOSED_COUNT_KEY])
+    if user_key in cached and CLOSED_COUNT_KEY in cached:
+        counts = dict(cached[user_key])
+        counts['closed'] = cached[CLOSED_COUNT_KEY]
+        return counts
+
+    counts = compute_issue_counts(user)
+    cache.set_many({
+        user_key: dict((name, counts[name]) for name in ('assigned', 'reported', 'verified')),
+        CLOSED_COUNT_KEY: counts['closed'],
+    }, COUNTS_CACHE_TIMEOUT)
+    return counts
+
+
+def _counted_user_ids(issue):
+    return set([issue.reporter_id, issue.assignee_id, issue.verifier_id]) - set([None])
+
+
+def invalidate_issue_counts(user_ids):
+    counts_cache().delete_many([_user_key(user_id) for user_id in user_ids] + [CLOSED_COUNT_KEY])
+
+
+@receiver(post_init, sender=Issue)
+def _remember_counted_users(sender, instance, **kwargs):
+    # Keep the users the issue was loaded with, so that moving an issue from one
+    # assignee to another also refreshes the previous assignee's counts.
+    instance._counted_user_ids = _counted_user_ids(instance)
+
+
+@receiver(post_save, sender=Issue)
+def _issue_saved(sender, instance, **kwargs):
+    current = _counted_user_ids(instance)
+    invalidate_issue_counts(current | getattr(instance, '_counted_user_ids', set()))
+    instance._counted_user_ids = current
+
+
+@receiver(post_delete, sender=Issue)
+def _issue_deleted(sender, instance, **kwargs):
+    invalidate_issue_counts(_counted_user_ids(instance) | getattr(instance, '_counted_user_ids', set()))
@@ -1,6 +1,7 @@
 import datetime
 
 from issue_tracker import models
+from issue_tracker import search
 from django.db.models import Q
 from django.utils import timezone
 
@@ -18,12 +19,12 @@ class FilterIssueQueryset(object):
 
     def filter_title(self, query):
         if self.title:
-            query &= Q(title__icontains=self.title)
+            query &= search.search_filter(self.title, fields=['title'])
         return query
 
     def filter_description(self, query):
         if self.description:
-            query &= Q(description__icontains=self.description)
+            query &= search.search_filter(self.description, fields=['description'])
         return query
 
     def filter_status(self, query):
@@ -1,13 +1,39 @@
 """Collection of forms used by the issue tracker."""
 from django import forms
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.forms import ModelForm
 
 from issue_tracker.models import STATUSES
 from issue_tracker.models import TYPES
 from issue_tracker.models import PRIORITIES
 from issue_tracker import models as it_models
+from issue_tracker.widgets import AutocompleteSelect
 from requirements.models import project as project_model
+from requirements.models.user_association import UserAssociation
+
+USER_FIELDS = ('reporter', 'assignee', 'verifier')
+
+
+def user_projects(user):
+    """The projects the user belongs to."""
+    return project_model.Project.objects.filter(userassociation__user=user)
+
+
+def project_members(user, project_id=None):
+    """The members of the user's projects, or of the one of them given."""
+    project_ids = UserAssociation.objects.filter(user=user).values('project_id')
+    if project_id is not None:
+        project_ids = project_ids.filter(project_id=project_id)
+    return User.objects.filter(userassociation__project_id__in=project_ids).distinct()
+
+
+def user_widget():
+    return AutocompleteSelect('autocomplete_users', User, 'username')
+
+
+def project_widget():
+    return AutocompleteSelect('autocomplete_projects', project_model.Project, 'title')
 
 
 class EmptyChoiceField(forms.ChoiceField):
@@ -27,14 +53,45 @@ class EmptyChoiceField(forms.ChoiceField):
                                                initial=initial, help_text=help_text, *args, **kwargs)
 
 
-class SearchForm(forms.Form):
+class UserScopedFormMixin(object):
+    """Limits the project and user choices to what the requesting user can see.
+
+    Pass the requesting user as the user keyword argument; the project fields
+    then only accept the user's projects and the user fields the members of
+    those projects, the same rows the autocomplete views offer.  The values
+    an edited object already has stay valid.
+    """
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super(UserScopedFormMixin, self).__init__(*args, **kwargs)
+        if user is None:
+            return
+        instance = getattr(self, 'instance', None)
+        for name, field in self.fields.items():
+            if name == 'project':
+                queryset = user_projects(user)
+            elif name in USER_FIELDS:
+                queryset = project_members(user)
+            else:
+                continue
+            current = getattr(instance, name + '_id', None) if instance is not None else None
+            if current is not None:
+                queryset = field.queryset.filter(Q(pk__in=queryset.values('pk')) | Q(pk=current))
+            field.queryset = queryset
+
+
+class SearchForm(UserScopedFormMixin, forms.Form):
     """Search for issues based on provided criteria."""
-    title = forms.CharField(required=False, help_text='Substring matching in issue title.')
-    description = forms.CharField(required=False, help_text='Substring matching in the long description.')
+    title = forms.CharField(required=False,
+                            help_text='Words in the issue title; each also matches the words it starts.')
+    description = forms.CharField(required=False,
+                                  help_text='Words in the long description; each also matches the words it starts.')
     status = EmptyChoiceField(choices=STATUSES, required=False, empty_label='')
     issue_type = EmptyChoiceField(choices=TYPES, required=False, empty_label='')
     priority = EmptyChoiceField(choices=PRIORITIES, required=False, empty_label='')
-    project = forms.ModelChoiceField(queryset=project_model.Project.objects.all(), required=False)
+    project = forms.ModelChoiceField(queryset=project_model.Project.objects.all(), required=False,
+                                     widget=project_widget())
 
     # TODO(jdarrieu) Need to look into how to get this hooked up.
     # Date based filtering still not working.
@@ -45,9 +102,32 @@ class SearchForm(forms.Form):
     closed_date = forms.DateField(help_text='Date issue was closed. (mm/dd/yyyy)', required=False,
                                   input_formats=['%m/%d/%Y', '%m-%d-%Y'])
 
-    reporter = forms.ModelChoiceField(queryset=User.objects.all(), required=False)
-    assignee = forms.ModelChoiceField(queryset=User.objects.all(), required=False)
-    verifier = forms.ModelChoiceField(queryset=User.objects.all(), required=False)
+    reporter = forms.ModelChoiceField(queryset=User.objects.all(), required=False, widget=user_widget())
+    assignee = forms.ModelChoiceField(queryset=User.objects.all(), required=False, widget=user_widget())
+    verifier = forms.ModelChoiceField(queryset=User.objects.all(), required=False, widget=user_widget())
+
+
+class CreateIssueForm(UserScopedFormMixin, ModelForm):
+    class Meta:
+        model = it_models.Issue
+        fields = ['title', 'description', 'issue_type', 'priority', 'project',
+                  'assignee']
+        widgets = {
+            'project': project_widget(),
+            'assignee': user_widget(),
+        }
+
+
+class EditIssueForm(UserScopedFormMixin, ModelForm):
+    class Meta:
+        model = it_models.Issue
+        fields = ['title', 'description', 'issue_type', 'priority', 'project',
+                  'assignee', 'status', 'verifier']
+        widgets = {
+            'project': project_widget(),
+            'assignee': user_widget(),
+            'verifier': user_widget(),
+        }
 
 
 class CommentForm(ModelForm):
@@ -0,0 +1,91 @@
+"""Compare the issue search index with the old icontains filters.
+
+THIS SCRIPT IS FOR DEVELOPMENT PURPOSES ONLY.
+
+Grows the issue table to each requested size with the bulk demo data generator
+and times the same searches both ways.  Everything runs in one transaction that
+is rolled back at the end, so the database is left as it was.  It needs the
+demo users and projects, see populate_demo_data.
+
+To run:
+        python manage.py benchmark_issue_search --sizes 10000,100000,1000000
+"""
+import optparse
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import Q
+from issue_tracker import models as it_models
+from issue_tracker import search
+from issue_tracker import utils
+
+QUERIES = ('spider', 'mainframe', 'goose', 'legal')
+
+
+def _icontains_search(text, page_size):
+    """The search as it was done before the index: one scan per column."""
+    query = Q(title__icontains=text) | Q(description__icontains=text) | Q(comments__comment__icontains=text)
+    issues = it_models.Issue.objects.filter(query).distinct()
+    return issues.count(), list(issues.order_by('-pk')[:page_size])
+
+
+def _index_search(text, page_size):
+    page = search.search_issues(text, page_size=page_size)
+    return page.total, list(it_models.Issue.objects.in_bulk(page.ids).values())
+
+
+class Command(BaseCommand):
+    """A command for benchmarking the issue search."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--sizes', action='store', type='string',
+            dest='sizes', default='10000,100000,1000000',
+            help='Comma separated issue counts to benchmark at.'),
+        optparse.make_option(
+            '--repeat', action='store', type='int',
+            dest='repeat', default=3,
+            help='How many times each query is run; the best time is kept.'),
+        optparse.make_option(
+            '--seed', action='store', type='int',
+            dest='seed', default=42,
+            help='Seed for the generated issues.'),
+        )
+
+    def _best_time(self, function, text, repeat):
+        best = None
+        for _ in xrange(repeat):
+            start = time.time()
+            total, _ = function(text, search.DEFAULT_PAGE_SIZE)
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, total
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers.')
+        backend = search.get_backend()
+        self.stdout.write('Search backend: %s' % backend.__class__.__name__)
+        generator = utils.BulkDataGenerator(seed=options['seed'], batch_size=5000)
+        if not generator.project_ids:
+            raise CommandError('No projects with members found, run populate_demo_data first.')
+
+        with transaction.atomic():
+            backend.create_index()
+            for size in sizes:
+                missing = size - it_models.Issue.objects.count()
+                if missing > 0:
+                    generator.create_issues(missing)
+                self.stdout.write('\n%d issues' % it_models.Issue.objects.count())
+                self.stdout.write('%-22s %10s %12s %12s %8s' % ('query', 'matches', 'icontains', 'index', 'speedup'))
+                for text in QUERIES:
+                    old_time, old_total = self._best_time(_icontains_search, text, options['repeat'])
+                    new_time, new_total = self._best_time(_index_search, text, options['repeat'])
+                    self.stdout.write('%-22s %10s %10.1fms %10.1fms %7.1fx' % (
+                        text, '%d/%d' % (old_total, new_total), old_time * 1000, new_time * 1000,
+                        old_time / max(new_time, 1e-6)))
+            transaction.set_rollback(True)
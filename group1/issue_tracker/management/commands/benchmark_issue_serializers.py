@@ -0,0 +1,78 @@
+"""Time the issue API serialization per 1000 issues.
+
+THIS SCRIPT IS FOR DEVELOPMENT PURPOSES ONLY.
+
+Compares the plain queryset the API used to serialize, the eager loading
+queryset of the viewsets and the lite representation.  Missing issues are
+generated inside a transaction that is rolled back at the end.  It needs the
+demo users and projects, see populate_demo_data.
+
+To run:
+        python manage.py benchmark_issue_serializers --issues 1000
+"""
+import optparse
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db import transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from issue_tracker import models as it_models
+from issue_tracker import serializers
+from issue_tracker import utils
+from issue_tracker import viewsets
+
+
+class Command(BaseCommand):
+    """A command for benchmarking the issue serializers."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--issues', action='store', type='int',
+            dest='issues', default=1000,
+            help='The number of issues to serialize.'),
+        optparse.make_option(
+            '--repeat', action='store', type='int',
+            dest='repeat', default=3,
+            help='How many times each variant is run; the best time is kept.'),
+        )
+
+    def _measure(self, queryset, serializer_class, number, repeat, context):
+        best = None
+        for _ in xrange(repeat):
+            # The query log keeps at most 9000 entries, which would skew the count.
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.time()
+                data = serializer_class(list(queryset[:number]), many=True, context=context).data
+                elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(queries), len(data)
+
+    def handle(self, *args, **options):
+        number = options['issues']
+        # Hyperlinked fields need a request to build absolute URLs.
+        context = {'request': Request(APIRequestFactory().get('/issue_tracker/api/issues/', HTTP_HOST='localhost'))}
+        variants = (
+            ('plain queryset, full', it_models.Issue.objects.all(), serializers.IssueSerializer),
+            ('eager queryset, full', viewsets.ISSUE_QUERYSET, serializers.IssueSerializer),
+            ('eager queryset, lite', viewsets.ISSUE_QUERYSET.prefetch_related(None),
+             serializers.IssueLiteSerializer),
+        )
+        with transaction.atomic():
+            missing = number - it_models.Issue.objects.count()
+            if missing > 0:
+                generator = utils.BulkDataGenerator(seed=42, batch_size=5000)
+                if not generator.project_ids:
+                    raise CommandError('No projects with members found, run populate_demo_data first.')
+                generator.create_issues(missing)
+            self.stdout.write('%-24s %8s %10s %14s' % ('variant', 'queries', 'total', 'per 1k issues'))
+            for name, queryset, serializer_class in variants:
+                elapsed, queries, count = self._measure(queryset, serializer_class, number,
+                                                        options['repeat'], context)
+                self.stdout.write('%-24s %8d %8.0fms %12.0fms' % (
+                    name, queries, elapsed * 1000, elapsed * 1000000 / max(count, 1)))
+            transaction.set_rollback(True)
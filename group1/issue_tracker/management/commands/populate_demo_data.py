@@ -4,8 +4,12 @@ THIS SCRIPT IS FOR DEVELOPMENT PURPOSES ONLY.
 
 To run:
         python manage.py populate_demo_data
+
+For load testing, generate a large reproducible data set in bulk:
+        python manage.py populate_demo_data --scale --seed 42 --issues 100000 --stories 50000
 """
 import optparse
+import random
 
 from django.core.management.base import BaseCommand
 from issue_tracker import utils
@@ -23,14 +27,44 @@ class Command(BaseCommand):
             '--projects', action='store', type='int',
             dest='projects', default=100,
             help='The number of random projects to populate the db with.'),
+        optparse.make_option(
+            '--scale', action='store_true',
+            dest='scale', default=False,
+            help='Create issues, iterations, stories, tasks and comments with bulk inserts.'),
+        optparse.make_option(
+            '--seed', action='store', type='int',
+            dest='seed', default=None,
+            help='Seed for the random generator, so that runs are reproducible.'),
+        optparse.make_option(
+            '--batch-size', action='store', type='int',
+            dest='batch_size', default=1000,
+            help='The number of rows written per transaction in scale mode.'),
+        optparse.make_option(
+            '--iterations', action='store', type='int',
+            dest='iterations', default=5,
+            help='The number of iterations per project in scale mode.'),
+        optparse.make_option(
+            '--stories', action='store', type='int',
+            dest='stories', default=1000,
+            help='The number of random stories to populate the db with in scale mode.'),
         )
 
     def handle(self, *args, **options):
         """Where the command magic happens."""
+        if options['seed'] is not None:
+            random.seed(options['seed'])
         utils.create_users(users=utils.USERS, out_handle=self.stdout)
         utils.create_super_user(first='Super', last='Woman',
                                 username='test', out_handle=self.stdout)
         utils.create_projects(number_of_projects=options['projects'],
                               out_handle=self.stdout)
-        utils.create_issues(number_of_issues=options['issues'],
-                            out_handle=self.stdout)
+        if options['scale']:
+            generator = utils.BulkDataGenerator(seed=options['seed'],
+                                                batch_size=options['batch_size'],
+                                                out_handle=self.stdout)
+            generator.create_issues(options['issues'])
+            generator.create_iterations(options['iterations'])
+            generator.create_stories(options['stories'])
+        else:
+            utils.create_issues(number_of_issues=options['issues'],
+                                out_handle=self.stdout)
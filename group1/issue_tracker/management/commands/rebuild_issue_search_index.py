@@ -0,0 +1,22 @@
+"""Rebuild the issue full-text search index from scratch.
+
+The index is kept current on every save, so this is only needed after rows
+were written behind the ORM's back (raw SQL, loaddata with signals off).
+
+To run:
+        python manage.py rebuild_issue_search_index
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from issue_tracker import search
+
+
+class Command(BaseCommand):
+    """A command for rebuilding the issue search index."""
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        with transaction.atomic():
+            backend.create_index()
+            backend.rebuild()
+        self.stdout.write('Rebuilt the issue search index with %s.' % backend.__class__.__name__)
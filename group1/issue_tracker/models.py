@@ -39,7 +39,7 @@ class Issue(models.Model):
     title = models.CharField(max_length=100)
     description = models.TextField(max_length=2000)
     issue_type = models.CharField(max_length=20, choices=TYPES)
-    status = models.CharField(max_length=20, default='new', choices=STATUSES)
+    status = models.CharField(max_length=20, default='new', choices=STATUSES, db_index=True)
     priority = models.CharField(max_length=20, choices=PRIORITIES)
 
     # Project
@@ -48,7 +48,7 @@ class Issue(models.Model):
     # Dates
     submitted_date = models.DateTimeField(auto_now_add=True, editable=False)
     modified_date = models.DateTimeField(auto_now=True)
-    closed_date = models.DateTimeField(null=True, editable=False)
+    closed_date = models.DateTimeField(null=True, editable=False, db_index=True)
 
     # Users
     reporter = models.ForeignKey(User, related_name='reporter', null=True)
@@ -57,6 +57,9 @@ class Issue(models.Model):
 
     class Meta(object):
         ordering = ['id']
+        # The assigned issues list and the sidebar counts, and the API pages
+        # of changes since a date.
+        index_together = (('assignee', 'status'), ('modified_date', 'id'))
 
     def __unicode__(self):
         return self.title
@@ -70,10 +73,15 @@ class IssueComment(models.Model):
     issue_id = models.ForeignKey(Issue, related_name='comments', blank=True, null=True) 
     
     date = models.DateTimeField(auto_now_add=True, editable=False)
+    modified_date = models.DateTimeField(auto_now=True)
     poster = models.ForeignKey(User, related_name='comments', blank=True, null=True)
     is_comment = models.BooleanField(default=True)
     uploadedfile = models.FileField(null=True, blank=True, upload_to='issue_tracker/static')
 
+    class Meta(object):
+        # The API pages of changes since a date.
+        index_together = (('modified_date', 'id'),)
+
     def __unicode__(self):
         return str(self.pk)
 
@@ -83,3 +91,7 @@ class IssueComment(models.Model):
 
 def get_all_issues():
     return Issue.objects.all()
+
+
+def get_issues_for_project(project):
+    return Issue.objects.filter(project_id=project.id)
@@ -0,0 +1,157 @@
+"""Keyset (cursor) pagination for the REST API list endpoints.
+
+Pages are read with `WHERE key > last key ORDER BY key LIMIT n`, so every page
+costs the same however deep the client goes, and rows inserted while a client
+pages through the results neither shift nor repeat rows.
+
+Query parameters:
+  page_size: Rows per page, capped at API_MAX_PAGE_SIZE.
+  cursor: The opaque cursor from the `next` link of the previous page.
+  since: An ISO 8601 date; only rows changed after it are returned, oldest
+    change first.  The If-Modified-Since header returns the rows changed in
+    or after its second, HTTP dates having no fractions of a second, and gets
+    a 304 when there are none.
+
+Responses look like {"next": <url or null>, "results": [...]}.  When paging by
+change date the response carries a Last-Modified header holding the watermark
+to poll with next time: the second after the last change returned once that
+second is over, so that polling with it returns nothing new, and the second
+of the last change until then, so that rows changed later in that second
+are not missed.
+"""
+import base64
+import calendar
+import datetime
+import json
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import dateparse
+from django.utils import http
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.templatetags.rest_framework import replace_query_param
+
+PAGE_SIZE = getattr(settings, 'API_PAGE_SIZE', 100)
+MAX_PAGE_SIZE = getattr(settings, 'API_MAX_PAGE_SIZE', 1000)
+
+
+def encode_cursor(values):
+    """Return the opaque cursor for the key values of the last row of a page."""
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values))
+
+
+def decode_cursor(cursor, ordering):
+    """Return the key values encoded in the cursor.
+
+    Raises:
+      ValueError: The cursor was not made for this ordering.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor.')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError('Invalid cursor.')
+    if len(ordering) == 2:
+        values[0] = dateparse.parse_datetime(values[0] or '')
+        if values[0] is None:
+            raise ValueError('Invalid cursor.')
+    if not isinstance(values[-1], int):
+        raise ValueError('Invalid cursor.')
+    return values
+
+
+def _make_aware(value):
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.get_current_timezone())
+    return value
+
+
+def http_watermark(value):
+    """Return the Last-Modified header for the rows changed up to value."""
+    seconds = calendar.timegm(value.utctimetuple())
+    if seconds + 1 <= time.time():
+        seconds += 1
+    return http.http_date(seconds)
+
+
+class KeysetPaginationMixin(object):
+    """Paginated list() for model viewsets, ordered by primary key.
+
+    Viewsets set since_field to the date field that changes whenever a row does
+    to support the since parameter; those pages are ordered by that field and
+    then by primary key.
+    """
+
+    since_field = None
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get('page_size')
+        if page_size is None:
+            return PAGE_SIZE
+        page_size = int(page_size)
+        if page_size < 1:
+            raise ValueError('page_size must be a positive integer.')
+        return min(page_size, MAX_PAGE_SIZE)
+
+    def get_since(self, request):
+        """Return the watermark requested by the client, or None."""
+        since = request.query_params.get('since')
+        header = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        if since is None and header is None:
+            return None
+        if self.since_field is None:
+            raise ValueError('This endpoint does not support since.')
+        if since is not None:
+            value = dateparse.parse_datetime(since)
+            if value is None:
+                raise ValueError('since must be an ISO 8601 date.')
+            return _make_aware(value)
+        seconds = http.parse_http_date_safe(header)
+        if seconds is None:
+            # Invalid dates are ignored, as RFC 7232 asks.
+            return None
+        return datetime.datetime.fromtimestamp(seconds, timezone.utc)
+
+    def list(self, request, *args, **kwargs):
+        try:
+            page_size = self.get_page_size(request)
+            since = self.get_since(request)
+            ordering = (self.since_field, 'pk') if since is not None else ('pk',)
+            cursor = request.query_params.get('cursor')
+            last = decode_cursor(cursor, ordering) if cursor else None
+        except ValueError as error:
+            return Response({'detail': str(error)}, status=400)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if since is not None:
+            # If-Modified-Since is in whole seconds, see http_watermark.
+            lookup = '__gt' if 'since' in request.query_params else '__gte'
+            queryset = queryset.filter(**{self.since_field + lookup: since})
+        if last is not None:
+            if len(ordering) == 2:
+                queryset = queryset.filter(Q(**{self.since_field + '__gt': last[0]}) |
+                                           Q(**{self.since_field: last[0], 'pk__gt': last[1]}))
+            else:
+                queryset = queryset.filter(pk__gt=last[0])
+        # One extra row tells whether there is a next page without a count.
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if since is not None and not rows and cursor is None and 'since' not in request.query_params:
+            return Response(status=304)
+
+        next_url = None
+        if has_next:
+            key = [getattr(rows[-1], field) for field in ordering]
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(key))
+        serializer = self.get_serializer(rows, many=True)
+        response = Response({'next': next_url, 'results': serializer.data})
+        if since is not None:
+            watermark = getattr(rows[-1], self.since_field) if rows else since
+            response['Last-Modified'] = http_watermark(watermark)
+        return response
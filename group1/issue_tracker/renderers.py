@@ -0,0 +1,10 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class LiteJSONRenderer(JSONRenderer):
+    """Plain JSON, selected with ?format=lite to ask for the flat representation.
+
+    Registering the format with a renderer lets the content negotiation accept it;
+    the views then pick the lite serializer when it was the accepted renderer.
+    """
+    format = 'lite'
@@ -0,0 +1,300 @@
+"""Full-text search over issue titles, descriptions and comments.
+
+Issues are kept in an inverted index that is updated incrementally whenever an
+issue or one of its comments is saved or deleted.  The index lives behind a
+small backend interface so that deployments can plug in their own engine with
+the ISSUE_SEARCH_BACKEND setting (a dotted path to a SearchBackend subclass).
+
+By default SQLite databases built with FTS5 use an FTS5 virtual table and
+every other database falls back to the plain icontains filters.
+"""
+import collections
+import re
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db import connection
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from issue_tracker.models import Issue
+from issue_tracker.models import IssueComment
+
+SEARCH_FIELDS = ('title', 'description', 'comments')
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+SearchPage = collections.namedtuple('SearchPage', ['ids', 'total', 'number', 'page_size'])
+
+_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split the search text into lower case word terms."""
+    return [term.lower() for term in _TERM_PATTERN.findall(text or '')]
+
+
+class SearchBackend(object):
+    """Interface of the issue search backends."""
+
+    def create_index(self):
+        """Create the index storage if needed; called after every migrate."""
+        pass
+
+    def index_issue(self, issue_id):
+        """Add or refresh the issue in the index."""
+        raise NotImplementedError
+
+    def index_issues(self, issue_ids):
+        """Add or refresh many issues, e.g. after they were bulk inserted."""
+        for issue_id in issue_ids:
+            self.index_issue(issue_id)
+
+    def remove_issue(self, issue_id):
+        """Drop the issue from the index."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Rebuild the whole index from the issue and comment tables."""
+        raise NotImplementedError
+
+    def search(self, text, fields=SEARCH_FIELDS, offset=0, limit=None):
+        """Return (ids, total) of the issues matching every term, best match first.
+
+        Args:
+          text: The text to search for.
+          fields: The subset of SEARCH_FIELDS to search in.
+          offset: The number of matches to skip.
+          limit: The maximum number of ids to return, or None for all of them.
+        """
+        raise NotImplementedError
+
+    def filter(self, text, fields=SEARCH_FIELDS):
+        """Return a Q object selecting the issues matching every term.
+
+        Unlike search() the matches are not ranked, so this is what to combine
+        with other filters.
+        """
+        return Q(pk__in=self.search(text, fields)[0])
+
+
+class _Subquery(RawSQL):
+    """Raw SQL subquery usable as the right hand side of an __in lookup."""
+
+    def as_sql(self, compiler, connection):
+        # RawSQL adds parentheses of its own, which SQLite would read as a
+        # scalar subquery returning only the first row.
+        return self.sql, self.params
+
+
+class DatabaseBackend(SearchBackend):
+    """Fallback backend using icontains filters; it keeps no index."""
+
+    LOOKUPS = {
+        'title': 'title__icontains',
+        'description': 'description__icontains',
+        'comments': 'comments__comment__icontains',
+    }
+
+    def index_issue(self, issue_id):
+        pass
+
+    def remove_issue(self, issue_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def filter(self, text, fields=SEARCH_FIELDS):
+        terms = tokenize(text)
+        if not terms:
+            return Q(pk__in=[])
+        # The comment lookup spans a relation, so it goes through a subquery to
+        # keep the issue rows distinct.
+        query = Q()
+        for term in terms:
+            term_query = Q()
+            for field in fields:
+                term_query |= Q(**{self.LOOKUPS[field]: term})
+            query &= term_query
+        if 'comments' in fields:
+            query = Q(pk__in=Issue.objects.filter(query).values('pk'))
+        return query
+
+    def search(self, text, fields=SEARCH_FIELDS, offset=0, limit=None):
+        if not tokenize(text):
+            return [], 0
+        ids = Issue.objects.filter(self.filter(text, fields)).order_by('-pk').values_list('pk', flat=True)
+        total = ids.count()
+        if limit is not None:
+            ids = ids[offset:offset + limit]
+        elif offset:
+            ids = ids[offset:]
+        return list(ids), total
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Backend using an SQLite FTS5 table whose rowid is the issue id.
+
+    Results are ranked with bm25, weighting title matches above description
+    matches and those above comment matches.  Terms are prefix matched.  The
+    table is created by the post_migrate handler and starts out filled with the
+    existing issues.
+    """
+
+    TABLE = 'issue_tracker_issue_fts'
+    WEIGHTS = (10.0, 5.0, 1.0)
+
+    def create_index(self):
+        cursor = connection.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.TABLE])
+        if cursor.fetchone() is None:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE %s USING fts5(title, description, comments, "
+                "tokenize = 'porter unicode61')" % self.TABLE)
+            self._fill(cursor)
+
+    def _fill(self, cursor, issue_ids=None):
+        where = ''
+        params = []
+        if issue_ids is not None:
+            where = 'WHERE i.id IN (%s)' % ', '.join(['%s'] * len(issue_ids))
+            params = list(issue_ids)
+        cursor.execute(
+            "INSERT INTO {fts} (rowid, title, description, comments) "
+            "SELECT i.id, i.title, i.description, "
+            "       (SELECT group_concat(c.comment, ' ') FROM {comment} c WHERE c.issue_id_id = i.id) "
+            "FROM {issue} i {where}".format(fts=self.TABLE,
+                                            issue=Issue._meta.db_table,
+                                            comment=IssueComment._meta.db_table,
+                                            where=where),
+            params)
+
+    def index_issue(self, issue_id):
+        self.index_issues([issue_id])
+
+    def index_issues(self, issue_ids):
+        # Stay well below SQLite's limit of 999 query parameters.
+        issue_ids = list(issue_ids)
+        cursor = connection.cursor()
+        for start in xrange(0, len(issue_ids), 500):
+            chunk = issue_ids[start:start + 500]
+            cursor.execute('DELETE FROM %s WHERE rowid IN (%s)' % (self.TABLE, ', '.join(['%s'] * len(chunk))),
+                           chunk)
+            self._fill(cursor, chunk)
+
+    def remove_issue(self, issue_id):
+        connection.cursor().execute('DELETE FROM %s WHERE rowid = %%s' % self.TABLE, [issue_id])
+
+    def rebuild(self):
+        cursor = connection.cursor()
+        cursor.execute('DELETE FROM %s' % self.TABLE)
+        self._fill(cursor)
+
+    @staticmethod
+    def match_expression(terms, fields):
+        phrase = ' AND '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        return '{%s} : (%s)' % (' '.join(fields), phrase)
+
+    def filter(self, text, fields=SEARCH_FIELDS):
+        terms = tokenize(text)
+        if not terms:
+            return Q(pk__in=[])
+        return Q(pk__in=_Subquery('SELECT rowid FROM %s WHERE %s MATCH %%s' % (self.TABLE, self.TABLE),
+                                  [self.match_expression(terms, fields)]))
+
+    def search(self, text, fields=SEARCH_FIELDS, offset=0, limit=None):
+        terms = tokenize(text)
+        if not terms:
+            return [], 0
+        match = self.match_expression(terms, fields)
+        cursor = connection.cursor()
+        cursor.execute('SELECT count(*) FROM %s WHERE %s MATCH %%s' % (self.TABLE, self.TABLE), [match])
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            'SELECT rowid FROM {fts} WHERE {fts} MATCH %s ORDER BY bm25({fts}, {weights}), rowid DESC '
+            'LIMIT %s OFFSET %s'.format(fts=self.TABLE, weights=', '.join(str(w) for w in self.WEIGHTS)),
+            [match, -1 if limit is None else limit, offset])
+        return [row[0] for row in cursor.fetchall()], total
+
+
+_backend = None
+
+
+def sqlite_has_module(module):
+    """Return whether the SQLite library can create virtual tables of the module, e.g. fts5.
+
+    Builds without it fail only when the table is created, so try one.
+    """
+    try:
+        with transaction.atomic():
+            cursor = connection.cursor()
+            cursor.execute('CREATE VIRTUAL TABLE temp.issue_tracker_probe USING %s(probe)' % module)
+            cursor.execute('DROP TABLE temp.issue_tracker_probe')
+    except DatabaseError:
+        return False
+    return True
+
+
+def get_backend():
+    """Return the configured search backend, instantiated once per process."""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'ISSUE_SEARCH_BACKEND', None)
+        if path is None:
+            if connection.vendor == 'sqlite' and sqlite_has_module('fts5'):
+                path = 'issue_tracker.search.SQLiteFTSBackend'
+            else:
+                path = 'issue_tracker.search.DatabaseBackend'
+        _backend = import_string(path)()
+    return _backend
+
+
+def search_filter(text, fields=SEARCH_FIELDS):
+    """Return a Q object selecting the issues matching the text."""
+    return get_backend().filter(text, fields)
+
+
+def search_issues(text, fields=SEARCH_FIELDS, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """Return one page of ranked search results.
+
+    Args:
+      text: The text to search for.
+      fields: The subset of SEARCH_FIELDS to search in.
+      page: The 1 based page number.
+      page_size: The number of issues per page, capped at MAX_PAGE_SIZE.
+    Returns:
+      A SearchPage of issue ids in rank order and the total number of matches.
+    """
+    page = max(1, page)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    ids, total = get_backend().search(text, fields, offset=(page - 1) * page_size, limit=page_size)
+    return SearchPage(ids, total, page, page_size)
+
+
+def create_index(sender, **kwargs):
+    """post_migrate handler creating the index storage, filled from existing issues."""
+    get_backend().create_index()
+
+
+@receiver(post_save, sender=Issue)
+def _index_saved_issue(sender, instance, **kwargs):
+    get_backend().index_issue(instance.pk)
+
+
+@receiver(post_delete, sender=Issue)
+def _unindex_deleted_issue(sender, instance, **kwargs):
+    get_backend().remove_issue(instance.pk)
+
+
+@receiver(post_save, sender=IssueComment)
+@receiver(post_delete, sender=IssueComment)
+def _reindex_commented_issue(sender, instance, **kwargs):
+    if instance.issue_id_id is not None:
+        get_backend().index_issue(instance.issue_id_id)
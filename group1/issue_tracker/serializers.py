@@ -49,6 +49,50 @@ class IssueSerializer(serializers.HyperlinkedModelSerializer):
         )
 
 
+class IssueLiteSerializer(serializers.ModelSerializer):
+    """Flat issue representation with IDs and usernames instead of hyperlinks.
+
+    Pass fields=[...] to only emit some of the fields.
+    """
+    project = serializers.PrimaryKeyRelatedField(read_only=True)
+    project_title = serializers.CharField(source='project.title', read_only=True)
+    reporter = serializers.PrimaryKeyRelatedField(read_only=True)
+    reporter_username = serializers.CharField(source='reporter.username', read_only=True)
+    assignee = serializers.PrimaryKeyRelatedField(read_only=True)
+    assignee_username = serializers.CharField(source='assignee.username', read_only=True)
+    verifier = serializers.PrimaryKeyRelatedField(read_only=True)
+    verifier_username = serializers.CharField(source='verifier.username', read_only=True)
+
+    class Meta:
+        model = Issue
+        fields = (
+            'pk',
+            'title',
+            'description',
+            'issue_type',
+            'status',
+            'priority',
+            'project',
+            'project_title',
+            'submitted_date',
+            'modified_date',
+            'closed_date',
+            'reporter',
+            'reporter_username',
+            'assignee',
+            'assignee_username',
+            'verifier',
+            'verifier_username'
+        )
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super(IssueLiteSerializer, self).__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields.keys()) - set(fields):
+                self.fields.pop(name)
+
+
 class IssueCommentSerializer(serializers.HyperlinkedModelSerializer):
     user = UserSerializer()
     issue = IssueSerializer()
@@ -60,6 +104,7 @@ class IssueCommentSerializer(serializers.HyperlinkedModelSerializer):
             'comment',
             'issue_id',
             'date',
+            'modified_date',
             'poster',
             'is_comment'
         )
@@ -76,6 +121,7 @@ class CommentSerializer(serializers.HyperlinkedModelSerializer):
             'comment',
             'issue_id',
             'date',
+            'modified_date',
             'poster',
             'is_comment'
         )
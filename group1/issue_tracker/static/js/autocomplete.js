@@ -0,0 +1,32 @@
+// Typeahead for the AutocompleteSelect form widget (issue_tracker/widgets.py).
+// The visible text box looks up matches with jQuery UI autocomplete and writes
+// the chosen id into the hidden input that is actually submitted.
+$(function() {
+    $("input.autocomplete").each(function() {
+        var box = $(this);
+        var target = $("#" + box.data("target"));
+        box.autocomplete({
+            minLength: 0,
+            delay: 200,
+            source: function(request, response) {
+                $.getJSON(box.data("autocomplete-url"), {q: request.term}, function(data) {
+                    response($.map(data.results, function(item) {
+                        return {label: item.text, value: item.text, id: item.id};
+                    }));
+                });
+            },
+            select: function(event, ui) {
+                target.val(ui.item.id);
+            },
+            change: function(event, ui) {
+                // Typed text that was not picked from the list selects nothing.
+                if (!ui.item) {
+                    box.val("");
+                    target.val("");
+                }
+            }
+        }).focus(function() {
+            box.autocomplete("search", box.val());
+        });
+    });
+});
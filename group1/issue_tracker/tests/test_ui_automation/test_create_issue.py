@@ -3,6 +3,10 @@ import unittest
 import time
 import os
 
+# The first entry of the open typeahead list of an autocomplete field.
+FIRST_SUGGESTION = ('//ul[contains(@class, "ui-autocomplete")]'
+                    '[not(contains(@style, "display: none"))]/li[1]')
+
 
 class CreateIssueTestCase(unittest.TestCase):
 
@@ -31,8 +35,8 @@ class CreateIssueTestCase(unittest.TestCase):
         driver.find_element_by_id("password").clear()
         driver.find_element_by_id("password").send_keys(self.password)
         driver.find_element_by_xpath("//button[@type='submit']").click()
-        driver.find_element_by_xpath(
-            '//*[@id="id_project"]/option[2]').click()
+        driver.find_element_by_id('id_project_text').click()
+        driver.find_element_by_xpath(FIRST_SUGGESTION).click()
         driver.find_element_by_xpath(
             '//*[@id="id_issue_type"]/option[2]').click()   
         if with_title:
@@ -40,8 +44,8 @@ class CreateIssueTestCase(unittest.TestCase):
             driver.find_element_by_id('id_description').send_keys(self.description)
             driver.find_element_by_xpath(
                 '//*[@id="id_priority"]/option[2]').click()
-            driver.find_element_by_xpath(
-                '//*[@id="id_assignee"]/option[2]').click()
+            driver.find_element_by_id('id_assignee_text').click()
+            driver.find_element_by_xpath(FIRST_SUGGESTION).click()
             driver.find_element_by_css_selector(
                 '.btn-primary[value="Create"]').click()
             time.sleep(1)
@@ -4,6 +4,10 @@ import unittest
 import time
 import os
 
+# The first entry of the open typeahead list of an autocomplete field.
+FIRST_SUGGESTION = ('//ul[contains(@class, "ui-autocomplete")]'
+                    '[not(contains(@style, "display: none"))]/li[1]')
+
 
 class SearchIssuesTestCase(unittest.TestCase):
 
@@ -32,16 +36,16 @@ class SearchIssuesTestCase(unittest.TestCase):
             self.password)
         self.driver.find_element_by_id('password').send_keys(Keys.ENTER)
         time.sleep(1)
-        self.driver.find_element_by_xpath(
-            '//*[@id="id_project"]/option[2]').click()
+        self.driver.find_element_by_id('id_project_text').click()
+        self.driver.find_element_by_xpath(FIRST_SUGGESTION).click()
         self.driver.find_element_by_xpath(
             '//*[@id="id_issue_type"]/option[2]').click()
         self.driver.find_element_by_id('id_title').send_keys(self.title)
         self.driver.find_element_by_id('id_description').send_keys(self.description)
         self.driver.find_element_by_xpath(
             '//*[@id="id_priority"]/option[2]').click()
-        self.driver.find_element_by_xpath(
-            '//*[@id="id_assignee"]/option[2]').click()
+        self.driver.find_element_by_id('id_assignee_text').click()
+        self.driver.find_element_by_xpath(FIRST_SUGGESTION).click()
         self.driver.find_element_by_css_selector(
             '.btn-primary[value="Create"]').click()
 
@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from group1.authentication import token_cache
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Tests for the cached token authentication of the REST API."""
+
+    def setUp(self):
+        token_cache.local.clear()
+        token_cache.shared.clear()
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.token = Token.objects.get(user=self.alice)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def _get(self, url='/issue_tracker/api/issues/'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries]
+
+    def test_token_is_read_once(self):
+        response, queries = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('authtoken_token' in sql for sql in queries))
+        response, queries = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('authtoken_token' in sql for sql in queries))
+
+    def test_shared_cache_fills_other_processes(self):
+        self._get()
+        token_cache.local.clear()
+        before = token_cache.get_stats()['shared_hits']
+        response, queries = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('authtoken_token' in sql for sql in queries))
+        self.assertEqual(token_cache.get_stats()['shared_hits'], before + 1)
+
+    def test_process_local_cache_is_refused(self):
+        with override_settings(API_TOKEN_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                token_cache.shared
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(self.client.get('/issue_tracker/api/issues/').status_code, 401)
+
+    def test_deactivated_user_is_refused(self):
+        self._get()
+        self.alice.is_active = False
+        self.alice.save()
+        self.assertEqual(self._get()[0].status_code, 401)
+
+    def test_deleted_token_is_refused(self):
+        self._get()
+        self.token.delete()
+        self.assertEqual(self._get()[0].status_code, 401)
+
+    def test_stats(self):
+        self._get()
+        self._get()
+        self.assertEqual(self._get('/api-token-stats/')[0].status_code, 403)
+        self.alice.is_staff = True
+        self.alice.save()
+        stats = self._get('/api-token-stats/')[0].data
+        self.assertGreaterEqual(stats['local_hits'], 1)
+        self.assertGreaterEqual(stats['misses'], 1)
+        self.assertGreater(stats['hit_rate'], 0)
@@ -0,0 +1,115 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from issue_tracker import forms
+from issue_tracker import models as it_models
+from issue_tracker import views as it_views
+from requirements.models.project import Project
+from requirements.models.user_association import UserAssociation
+
+
+class AutocompleteTest(TestCase):
+    """Tests for the typeahead endpoints and the widgets using them."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.apollo = Project.objects.create(title='Apollo', description='moon')
+        self.gemini = Project.objects.create(title='Gemini', description='orbit')
+        self.hidden = Project.objects.create(title='Apex', description='secret')
+        UserAssociation.objects.create(user=self.alice, project=self.apollo, role='Developer')
+        UserAssociation.objects.create(user=self.alice, project=self.gemini, role='Developer')
+        self.amy = User.objects.create_user(username='amy', password='pw')
+        UserAssociation.objects.create(user=self.amy, project=self.apollo, role='Developer')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        UserAssociation.objects.create(user=self.bob, project=self.gemini, role='Developer')
+        self.stranger = User.objects.create_user(username='andy', password='pw')
+        UserAssociation.objects.create(user=self.stranger, project=self.hidden, role='Developer')
+        self.client.login(username='alice', password='pw')
+
+    def _get(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def _texts(self, data):
+        return [result['text'] for result in data['results']]
+
+    def test_projects_are_limited_to_membership(self):
+        data = self._get('autocomplete_projects', q='A')
+        self.assertEqual(self._texts(data), ['Apollo'])
+        self.assertEqual(data['results'][0]['id'], self.apollo.pk)
+        self.assertFalse(data['more'])
+
+    def test_users_are_limited_to_shared_projects(self):
+        self.assertEqual(self._texts(self._get('autocomplete_users')), ['alice', 'amy', 'bob'])
+        self.assertEqual(self._texts(self._get('autocomplete_users', q='a')), ['alice', 'amy'])
+        self.assertEqual(self._texts(self._get('autocomplete_users', project=self.gemini.pk)),
+                         ['alice', 'bob'])
+
+    def test_paging(self):
+        for i in range(it_views.AUTOCOMPLETE_PAGE_SIZE):
+            user = User.objects.create_user(username='user%02d' % i, password='pw')
+            UserAssociation.objects.create(user=user, project=self.apollo, role='Developer')
+        first = self._get('autocomplete_users', q='user')
+        self.assertEqual(len(first['results']), it_views.AUTOCOMPLETE_PAGE_SIZE)
+        self.assertFalse(first['more'])
+        first = self._get('autocomplete_users')
+        self.assertTrue(first['more'])
+        second = self._get('autocomplete_users', page=2)
+        self.assertEqual(self._texts(second), ['user17', 'user18', 'user19'])
+        self.assertFalse(second['more'])
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('autocomplete_users'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_form_does_not_list_every_user(self):
+        html = forms.EditIssueForm().as_p()
+        self.assertNotIn('bob', html)
+        self.assertIn(reverse('autocomplete_users'), html)
+        self.assertIn('id="id_assignee_text"', html)
+
+    def test_widget_shows_selected_label(self):
+        html = forms.SearchForm(initial={'assignee': self.bob.pk}).as_p()
+        self.assertIn('value="bob"', html)
+        self.assertNotIn('amy', html)
+
+    def test_form_validates_submitted_id(self):
+        form = forms.CreateIssueForm({'title': 'Broken', 'description': 'It is broken.',
+                                      'issue_type': 'Bug', 'priority': 'High',
+                                      'project': self.apollo.pk, 'assignee': self.bob.pk})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['assignee'], self.bob)
+        form = forms.CreateIssueForm({'title': 'Broken', 'description': 'It is broken.',
+                                      'issue_type': 'Bug', 'priority': 'High',
+                                      'project': self.apollo.pk, 'assignee': 9999})
+        self.assertFalse(form.is_valid())
+        self.assertIn('assignee', form.errors)
+
+    def test_form_is_limited_to_the_users_projects(self):
+        fields = {'title': 'Broken', 'description': 'It is broken.', 'issue_type': 'Bug', 'priority': 'High'}
+        form = forms.CreateIssueForm(dict(fields, project=self.gemini.pk, assignee=self.bob.pk), user=self.alice)
+        self.assertTrue(form.is_valid(), form.errors)
+        form = forms.CreateIssueForm(dict(fields, project=self.hidden.pk, assignee=self.stranger.pk),
+                                     user=self.alice)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(sorted(form.errors), ['assignee', 'project'])
+        form = forms.SearchForm({'reporter': self.stranger.pk}, user=self.alice)
+        self.assertIn('reporter', form.errors)
+
+    def test_edit_form_keeps_current_values(self):
+        issue = it_models.Issue.objects.create(title='Broken', description='It is broken.', issue_type='Bug',
+                                               priority='High', status='Open-Assigned', project=self.hidden,
+                                               assignee=self.stranger)
+        form = forms.EditIssueForm(instance=issue, user=self.alice)
+        self.assertEqual(set(form.fields['assignee'].queryset), set([self.alice, self.amy, self.bob,
+                                                                     self.stranger]))
+        self.assertEqual(set(form.fields['verifier'].queryset), set([self.alice, self.amy, self.bob]))
+
+    def test_views_pass_the_user(self):
+        response = self.client.post(reverse('search'), {'project': self.hidden.pk})
+        self.assertIn('project', response.context['form'].errors)
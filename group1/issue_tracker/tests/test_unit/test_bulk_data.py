@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from issue_tracker import counters
+from issue_tracker import models as it_models
+from issue_tracker import search
+from issue_tracker import utils
+from requirements.models import project_api
+from requirements.models import user_association
+from requirements.models.iteration import Iteration
+from requirements.models.iteration_stats import IterationStats
+from requirements.models.iteration_stats import rebuild_iteration_stats
+from requirements.models.story import Story
+from requirements.models.story_history import StoryStatusChange
+from requirements.models.task import Task
+
+STATS_FIELDS = ('project_id', 'iteration_id', 'bucket', 'unstarted', 'started', 'completed', 'accepted',
+                'points', 'hours')
+
+
+class BulkDataGeneratorTest(TestCase):
+    """Tests for the load testing data generator."""
+
+    def setUp(self):
+        cache.clear()
+        counters.counts_cache().clear()
+        owner = User.objects.create_user(username='owner', password='pw')
+        for name in ('dev1', 'dev2'):
+            User.objects.create_user(username=name, password='pw')
+        for title in ('first', 'second'):
+            project = project_api.create_project(owner, {'title': title, 'description': 'desc'})
+            for name in ('dev1', 'dev2'):
+                project_api.add_user_to_project(project.id, name, user_association.ROLE_DEVELOPER)
+        # Small batches, so that the rows span several transactions.
+        self.generator = utils.BulkDataGenerator(seed=7, batch_size=4)
+
+    def _stats(self):
+        return sorted(IterationStats.objects.values_list(*STATS_FIELDS))
+
+    def test_issues(self):
+        counters.get_issue_counts(User.objects.get(username='dev1'))
+        self.generator.create_issues(10)
+        issues = list(it_models.Issue.objects.all())
+        self.assertEqual(len(issues), 10)
+        self.assertEqual(it_models.IssueComment.objects.exclude(issue_id__in=issues).count(), 0)
+        for issue in issues:
+            self.assertIn(issue.pk, search.search_issues(issue.title, page_size=100).ids)
+        # The cached counters were dropped.
+        dev1 = User.objects.get(username='dev1')
+        self.assertEqual(counters.get_issue_counts(dev1), counters.compute_issue_counts(dev1))
+
+    def test_stories(self):
+        self.generator.create_iterations(3)
+        self.assertEqual(Iteration.objects.count(), 6)
+        self.generator.create_stories(10)
+        stories = Story.objects.all()
+        self.assertEqual(stories.count(), 10)
+        self.assertEqual(Task.objects.exclude(story__in=stories).count(), 0)
+        self.assertEqual(
+            sorted(StoryStatusChange.objects.values_list('story_id', 'iteration_id', 'from_status', 'to_status')),
+            sorted((story.id, story.iteration_id, None, story.status) for story in stories))
+        self.assertEqual(sum(stats.story_count for stats in IterationStats.objects.all()), 10)
+        stats = self._stats()
+        rebuild_iteration_stats()
+        self.assertEqual(self._stats(), stats)
+
+    def test_same_seed_same_data(self):
+        self.generator.create_issues(5)
+        first = list(it_models.Issue.objects.order_by('id').values_list('title', 'status', 'project_id'))
+        it_models.Issue.objects.all().delete()
+        utils.BulkDataGenerator(seed=7, batch_size=4).create_issues(5)
+        self.assertEqual(
+            list(it_models.Issue.objects.order_by('id').values_list('title', 'status', 'project_id')), first)
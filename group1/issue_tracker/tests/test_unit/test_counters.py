@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.core.cache import _create_cache
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.test import override_settings
+
+from issue_tracker import counters
+from issue_tracker import models as it_models
+
+
+class IssueCountersTest(TestCase):
+    """Tests for the cached sidebar counters."""
+
+    def setUp(self):
+        cache.clear()
+        counters.counts_cache().clear()
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+
+    def _create(self, **kwargs):
+        fields = {'title': 'issue', 'description': 'desc', 'issue_type': 'Bug',
+                  'priority': 'High', 'status': 'Open-Assigned'}
+        fields.update(kwargs)
+        return it_models.Issue.objects.create(**fields)
+
+    def test_counts_in_one_query(self):
+        self._create(assignee=self.alice, reporter=self.bob)
+        self._create(assignee=self.alice, status='Closed-Fixed', verifier=self.alice)
+        self._create(reporter=self.alice)
+        with self.assertNumQueries(1):
+            counts = counters.get_issue_counts(self.alice)
+        self.assertEqual(counts, {'assigned': 1, 'reported': 1, 'verified': 1, 'closed': 1})
+
+    def test_counts_are_cached(self):
+        self._create(assignee=self.alice)
+        counters.get_issue_counts(self.alice)
+        with self.assertNumQueries(0):
+            self.assertEqual(counters.get_issue_counts(self.alice)['assigned'], 1)
+
+    def test_reassign_refreshes_both_users(self):
+        issue = self._create(assignee=self.alice)
+        self.assertEqual(counters.get_issue_counts(self.alice)['assigned'], 1)
+        self.assertEqual(counters.get_issue_counts(self.bob)['assigned'], 0)
+
+        issue = it_models.Issue.objects.get(pk=issue.pk)
+        issue.assignee = self.bob
+        issue.save()
+        self.assertEqual(counters.get_issue_counts(self.alice)['assigned'], 0)
+        self.assertEqual(counters.get_issue_counts(self.bob)['assigned'], 1)
+
+    def test_closing_refreshes_closed_count_for_everyone(self):
+        issue = self._create(assignee=self.alice)
+        self.assertEqual(counters.get_issue_counts(self.bob)['closed'], 0)
+        issue.status = 'Closed-Fixed'
+        issue.save()
+        self.assertEqual(counters.get_issue_counts(self.bob)['closed'], 1)
+        self.assertEqual(counters.get_issue_counts(self.alice)['assigned'], 0)
+
+    def test_delete_refreshes_counts(self):
+        issue = self._create(reporter=self.alice)
+        self.assertEqual(counters.get_issue_counts(self.alice)['reported'], 1)
+        issue.delete()
+        self.assertEqual(counters.get_issue_counts(self.alice)['reported'], 0)
+
+    def test_changes_reach_other_processes(self):
+        issue = self._create(assignee=self.alice)
+        # Another worker, with its own instance of the shared cache.
+        other = _create_cache('shared')
+        counts_cache = counters.counts_cache
+        counters.counts_cache = lambda: other
+        try:
+            self.assertEqual(counters.get_issue_counts(self.alice)['assigned'], 1)
+        finally:
+            counters.counts_cache = counts_cache
+        issue.status = 'Closed-Fixed'
+        issue.save()
+        counters.counts_cache = lambda: other
+        try:
+            self.assertEqual(counters.get_issue_counts(self.alice)['assigned'], 0)
+        finally:
+            counters.counts_cache = counts_cache
+
+    def test_process_local_cache_is_refused(self):
+        with override_settings(ISSUE_COUNTS_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                counters.get_issue_counts(self.alice)
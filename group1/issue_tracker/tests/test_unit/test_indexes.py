@@ -0,0 +1,84 @@
+import re
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.test import RequestFactory
+from django.utils import timezone
+
+from issue_tracker import counters
+from issue_tracker import models as it_models
+from issue_tracker import views as it_views
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    return ' / '.join(row[-1] for row in cursor.fetchall())
+
+
+def scans_table(plan, table):
+    """Whether the plan reads the whole table rather than through an index.
+
+    SQLite before 3.36 writes 'SCAN TABLE issue', later versions 'SCAN issue'.
+    """
+    pattern = re.compile(r'^SCAN (TABLE )?%s( AS \w+)?$' % re.escape(table))
+    return any(pattern.match(step) for step in plan.split(' / '))
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax.')
+class IssueIndexTest(TestCase):
+    """The issue lists are read through indexes rather than table scans."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+
+    def _view_queryset(self, view_class):
+        view = view_class()
+        view.request = RequestFactory().get('/')
+        view.request.user = self.alice
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset, index):
+        plan = query_plan(queryset)
+        self.assertIn('INDEX', plan)
+        self.assertIn(index, plan)
+        self.assertFalse(scans_table(plan, it_models.Issue._meta.db_table), plan)
+
+    def test_table_scans_are_detected(self):
+        plan = query_plan(it_models.Issue.objects.filter(title='x'))
+        self.assertTrue(scans_table(plan, it_models.Issue._meta.db_table), plan)
+
+    def test_assigned_issues(self):
+        # Ordered by id, which the assignee index yields without sorting.
+        self.assertUsesIndex(self._view_queryset(it_views.AssigneeListIssuesView), '(assignee_id=?')
+
+    def test_assigned_count(self):
+        self.assertUsesIndex(it_models.Issue.objects.filter(
+            assignee=self.alice, status__in=counters.OPEN_STATUS_VALUES).order_by().values('pk'),
+            '(assignee_id=? AND status=?)')
+
+    def test_sidebar_counts(self):
+        plan = query_plan(it_models.Issue.objects.filter(
+            Q(assignee=self.alice) | Q(reporter=self.alice) | Q(verifier=self.alice) |
+            Q(status__in=counters.CLOSED_STATUS_VALUES)).order_by())
+        self.assertIn('MULTI-INDEX OR', plan)
+        self.assertIn('(status=?)', plan)
+
+    def test_closed_issues(self):
+        self.assertUsesIndex(self._view_queryset(it_views.ClosedListIssuesView), '(status=?)')
+
+    def test_reported_issues(self):
+        self.assertUsesIndex(self._view_queryset(it_views.ReporterListIssuesView), '(reporter_id=?)')
+
+
+    def test_changes_since(self):
+        # The API pages of changes, read in index order without sorting.
+        since = timezone.now()
+        for model in (it_models.Issue, it_models.IssueComment):
+            plan = query_plan(model.objects.filter(modified_date__gt=since).order_by('modified_date', 'pk'))
+            self.assertIn('(modified_date>?)', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
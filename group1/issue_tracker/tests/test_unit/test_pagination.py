@@ -0,0 +1,113 @@
+import calendar
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import http
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from issue_tracker import models as it_models
+from issue_tracker import pagination
+
+
+class KeysetPaginationTest(TestCase):
+    """Tests for the cursor paginated API list endpoints."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='alice', password='pw'))
+        self.issues = [self._create('issue %d' % i) for i in range(5)]
+        self.base = timezone.now() - datetime.timedelta(days=10)
+        for days, issue in enumerate(self.issues):
+            it_models.Issue.objects.filter(pk=issue.pk).update(
+                modified_date=self.base + datetime.timedelta(days=days))
+
+    def _create(self, title):
+        return it_models.Issue.objects.create(title=title, description='desc', issue_type='Bug',
+                                              priority='High', status='Open-Assigned')
+
+    def _walk(self, url):
+        pks = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pks.extend(row['pk'] for row in response.data['results'])
+            url = response.data['next']
+        return pks
+
+    def test_pages_cover_every_row_once(self):
+        pks = self._walk('/issue_tracker/api/issues/?page_size=2')
+        self.assertEqual(pks, [issue.pk for issue in self.issues])
+
+    def test_rows_added_while_paging_are_not_repeated(self):
+        response = self.client.get('/issue_tracker/api/issues/?page_size=2')
+        self._create('late')
+        pks = [row['pk'] for row in response.data['results']] + self._walk(response.data['next'])
+        self.assertEqual(len(pks), len(set(pks)))
+        self.assertEqual(len(pks), 6)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/issue_tracker/api/issues/?page_size=0')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/issue_tracker/api/issues/?page_size=100000')
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_since_returns_changes_in_order(self):
+        since = (self.base + datetime.timedelta(days=2, hours=1)).isoformat()
+        pks = self._walk('/issue_tracker/api/issues/?page_size=1&since=%s' % http.urlquote(since))
+        self.assertEqual(pks, [self.issues[3].pk, self.issues[4].pk])
+
+    def test_if_modified_since(self):
+        latest = self.base + datetime.timedelta(days=4, seconds=1)
+        header = http.http_date((latest - datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)).total_seconds())
+        response = self.client.get('/issue_tracker/api/issues/', HTTP_IF_MODIFIED_SINCE=header)
+        self.assertEqual(response.status_code, 304)
+
+        earlier = http.http_date((latest - datetime.timedelta(days=1) -
+                                  datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)).total_seconds())
+        response = self.client.get('/issue_tracker/api/issues/', HTTP_IF_MODIFIED_SINCE=earlier)
+        self.assertEqual([row['pk'] for row in response.data['results']], [self.issues[4].pk])
+        self.assertIn('Last-Modified', response)
+
+    def test_last_modified_polls_get_not_modified(self):
+        since = (self.base + datetime.timedelta(days=3, hours=1)).isoformat()
+        response = self.client.get('/issue_tracker/api/issues/?since=%s' % http.urlquote(since))
+        self.assertEqual([row['pk'] for row in response.data['results']], [self.issues[4].pk])
+        response = self.client.get('/issue_tracker/api/issues/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_in_the_current_second_are_polled_again(self):
+        changed = timezone.now() + datetime.timedelta(minutes=1)
+        it_models.Issue.objects.filter(pk=self.issues[4].pk).update(modified_date=changed)
+        # Rows may still change in that second, so it is not skipped yet.
+        header = pagination.http_watermark(changed)
+        self.assertEqual(http.parse_http_date(header), calendar.timegm(changed.utctimetuple()))
+        response = self.client.get('/issue_tracker/api/issues/', HTTP_IF_MODIFIED_SINCE=header)
+        self.assertEqual([row['pk'] for row in response.data['results']], [self.issues[4].pk])
+
+    def test_bad_cursor(self):
+        response = self.client.get('/issue_tracker/api/issues/?cursor=nonsense')
+        self.assertEqual(response.status_code, 400)
+
+    def test_users_do_not_support_since(self):
+        response = self.client.get('/issue_tracker/api/users/?since=2015-01-01T00:00:00')
+        self.assertEqual(response.status_code, 400)
+
+    def test_edited_comments_are_returned_since(self):
+        comment = it_models.IssueComment.objects.create(issue_id=self.issues[0], comment='first')
+        it_models.IssueComment.objects.filter(pk=comment.pk).update(
+            date=self.base, modified_date=self.base)
+        since = (self.base + datetime.timedelta(hours=1)).isoformat()
+        url = '/issue_tracker/api/comments/?since=%s' % http.urlquote(since)
+        self.assertEqual(self._walk(url), [])
+        comment = it_models.IssueComment.objects.get(pk=comment.pk)
+        comment.comment = 'edited'
+        comment.save()
+        self.assertEqual(self._walk(url), [comment.pk])
+
+    def test_search_pages_look_like_the_other_lists(self):
+        response = self.client.get('/issue_tracker/api/issue/?search=issue&page_size=2')
+        self.assertEqual(sorted(response.data), ['next', 'results'])
+        pks = self._walk('/issue_tracker/api/issue/?search=issue&page_size=2')
+        self.assertEqual(sorted(pks), [issue.pk for issue in self.issues])
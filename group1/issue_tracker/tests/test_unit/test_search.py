@@ -0,0 +1,68 @@
+from django.test import TestCase
+
+from issue_tracker import filters
+from issue_tracker import models as it_models
+from issue_tracker import search
+
+
+class IssueSearchTest(TestCase):
+    """Tests for the issue full-text search index."""
+
+    def _create(self, **kwargs):
+        fields = {'title': 'issue', 'description': 'desc', 'issue_type': 'Bug',
+                  'priority': 'High', 'status': 'Open-Assigned'}
+        fields.update(kwargs)
+        return it_models.Issue.objects.create(**fields)
+
+    def test_index_follows_saves_and_deletes(self):
+        issue = self._create(title='Login page crashes')
+        self.assertEqual(search.search_issues('crash').ids, [issue.pk])
+
+        issue.title = 'Logout button missing'
+        issue.save()
+        self.assertEqual(search.search_issues('crash').total, 0)
+        self.assertEqual(search.search_issues('logout').ids, [issue.pk])
+
+        issue.delete()
+        self.assertEqual(search.search_issues('logout').total, 0)
+
+    def test_comments_are_indexed(self):
+        issue = self._create()
+        comment = it_models.IssueComment.objects.create(issue_id=issue, comment='Reproduced on Firefox')
+        self.assertEqual(search.search_issues('firefox').ids, [issue.pk])
+        comment.delete()
+        self.assertEqual(search.search_issues('firefox').total, 0)
+
+    def test_every_term_must_match(self):
+        both = self._create(title='Slow report', description='The PDF export takes minutes')
+        self._create(title='Slow login')
+        self.assertEqual(search.search_issues('slow pdf').ids, [both.pk])
+
+    def test_pages(self):
+        for _ in range(5):
+            self._create(title='Broken widget')
+        first = search.search_issues('widget', page=1, page_size=2)
+        third = search.search_issues('widget', page=3, page_size=2)
+        self.assertEqual(first.total, 5)
+        self.assertEqual(len(first.ids), 2)
+        self.assertEqual(len(third.ids), 1)
+        self.assertFalse(set(first.ids) & set(third.ids))
+
+    def test_filter_title_only_searches_titles(self):
+        titled = self._create(title='Memory leak')
+        self._create(description='Looks like a memory problem')
+        results = filters.filter_issue_results({'title': 'memory', 'description': ''})
+        self.assertEqual([issue.pk for issue in results], [titled.pk])
+
+    def test_fts5_is_probed(self):
+        self.assertTrue(search.sqlite_has_module('fts5'))
+        self.assertFalse(search.sqlite_has_module('no_such_module'))
+
+    def test_falls_back_without_fts5(self):
+        probe, backend = search.sqlite_has_module, search._backend
+        search.sqlite_has_module = lambda module: False
+        search._backend = None
+        try:
+            self.assertIsInstance(search.get_backend(), search.DatabaseBackend)
+        finally:
+            search.sqlite_has_module, search._backend = probe, backend
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from issue_tracker import models as it_models
+from requirements.models.project import Project
+
+
+class IssueRepresentationTest(TestCase):
+    """Tests for the eager loading issue endpoints and the lite representation."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pw')
+        self.bob = User.objects.create_user(username='bob', password='pw')
+        self.project = Project.objects.create(title='Apollo', description='moon')
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def _create(self, number):
+        for i in range(number):
+            it_models.Issue.objects.create(title='issue %d' % i, description='desc', issue_type='Bug',
+                                           priority='High', status='Open-Assigned', project=self.project,
+                                           reporter=self.alice, assignee=self.bob)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_issues(self):
+        self._create(2)
+        few = self._count_queries('/issue_tracker/api/issues/')
+        self._create(10)
+        self.assertEqual(self._count_queries('/issue_tracker/api/issues/'), few)
+
+    def test_lite_format(self):
+        self._create(1)
+        response = self.client.get('/issue_tracker/api/issues/?format=lite')
+        self.assertEqual(response.status_code, 200)
+        issue = response.data['results'][0]
+        self.assertEqual(issue['reporter'], self.alice.pk)
+        self.assertEqual(issue['reporter_username'], 'alice')
+        self.assertEqual(issue['project_title'], 'Apollo')
+        self.assertIsNone(issue['verifier'])
+        self.assertIsNone(issue['verifier_username'])
+
+    def test_lite_format_is_one_query(self):
+        self._create(5)
+        with self.assertNumQueries(1):
+            self.client.get('/issue_tracker/api/issue/?format=lite')
+
+    def test_fields(self):
+        self._create(1)
+        response = self.client.get('/issue_tracker/api/issues/?fields=pk,assignee_username')
+        self.assertEqual(response.data['results'][0].keys(), ['pk', 'assignee_username'])
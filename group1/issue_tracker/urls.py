@@ -52,6 +52,10 @@ urlpatterns = patterns(
     url(r'^issue/edit/(?P<pk>\d+)/$', login_required(it_views.EditIssue.as_view()), name='edit_issue'),
     url(r'^issue/search/$', login_required(it_views.SearchIssues.as_view()), name='search'),
 
+    # Typeahead lookups for the issue forms.
+    url(r'^autocomplete/users/$', login_required(it_views.autocomplete_users), name='autocomplete_users'),
+    url(r'^autocomplete/projects/$', login_required(it_views.autocomplete_projects), name='autocomplete_projects'),
+
     #for interaction with issue comments via api:
     url(r'^Comments/$', it_views.CommentList.as_view(),name='comment-list'),
     url(r'^Comments/(?P<pk>[0-9]+)/$', it_views.CommentDetail.as_view(), name='comment-detail'),
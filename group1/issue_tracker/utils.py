@@ -1,13 +1,25 @@
 """Common utility functions.
 """
+import collections
 import datetime
 import random
 
 from django.contrib.auth.models import User
 from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import Max
+from issue_tracker import counters
 from issue_tracker import models as it_models
+from issue_tracker import search
 from requirements.models import project_api
 from requirements.models import user_association as user_association_model
+from requirements.models.iteration import Iteration
+from requirements.models.iteration_stats import rebuild_iteration_stats
+from requirements.models.story import Story
+from requirements.models.story_comment import StoryComment
+from requirements.models.story_history import StoryStatusChange
+from requirements.models.task import Task
+from requirements.models.user_association import UserAssociation
 
 USERS = (
     ('Mike', 'Bibriglia', 'mbibrigl',),
@@ -272,6 +284,206 @@ def create_projects(number_of_projects, out_handle=None):
         out_handle.write('\n')
 
 
+class BulkDataGenerator(object):
+    """Generates large amounts of demo data for load testing.
+
+    User and project IDs are loaded once and kept in memory, rows are written
+    with bulk_create and every batch is committed in its own transaction. All
+    randomness comes from one seeded generator, so two runs with the same seed
+    against the same users and projects produce the same data.
+
+    bulk_create sends no post_save signals, so the tables and caches those
+    handlers keep are brought up to date here: the search index and issue
+    counters per batch of issues, the story status log per batch of stories
+    and the iteration stats once all stories are written.
+    """
+
+    def __init__(self, seed=None, batch_size=1000, out_handle=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.out_handle = out_handle
+        self.project_user_ids = collections.OrderedDict()
+        for project_id, user_id in UserAssociation.objects.order_by(
+                'project_id', 'user_id').values_list('project_id', 'user_id'):
+            self.project_user_ids.setdefault(project_id, []).append(user_id)
+        self.project_ids = list(self.project_user_ids.keys())
+
+    def _write(self, text, ending=None):
+        if self.out_handle:
+            self.out_handle.write(text, ending=ending)
+            self.out_handle.flush()
+
+    def _choice(self, items):
+        return items[self.rng.randint(0, len(items) - 1)]
+
+    def _random_date(self):
+        return datetime.datetime.now() + datetime.timedelta(days=self.rng.randint(-365, 365))
+
+    def _batches(self, total):
+        for start in xrange(0, total, self.batch_size):
+            yield min(self.batch_size, total - start)
+
+    @staticmethod
+    def _bulk_insert(model, rows):
+        """Insert the rows and return their new primary keys in insertion order.
+
+        bulk_create does not set primary keys on every backend, so the new IDs are
+        read back as everything above the previous maximum. This must run inside
+        the batch transaction, and nothing else may insert into the table
+        meanwhile; a count that does not match the rows is refused.
+        """
+        last_id = model.objects.aggregate(last=Max('id'))['last'] or 0
+        model.objects.bulk_create(rows)
+        ids = list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True))
+        if len(ids) != len(rows):
+            raise IntegrityError('%d %s rows were written alongside the batch of %d' % (
+                len(ids) - len(rows), model.__name__, len(rows)))
+        return ids
+
+    def create_issues(self, number_of_issues):
+        """Create issues in the projects, each with 0 to 9 comments.
+
+        Args:
+          number_of_issues: The number of issues to be created.
+        """
+        if not self.project_ids:
+            return
+        self._write('\nCreating issues in batches of %d' % self.batch_size)
+        for size in self._batches(number_of_issues):
+            with transaction.atomic():
+                issues = []
+                issue_users = []
+                for _ in xrange(size):
+                    project_id = self._choice(self.project_ids)
+                    user_ids = self.project_user_ids[project_id]
+                    status = self._choice(it_models.STATUSES)[0]
+                    issues.append(it_models.Issue(
+                        title=self._choice(TITLES),
+                        description=self._choice(DESCRIPTIONS),
+                        issue_type=self._choice(it_models.TYPES)[0],
+                        status=status,
+                        priority=self._choice(it_models.PRIORITIES)[0],
+                        project_id=project_id,
+                        modified_date=self._random_date(),
+                        submitted_date=self._random_date(),
+                        reporter_id=self._choice(user_ids),
+                        assignee_id=self._choice(user_ids) if status != 'new' else None,
+                        verifier_id=None if self.rng.randint(0, 1) else self._choice(user_ids),
+                    ))
+                    issue_users.append(user_ids)
+                issue_ids = self._bulk_insert(it_models.Issue, issues)
+
+                comments = []
+                for issue_id, user_ids in zip(issue_ids, issue_users):
+                    for _ in xrange(1, self.rng.randint(1, 10)):
+                        comments.append(it_models.IssueComment(
+                            comment=self._choice(COMMENTS),
+                            issue_id_id=issue_id,
+                            date=self._random_date(),
+                            poster_id=self._choice(user_ids),
+                            is_comment=True,
+                        ))
+                it_models.IssueComment.objects.bulk_create(comments)
+                search.get_backend().index_issues(issue_ids)
+                counters.invalidate_issue_counts(set(
+                    user_id for issue in issues
+                    for user_id in (issue.reporter_id, issue.assignee_id, issue.verifier_id)
+                    if user_id is not None))
+            self._write('.', ending='')
+        self._write('\n')
+
+    def create_iterations(self, iterations_per_project):
+        """Create consecutive two week iterations in every project.
+
+        Args:
+          iterations_per_project: The number of iterations per project.
+        """
+        self._write('\nCreating iterations')
+        start = datetime.date.today() - datetime.timedelta(weeks=iterations_per_project)
+        iterations = []
+        for project_id in self.project_ids:
+            for i in xrange(iterations_per_project):
+                start_date = start + datetime.timedelta(weeks=2 * i)
+                iterations.append(Iteration(
+                    title='Iteration %d' % (i + 1),
+                    description=self._choice(DESCRIPTIONS),
+                    start_date=start_date,
+                    end_date=start_date + datetime.timedelta(days=13),
+                    project_id=project_id,
+                ))
+        with transaction.atomic():
+            Iteration.objects.bulk_create(iterations, batch_size=self.batch_size)
+        self._write('\n')
+
+    def create_stories(self, number_of_stories):
+        """Create stories spread over the projects, with tasks and story comments.
+
+        Stories land in the icebox, the backlog or one of the project's iterations.
+
+        Args:
+          number_of_stories: The number of stories to be created.
+        """
+        if not self.project_ids:
+            return
+        project_iteration_ids = collections.defaultdict(list)
+        for project_id, iteration_id in Iteration.objects.filter(
+                project_id__in=self.project_ids).order_by('id').values_list('project_id', 'id'):
+            project_iteration_ids[project_id].append(iteration_id)
+        usernames = dict(User.objects.values_list('id', 'username'))
+
+        self._write('\nCreating stories in batches of %d' % self.batch_size)
+        for size in self._batches(number_of_stories):
+            with transaction.atomic():
+                stories = []
+                story_users = []
+                for _ in xrange(size):
+                    project_id = self._choice(self.project_ids)
+                    user_ids = self.project_user_ids[project_id]
+                    iteration_ids = project_iteration_ids[project_id]
+                    belong = self._choice((Story.STORY_BELONGS_ICEBOX, Story.STORY_BELONGS_BACKLOG,
+                                           Story.STORY_BELONGS_ITERATION))
+                    if belong == Story.STORY_BELONGS_ITERATION and not iteration_ids:
+                        belong = Story.STORY_BELONGS_BACKLOG
+                    stories.append(Story(
+                        title=self._choice(TITLES),
+                        description=self._choice(DESCRIPTIONS),
+                        project_id=project_id,
+                        belong=belong,
+                        iteration_id=self._choice(iteration_ids)
+                        if belong == Story.STORY_BELONGS_ITERATION else None,
+                        hours=self.rng.randint(0, 40),
+                        owner_id=self._choice(user_ids),
+                        priority=self._choice(Story.PRIORITY_CHOICES)[0],
+                        type=self._choice(Story.TYPE_CHOICES)[0],
+                        status=self._choice(Story.STATUS_CHOICES)[0],
+                        points=self._choice(Story.POINTS_CHOICES)[0],
+                    ))
+                    story_users.append(user_ids)
+                story_ids = self._bulk_insert(Story, stories)
+                StoryStatusChange.objects.bulk_create(
+                    StoryStatusChange(story_id=story_id, project_id=story.project_id,
+                                      iteration_id=story.iteration_id, to_status=story.status)
+                    for story_id, story in zip(story_ids, stories))
+
+                tasks = []
+                comments = []
+                for story_id, user_ids in zip(story_ids, story_users):
+                    for i in xrange(self.rng.randint(0, 5)):
+                        tasks.append(Task(story_id=story_id, description='Task %d' % (i + 1)))
+                    for _ in xrange(self.rng.randint(0, 3)):
+                        comments.append(StoryComment(
+                            story_id=story_id,
+                            title=self._choice(TITLES)[:1024],
+                            comment=self._choice(COMMENTS),
+                            user=usernames.get(self._choice(user_ids), ''),
+                        ))
+                Task.objects.bulk_create(tasks)
+                StoryComment.objects.bulk_create(comments)
+            self._write('.', ending='')
+        rebuild_iteration_stats()
+        self._write('\n')
+
+
 def wipe_db():
     """This will wipe the database of all Users and Issues."""
 
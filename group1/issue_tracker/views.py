@@ -1,8 +1,10 @@
 """Container for the various views supported."""
 import datetime
 
+from django.contrib.auth.models import User
 from django.http import HttpResponseRedirect
 from django.http import HttpResponseForbidden
+from django.http import JsonResponse
 from django.views.generic import DetailView
 from django.views.generic import UpdateView
 from django.views.generic import ListView
@@ -11,17 +13,28 @@ from rest_framework.generics import UpdateAPIView
 from django.views.generic.edit import CreateView
 from django.views.generic.edit import FormView
 from django.views.generic.edit import FormMixin
+from issue_tracker import counters
 from issue_tracker import forms
 from issue_tracker import models as it_models
 from issue_tracker import filters
 from issue_tracker import serializers as it_serializers
 from django.core.urlresolvers import reverse
 
+AUTOCOMPLETE_PAGE_SIZE = 20
 
-class CreateIssue(CreateView):
+
+class UserFormMixin(object):
+    """Hands the requesting user to forms built on UserScopedFormMixin."""
+
+    def get_form_kwargs(self):
+        kwargs = super(UserFormMixin, self).get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+
+class CreateIssue(UserFormMixin, CreateView):
     model = it_models.Issue
-    fields = ['title', 'description', 'issue_type', 'priority', 'project',
-              'assignee']
+    form_class = forms.CreateIssueForm
     template_name = 'create_issue.html'
 
     # new_issue.date_modified should be new_issue.date_submitted.
@@ -39,10 +52,9 @@ class CreateIssue(CreateView):
         return context
 
 
-class EditIssue(UpdateView):
+class EditIssue(UserFormMixin, UpdateView):
     model = it_models.Issue
-    fields = ['title', 'description', 'issue_type', 'priority', 'project',
-              'assignee', 'status', 'verifier']
+    form_class = forms.EditIssueForm
     template_name = 'edit_issue.html'
 
     def form_valid(self, form):
@@ -208,7 +220,7 @@ class ViewIssue(DetailView, FormMixin):
         # return HttpResponseRedirect(new_comment.get_absolute_url())
 
 
-class SearchIssues(FormView):
+class SearchIssues(UserFormMixin, FormView):
     form_class = forms.SearchForm
     template_name = 'search.html'
     success_url = '/issue/search/'
@@ -301,24 +313,53 @@ def AddUserCountsToContext(context, user):
 
     This work serves to add various different counts to the context so that
     the left sidebar can display the counts specific to each user.  Please note
-    that this method adds 4 new elements to the context dict.
+    that this method adds 4 new elements to the context dict.  The counts come
+    from the counters cache and cost at most one aggregate query.
 
     Args:
       context: The context dictionary for the request.
       user: The use object provided with the request.
     """
-    context['Asscount'] = it_models.Issue.objects.filter(
-        assignee=user
-    ).filter(status__in=[x[0] for x in it_models.OPEN_STATUSES]).count()
-    context['Repcount'] = it_models.Issue.objects.filter(
-        reporter=user
-    ).order_by('-pk').count()
-    context['Clocount'] = it_models.Issue.objects.filter(
-        status__in=[x[0] for x in it_models.CLOSED_STATUSES]
-    ).order_by(
-        '-closed_date'
-    ).count()
-    context['Vercount'] = it_models.Issue.objects.filter(
-        verifier=user
-    ).order_by('-pk').count()
+    counts = counters.get_issue_counts(user)
+    context['Asscount'] = counts['assigned']
+    context['Repcount'] = counts['reported']
+    context['Clocount'] = counts['closed']
+    context['Vercount'] = counts['verified']
 
+
+def _autocomplete_page(request, queryset, label_field):
+    """Return one page of {'id', 'text'} matches for the typeahead widgets.
+
+    Matching is a plain prefix match on the label (startswith), so the
+    database can answer it from the index on that column.
+    """
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    prefix = request.GET.get('q', '').strip()
+    if prefix:
+        queryset = queryset.filter(**{label_field + '__startswith': prefix})
+    start = (page - 1) * AUTOCOMPLETE_PAGE_SIZE
+    # One extra row tells whether there is another page.
+    rows = queryset.order_by(label_field).values_list('pk', label_field)
+    rows = list(rows[start:start + AUTOCOMPLETE_PAGE_SIZE + 1])
+    return JsonResponse({
+        'results': [{'id': pk, 'text': label} for pk, label in rows[:AUTOCOMPLETE_PAGE_SIZE]],
+        'more': len(rows) > AUTOCOMPLETE_PAGE_SIZE,
+    })
+
+
+def autocomplete_projects(request):
+    """Typeahead over the projects the requesting user belongs to."""
+    return _autocomplete_page(request, forms.user_projects(request.user), 'title')
+
+
+def autocomplete_users(request):
+    """Typeahead over the members of the requesting user's projects.
+
+    ?project=<id> narrows it down to the members of one of those projects.
+    """
+    project = request.GET.get('project', '')
+    users = forms.project_members(request.user, project if project.isdigit() else None)
+    return _autocomplete_page(request, users, 'username')
@@ -1,62 +1,122 @@
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
-from rest_framework import viewsets, filters
+from rest_framework import permissions
+from rest_framework import viewsets
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.templatetags.rest_framework import replace_query_param
+from issue_tracker import search
+from issue_tracker.pagination import KeysetPaginationMixin
+from issue_tracker.renderers import LiteJSONRenderer
 import models as it_models
 import serializers
 
+# Everything IssueSerializer follows, loaded up front instead of per issue.
+ISSUE_QUERYSET = it_models.Issue.objects.select_related(
+    'reporter', 'assignee', 'verifier', 'project').prefetch_related(
+    'reporter__groups', 'assignee__groups', 'verifier__groups')
 
-class UserViewSet(viewsets.ModelViewSet):
+
+class IssueRepresentationMixin(object):
+    """Serves the flat IssueLiteSerializer on ?format=lite or ?fields=a,b.
+
+    Writes always go through the full serializer.
+    """
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (LiteJSONRenderer,)
+
+    def wants_lite(self):
+        if self.request.method not in permissions.SAFE_METHODS:
+            return False
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return isinstance(renderer, LiteJSONRenderer) or 'fields' in self.request.query_params
+
+    def get_queryset(self):
+        queryset = super(IssueRepresentationMixin, self).get_queryset()
+        if self.wants_lite():
+            # The lite representation does not list the users' groups.
+            queryset = queryset.prefetch_related(None)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.wants_lite():
+            return serializers.IssueLiteSerializer
+        return super(IssueRepresentationMixin, self).get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.request.query_params.get('fields')
+        if fields and self.wants_lite():
+            kwargs['fields'] = [field.strip() for field in fields.split(',')]
+        return super(IssueRepresentationMixin, self).get_serializer(*args, **kwargs)
+
+
+class UserViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows users to be viewed or edited.
     """
-    queryset = User.objects.all()
+    queryset = User.objects.prefetch_related('groups')
     serializer_class = serializers.UserSerializer
 
 
-class IssueViewSet(viewsets.ModelViewSet):
+class IssueViewSet(IssueRepresentationMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows issues to be viewed or edited.
     """
-    queryset = it_models.Issue.objects.all()
+    queryset = ISSUE_QUERYSET
     serializer_class = serializers.IssueSerializer
+    since_field = 'modified_date'
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows comments to be viewed or edited.
     """
     queryset = it_models.IssueComment.objects.all()
     serializer_class = serializers.CommentSerializer
+    since_field = 'modified_date'
 
 
-class IssueViewSetRO(viewsets.ReadOnlyModelViewSet):
+class IssueViewSetRO(IssueRepresentationMixin, KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     """
     Obtain a list of issues that meet a certain set of search criteria
+
+    ?search= matches the title, description and comment text through the search
+    index, best match first, a page at a time (?page= and ?page_size=).  Those
+    pages look like every other list, {"next": <url or null>, "results": [...]},
+    with the next page number in the next link.
     """
-    queryset = it_models.Issue.objects.all()
+    queryset = ISSUE_QUERYSET
     serializer_class = serializers.IssueSerializer
-    filter_backends = (filters.SearchFilter,)
-    search_fields = (
-        'id',
-        'title',
-        'issue_type',
-        'status',
-        'priority',
-        'project',
-        'reporter',
-        'assignee',
-        'verifier'
-    )
-
-class IssueStatusViewSet(viewsets.ModelViewSet):
-    queryset = it_models.Issue.objects.all()
+    since_field = 'modified_date'
+
+    def list(self, request, *args, **kwargs):
+        text = request.query_params.get('search')
+        if text is None:
+            return super(IssueViewSetRO, self).list(request, *args, **kwargs)
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', search.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return Response({'detail': 'page and page_size must be integers.'}, status=400)
+        result = search.search_issues(text, page=page, page_size=page_size)
+        issues = self.get_queryset().in_bulk(result.ids)
+        ranked = [issues[pk] for pk in result.ids if pk in issues]
+        serializer = self.get_serializer(ranked, many=True)
+        next_url = None
+        if result.number * result.page_size < result.total:
+            next_url = replace_query_param(request.build_absolute_uri(), 'page', result.number + 1)
+        return Response({'next': next_url, 'results': serializer.data})
+
+class IssueStatusViewSet(IssueRepresentationMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
+    queryset = ISSUE_QUERYSET
     serializer_class = serializers.IssueSerializer
+    since_field = 'modified_date'
 
-class IssuePriorityViewSet(viewsets.ModelViewSet):
-    queryset = it_models.Issue.objects.all()
+class IssuePriorityViewSet(IssueRepresentationMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
+    queryset = ISSUE_QUERYSET
     serializer_class = serializers.IssueSerializer
+    since_field = 'modified_date'
 
-class EditIssueMultipleFieldsViewSet(viewsets.ModelViewSet):
-    queryset = it_models.Issue.objects.all()
+class EditIssueMultipleFieldsViewSet(IssueRepresentationMixin, KeysetPaginationMixin, viewsets.ModelViewSet):
+    queryset = ISSUE_QUERYSET
     serializer_class = serializers.IssueSerializer
+    since_field = 'modified_date'
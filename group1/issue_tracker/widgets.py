@@ -0,0 +1,45 @@
+"""Form widgets used by the issue tracker."""
+from django import forms
+from django.core.urlresolvers import reverse
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+
+class AutocompleteSelect(forms.Widget):
+    """Typeahead stand-in for a Select over a large table.
+
+    Renders a hidden input holding the chosen primary key and a text box that
+    looks up matches at the named autocomplete URL (see static/js/autocomplete.js).
+    Only the selected object is read, to show its label, so the page does not
+    grow with the table.  Pair it with a ModelChoiceField, which validates the
+    submitted key with a single lookup.
+    """
+
+    def __init__(self, url_name, model, label_field, attrs=None):
+        super(AutocompleteSelect, self).__init__(attrs)
+        self.url_name = url_name
+        self.model = model
+        self.label_field = label_field
+
+    def get_label(self, value):
+        if value in (None, ''):
+            return ''
+        labels = self.model._default_manager.filter(pk=value).values_list(self.label_field, flat=True)
+        return labels.first() or ''
+
+    def render(self, name, value, attrs=None):
+        final_attrs = self.build_attrs(attrs, type='hidden', name=name)
+        if value not in (None, ''):
+            final_attrs['value'] = value
+        text_attrs = {
+            'type': 'text',
+            'class': 'autocomplete',
+            'autocomplete': 'off',
+            'data-autocomplete-url': reverse(self.url_name),
+            'data-target': final_attrs.get('id', ''),
+            'value': self.get_label(value),
+        }
+        if 'id' in final_attrs:
+            text_attrs['id'] = final_attrs['id'] + '_text'
+        return format_html('<input{0} /><input{1} />', flatatt(final_attrs), flatatt(text_attrs))
+
@@ -0,0 +1,6 @@
+from requirements.models import report_queue
+
+
+def render_report(message):
+    # Jobs queued by report_queue.dispatch when REPORT_WORKER is 'channels'.
+    report_queue.run_job(message.content['job_id'])
@@ -0,0 +1,82 @@
+"""Time sign in under a simulated credential stuffing attack.
+
+THIS SCRIPT IS FOR DEVELOPMENT PURPOSES ONLY.
+
+Posts wrong passwords for a set of usernames from a set of addresses to the
+sign in view, interleaved with sign ins of a legitimate user from an address of
+their own, and prints the attempt throughput, how many attempts were blocked
+before reaching the password check, and the latency seen by the legitimate
+user.  The users are created in a transaction that is rolled back at the end.
+
+To run:
+        python manage.py benchmark_login_ratelimit --attempts 2000
+"""
+import optparse
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from requirements import ratelimit
+
+
+class Command(BaseCommand):
+    """A command for benchmarking the sign in rate limiter."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--attempts', action='store', type='int',
+            dest='attempts', default=2000,
+            help='The number of attacking sign in attempts.'),
+        optparse.make_option(
+            '--addresses', action='store', type='int',
+            dest='addresses', default=50,
+            help='The number of addresses the attack comes from.'),
+        optparse.make_option(
+            '--usernames', action='store', type='int',
+            dest='usernames', default=20,
+            help='The number of usernames attacked.'),
+        optparse.make_option(
+            '--legitimate-every', action='store', type='int',
+            dest='legitimate_every', default=50,
+            help='Sign the legitimate user in once per this many attacking attempts.'),
+        )
+
+    def _post(self, client, ip, username, password):
+        start = time.time()
+        response = client.post('/signin', {'username': username, 'password': password, 'next': ''},
+                               REMOTE_ADDR=ip, HTTP_HOST='localhost')
+        return response, time.time() - start
+
+    def handle(self, *args, **options):
+        ratelimit.get_cache().clear()
+        with transaction.atomic():
+            for i in xrange(options['usernames']):
+                User.objects.create_user(username='victim%d' % i, password='secret%d' % i)
+            User.objects.create_user(username='legitimate', password='secret')
+            client = Client()
+            blocked = 0
+            attack_time = 0.0
+            legitimate = []
+            for i in xrange(options['attempts']):
+                ip = '10.0.%d.%d' % divmod(i % options['addresses'], 256)
+                response, elapsed = self._post(client, ip, 'victim%d' % (i % options['usernames']), 'guess%d' % i)
+                attack_time += elapsed
+                blocked += 'signin after' in response.content and 'incorrect' not in response.content
+                if i % options['legitimate_every'] == 0:
+                    response, elapsed = self._post(client, '192.168.0.1', 'legitimate', 'secret')
+                    if response.status_code == 302:
+                        legitimate.append(elapsed)
+            transaction.set_rollback(True)
+        ratelimit.get_cache().clear()
+
+        self.stdout.write('%d attempts from %d addresses on %d usernames' % (
+            options['attempts'], options['addresses'], options['usernames']))
+        self.stdout.write('attack throughput:    %.0f attempts/s' % (options['attempts'] / attack_time))
+        self.stdout.write('blocked early:        %d (%.0f%%)' % (blocked, 100.0 * blocked / options['attempts']))
+        if legitimate:
+            self.stdout.write('legitimate sign ins:  %d, %.1f ms on average' % (
+                len(legitimate), 1000 * sum(legitimate) / len(legitimate)))
+        else:
+            self.stdout.write('legitimate sign ins:  none succeeded')
@@ -0,0 +1,89 @@
+"""Time the PDF project report on a large generated project.
+
+THIS SCRIPT IS FOR DEVELOPMENT PURPOSES ONLY.
+
+Creates a project with the requested number of stories spread over its
+iterations and the icebox, each with a few tasks, renders the full report
+into a temporary file and prints the time, query count, peak memory and size.
+Everything runs in a transaction that is rolled back at the end.
+
+To run:
+        python manage.py benchmark_pdf_report --stories 5000
+"""
+import datetime
+import optparse
+import resource
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db import transaction
+from django.test.utils import CaptureQueriesContext
+from reportlab.platypus import SimpleDocTemplate
+from requirements.models import filemaker
+from requirements.models.iteration import Iteration
+from requirements.models.project import Project
+from requirements.models.story import Story
+from requirements.models.task import Task
+
+REPORT_OPTIONS = ('iteration_description', 'iteration_duration', 'story_description', 'story_reason',
+                  'story_test', 'story_task', 'story_owner', 'story_hours', 'story_status',
+                  'story_points', 'pie_chart')
+
+
+class Command(BaseCommand):
+    """A command for benchmarking the PDF report."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--stories', action='store', type='int',
+            dest='stories', default=5000,
+            help='The number of stories in the generated project.'),
+        optparse.make_option(
+            '--iterations', action='store', type='int',
+            dest='iterations', default=10,
+            help='The number of iterations in the generated project.'),
+        optparse.make_option(
+            '--tasks', action='store', type='int',
+            dest='tasks', default=3,
+            help='The number of tasks per story.'),
+        )
+
+    def _create_project(self, options):
+        owner = User.objects.order_by('id').first()
+        project = Project.objects.create(title='Benchmark project', description='Generated for benchmarking')
+        today = datetime.date.today()
+        iterations = [Iteration.objects.create(title='Iteration %d' % i, description='Iteration description',
+                                               start_date=today, end_date=today, project=project)
+                      for i in xrange(options['iterations'])]
+        slots = [None] + iterations
+        Story.objects.bulk_create(
+            Story(title='Story %d' % i, description='As a user I want story %d to be done' % i,
+                  reason='Because', test='It works', hours=i % 8, status=i % 4 + 1, points=i % 5,
+                  project=project, owner=owner, iteration=slots[i % len(slots)])
+            for i in xrange(options['stories']))
+        Task.objects.bulk_create(
+            Task(story_id=story_id, description='Task %d' % i)
+            for story_id in Story.objects.filter(project=project).values_list('id', flat=True)
+            for i in xrange(options['tasks']))
+        return project
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            project = self._create_project(options)
+            report = tempfile.TemporaryFile()
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            with CaptureQueriesContext(connection) as queries:
+                start = time.time()
+                filemaker.process_pdf(SimpleDocTemplate(report), str(project.id),
+                                      dict((option, True) for option in REPORT_OPTIONS))
+                elapsed = time.time() - start
+            rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.stdout.write('%d stories, %d tasks each' % (options['stories'], options['tasks']))
+            self.stdout.write('time:         %.1fs' % elapsed)
+            self.stdout.write('queries:      %d' % len(queries))
+            self.stdout.write('peak RSS:     +%d KiB' % (rss_after - rss_before))
+            self.stdout.write('report size:  %d KiB' % (report.tell() / 1024))
+            transaction.set_rollback(True)
@@ -0,0 +1,78 @@
+"""Time the project membership lookup behind the dashboard and the sidebar.
+
+THIS SCRIPT IS FOR DEVELOPMENT PURPOSES ONLY.
+
+Creates the requested number of projects spread over a set of users, then
+times, for one of those users, the old `users__id__contains` filter, the join
+on user_id and the memberships with their projects, and counts the projects the old filter
+wrongly matched.  Everything runs in a transaction that is rolled back at the
+end.
+
+To run:
+        python manage.py benchmark_project_memberships --projects 10000
+"""
+import optparse
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from requirements.models import user_association
+from requirements.models import user_manager
+from requirements.models.project import Project
+from requirements.models.user_association import UserAssociation
+
+
+class Command(BaseCommand):
+    """A command for benchmarking the project membership lookup."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--projects', action='store', type='int',
+            dest='projects', default=10000,
+            help='The number of generated projects.'),
+        optparse.make_option(
+            '--users', action='store', type='int',
+            dest='users', default=200,
+            help='The number of users the projects are spread over.'),
+        optparse.make_option(
+            '--repeat', action='store', type='int',
+            dest='repeat', default=20,
+            help='The number of timed lookups of each kind.'),
+        )
+
+    def _time(self, repeat, lookup):
+        start = time.time()
+        for i in xrange(repeat):
+            result = lookup()
+        return (time.time() - start) / repeat, result
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            first = User.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            User.objects.bulk_create(User(username='bench%d' % (first + i), password='!')
+                                     for i in xrange(options['users']))
+            user_ids = list(User.objects.filter(id__gt=first).values_list('id', flat=True))
+            Project.objects.bulk_create(Project(title='Project %05d' % i, description='Generated')
+                                        for i in xrange(options['projects']))
+            project_ids = Project.objects.order_by('-id').values_list('id', flat=True)[:options['projects']]
+            UserAssociation.objects.bulk_create(
+                UserAssociation(user_id=user_ids[i % len(user_ids)], project_id=project_id,
+                                role=user_association.ROLE_OWNER)
+                for i, project_id in enumerate(project_ids))
+            # A one digit id is contained in the most other ids.
+            user_id = min(user_ids, key=lambda uid: len(str(uid)))
+
+            old, old_projects = self._time(options['repeat'], lambda: list(
+                Project.objects.filter(users__id__contains=user_id)))
+            join, projects = self._time(options['repeat'], lambda: list(
+                Project.objects.filter(userassociation__user_id=user_id).order_by('title', 'id')))
+            memberships, _ = self._time(options['repeat'], lambda: user_manager.get_memberships(user_id))
+            transaction.set_rollback(True)
+
+        self.stdout.write('%d projects over %d users, user %d is in %d of them' % (
+            options['projects'], options['users'], user_id, len(projects)))
+        self.stdout.write('users__id__contains:  %7.2f ms, %d projects (%d wrong)' % (
+            1000 * old, len(old_projects), len(set(old_projects) - set(projects))))
+        self.stdout.write('join on user_id:      %7.2f ms' % (1000 * join))
+        self.stdout.write('memberships:          %7.2f ms' % (1000 * memberships))
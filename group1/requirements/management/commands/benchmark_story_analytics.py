@@ -0,0 +1,92 @@
+"""Time the burndown, velocity and cycle time figures on a large status log.
+
+THIS SCRIPT IS FOR DEVELOPMENT PURPOSES ONLY.
+
+Creates a project whose stories are spread over its iterations and walk
+through the statuses, writing the requested number of status changes, then
+times computing the figures of every iteration from scratch and again from
+the cache.  Everything runs in a transaction that is rolled back at the end.
+
+To run:
+        python manage.py benchmark_story_analytics --transitions 100000
+"""
+import datetime
+import optparse
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db import transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from requirements.models import analytics
+from requirements.models import iteration_stats
+from requirements.models.iteration import Iteration
+from requirements.models.project import Project
+from requirements.models.story import Story
+from requirements.models.story_history import StoryStatusChange
+
+# The changes of every generated story.
+STATUS_WALK = ((None, Story.STATUS_UNSTARTED),
+               (Story.STATUS_UNSTARTED, Story.STATUS_STARTED),
+               (Story.STATUS_STARTED, Story.STATUS_COMPLETED),
+               (Story.STATUS_COMPLETED, Story.STATUS_ACCEPTED))
+
+
+class Command(BaseCommand):
+    """A command for benchmarking the iteration analytics."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--transitions', action='store', type='int',
+            dest='transitions', default=100000,
+            help='The number of status changes in the generated project.'),
+        optparse.make_option(
+            '--iterations', action='store', type='int',
+            dest='iterations', default=20,
+            help='The number of two week iterations in the generated project.'),
+        )
+
+    def _create_project(self, options):
+        project = Project.objects.create(title='Benchmark project', description='Generated for benchmarking')
+        first = datetime.date.today() - datetime.timedelta(days=14 * options['iterations'])
+        iterations = [Iteration.objects.create(title='Iteration %d' % i, project=project,
+                                               start_date=first + datetime.timedelta(days=14 * i),
+                                               end_date=first + datetime.timedelta(days=14 * i + 13))
+                      for i in xrange(options['iterations'])]
+        stories = options['transitions'] // len(STATUS_WALK)
+        Story.objects.bulk_create(
+            Story(title='Story %d' % i, status=Story.STATUS_ACCEPTED, points=i % 5 + 1, belong='ITERATION',
+                  project=project, iteration=iterations[i % len(iterations)])
+            for i in xrange(stories))
+        changes = []
+        for i, (story_id, iteration_id) in enumerate(
+                Story.objects.filter(project=project).values_list('id', 'iteration_id')):
+            iteration = iterations[i % len(iterations)]
+            start = timezone.make_aware(datetime.datetime.combine(iteration.start_date, datetime.time()),
+                                        timezone.utc)
+            for step, (from_status, to_status) in enumerate(STATUS_WALK):
+                changes.append(StoryStatusChange(
+                    story_id=story_id, project=project, iteration_id=iteration_id,
+                    from_status=from_status, to_status=to_status,
+                    changed_at=start + datetime.timedelta(hours=(i % 13) * 24 + step * (i % 7 + 1) * 6)))
+        StoryStatusChange.objects.bulk_create(changes, batch_size=500)
+        iteration_stats.rebuild_iteration_stats(project.id)
+        return project, iterations, len(changes)
+
+    def _time(self, label, function):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.time()
+            function()
+            elapsed = time.time() - start
+        self.stdout.write('%-10s %8.1f ms  %d queries' % (label, elapsed * 1000, len(queries)))
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            project, iterations, changes = self._create_project(options)
+            self.stdout.write('%d status changes over %d iterations' % (changes, len(iterations)))
+            cache.clear()
+            self._time('cold:', lambda: analytics.get_velocity(project))
+            self._time('cached:', lambda: analytics.get_velocity(project))
+            transaction.set_rollback(True)
@@ -0,0 +1,55 @@
+"""Merge duplicate user associations before the (user, project) constraint.
+
+Older databases may hold several UserAssociation rows for the same user and
+project.  This keeps the one granting the most permissions (the oldest of
+those) and deletes the others, so that the unique constraint can be applied.
+Run it before `manage.py migrate` on such a database.
+
+To run:
+        python manage.py dedupe_user_associations
+"""
+import optparse
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from requirements.models import user_association
+from requirements.models.user_association import UserAssociation
+
+
+def _rank(association):
+    return (-len(user_association.get_role_permission_set(association.role)), association.id)
+
+
+def dedupe_user_associations():
+    """Delete the duplicate associations and return how many were deleted."""
+    duplicated = (UserAssociation.objects.values('user_id', 'project_id')
+                  .annotate(rows=Count('id')).filter(rows__gt=1))
+    extra_ids = []
+    for pair in duplicated:
+        associations = sorted(UserAssociation.objects.filter(user_id=pair['user_id'],
+                                                             project_id=pair['project_id']),
+                              key=_rank)
+        extra_ids.extend(association.id for association in associations[1:])
+    # post_delete is sent for each row, which drops the cached memberships.
+    UserAssociation.objects.filter(id__in=extra_ids).delete()
+    return len(extra_ids)
+
+
+class Command(BaseCommand):
+    """A command for merging duplicate user associations."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--dry-run', action='store_true',
+            dest='dry_run', default=False,
+            help='Report the duplicates without deleting them.'),
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            removed = dedupe_user_associations()
+            if options['dry_run']:
+                transaction.set_rollback(True)
+        self.stdout.write('%s %d duplicate user associations.' % (
+            'Found' if options['dry_run'] else 'Removed', removed))
@@ -0,0 +1,28 @@
+"""Recompute the story totals of every iteration, icebox and backlog.
+
+The totals follow each story save and delete by themselves.  Run this after
+loading stories with bulk operations or raw SQL, or when a database from
+before IterationStats existed is migrated.
+
+To run:
+        python manage.py rebuild_iteration_stats [--project <id>]
+"""
+import optparse
+
+from django.core.management.base import BaseCommand
+from requirements.models import iteration_stats
+
+
+class Command(BaseCommand):
+    """A command for rebuilding the iteration totals."""
+
+    option_list = BaseCommand.option_list + (
+        optparse.make_option(
+            '--project', action='store', type='int',
+            dest='project', default=None,
+            help='Only rebuild the totals of this project.'),
+        )
+
+    def handle(self, *args, **options):
+        rows = iteration_stats.rebuild_iteration_stats(options['project'])
+        self.stdout.write('Rebuilt %d iteration totals.' % rows)
@@ -5,7 +5,9 @@ from requirements.models.user_association import UserAssociation
 import requirements.models.user_manager
 from requirements.models.iteration import Iteration
 import requirements.models.iteration
+from requirements.models.iteration_stats import IterationStats
+from requirements.models.story_history import StoryStatusChange
 from requirements.models.files import ProjectFile
 from requirements.models.story_comment import StoryComment
-from requirements.models.ip import IPaddress
 from requirements.models.filemaker import PDF
+from requirements.models.report_job import ReportJob
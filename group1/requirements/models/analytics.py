@@ -0,0 +1,262 @@
+"""Burndown, velocity and cycle time of iterations, from the status change log.
+
+The stories of a set of iterations and their status changes are loaded with
+two queries into NumPy arrays, and every figure is computed with array
+operations over them rather than story by story:
+
+  * burndown: the points of the iteration's stories not yet completed at the
+    end of each day of the iteration;
+  * velocity: the points completed by the end of the iteration (by today
+    while it runs), against the points committed to it;
+  * cycle time: the days from a story first being started to it first being
+    completed, as percentiles and a histogram.
+
+The stories of an iteration are those in it now and those with changes
+logged while they were in it, and only those logged changes count for it, so
+moving a story out later does not rewrite the iteration's past figures.  A
+story counts as done once it is Completed or Accepted, and with the points it
+has now.  Stories without changes logged in the iteration count with their
+current status from the first day.
+
+The figures of an iteration are cached under its IterationStats revision,
+which every story save, move or delete touching the iteration bumps, so they
+are only recomputed after a change.
+"""
+import calendar
+import datetime
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from iteration import Iteration
+from iteration_stats import BUCKET_ITERATION
+from iteration_stats import IterationStats
+from story import Story
+from story_history import StoryStatusChange
+
+DAY = 24 * 60 * 60
+
+# Change times as seconds since the epoch, computed by the database. Parsing
+# the datetimes in Python takes longer than all the figures together.
+EPOCH_SQL = {
+    'sqlite': "CAST(strftime('%%%%s', %s) AS INTEGER)",
+    'postgresql': 'EXTRACT(EPOCH FROM %s)',
+}
+
+# Upper bounds of the cycle time histogram buckets, in days; the last bucket
+# holds everything longer.
+CYCLE_TIME_BINS = (1, 2, 3, 5, 8, 13, 21)
+
+# Entries are keyed by revision, this only bounds how long stale ones stay.
+ANALYTICS_CACHE_TIMEOUT = 24 * 60 * 60
+
+# The number of finished iterations the average velocity is taken over.
+VELOCITY_WINDOW = 3
+
+
+def _timestamp(value):
+    """Seconds since the epoch of an aware datetime, or of midnight UTC of a date."""
+    if isinstance(value, datetime.datetime):
+        return calendar.timegm(value.utctimetuple())
+    return calendar.timegm(value.timetuple())
+
+
+def _cache_key(iteration, revision, today):
+    return 'requirements:analytics:%d:%d:%s:%s:%s' % (
+        iteration.id, revision, iteration.start_date, iteration.end_date, today)
+
+
+class IterationData(object):
+    """The stories of some iterations and their status changes, as arrays.
+
+    story_* are indexed by (iteration, story) pair, ordered by iteration and
+    story, as a story may have been in several of the iterations; change_* by
+    status change, ordered by iteration, story and time.  A missing
+    from_status is -1.
+    """
+
+    def __init__(self, iterations):
+        ids = [iteration.id for iteration in iterations]
+        stories = list(Story.objects.filter(iteration_id__in=ids)
+                       .values_list('iteration_id', 'id', 'points', 'status'))
+
+        # The iteration a change belongs to is the one it was logged in.
+        changes = (StoryStatusChange.objects.filter(iteration_id__in=ids)
+                   .order_by('iteration_id', 'story_id', 'changed_at', 'id'))
+        fields = ('iteration_id', 'story_id', 'story__points', 'story__status', 'from_status', 'to_status')
+        epoch_sql = EPOCH_SQL.get(connection.vendor)
+        if epoch_sql:
+            column = '%s.%s' % (connection.ops.quote_name(StoryStatusChange._meta.db_table),
+                                connection.ops.quote_name('changed_at'))
+            changes = changes.annotate(changed_epoch=RawSQL(epoch_sql % column, (), output_field=FloatField()))
+            # Read straight from the cursor; there is nothing to convert.
+            sql, params = changes.values_list(*(fields + ('changed_epoch',))).query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+        else:
+            rows = [row[:-1] + (_timestamp(row[-1]),)
+                    for row in changes.values_list(*(fields + ('changed_at',)))]
+        # A missing from_status becomes NaN here.
+        columns = np.array(rows, dtype=np.float64).reshape(-1, 7).T
+        self.change_iteration = columns[0].astype(np.int64)
+        self.change_story = columns[1].astype(np.int64)
+        self.change_from = np.where(np.isnan(columns[4]), -1, columns[4]).astype(np.int64)
+        self.change_to = columns[5].astype(np.int64)
+        self.change_time = columns[6]
+
+        # The stories in the iterations now, and those that left them.
+        pairs = np.concatenate([np.array(stories, dtype=np.int64).reshape(-1, 4),
+                                columns[:4].T.astype(np.int64)])
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        first = np.ones(len(pairs), dtype=bool)
+        first[1:] = (pairs[1:, 0] != pairs[:-1, 0]) | (pairs[1:, 1] != pairs[:-1, 1])
+        self.story_iterations, self.story_ids, self.story_points, self.story_status = pairs[first].T
+
+
+def _first_per_story(stories, mask):
+    """The story ids where mask holds, and the index of the first such change of each."""
+    selected = np.flatnonzero(mask)
+    ids, first = np.unique(stories[selected], return_index=True)
+    return ids, selected[first]
+
+
+def _distribution(days):
+    edges = (0,) + CYCLE_TIME_BINS + (np.inf,)
+    counts, _ = np.histogram(days, bins=edges)
+    labels = ['%d-%d' % (low, high) for low, high in zip(edges[:-2], CYCLE_TIME_BINS)]
+    labels.append('%d+' % CYCLE_TIME_BINS[-1])
+    distribution = {
+        'count': int(days.size),
+        'histogram': [{'days': label, 'stories': int(n)} for label, n in zip(labels, counts)],
+    }
+    if days.size:
+        p50, p85, p95 = np.percentile(days, [50, 85, 95])
+        distribution.update(mean=round(float(days.mean()), 2), p50=round(float(p50), 2),
+                            p85=round(float(p85), 2), p95=round(float(p95), 2))
+    else:
+        distribution.update(mean=None, p50=None, p85=None, p95=None)
+    return distribution
+
+
+def compute_iteration_analytics(iteration, data, today):
+    """Compute the figures of one iteration from the arrays of data.
+
+    Returns:
+      A dict of JSON types: the burndown per day (remaining is None for days
+      after today), the committed and completed points, and the cycle time
+      distribution of the iteration's stories.
+    """
+    in_iteration = data.story_iterations == iteration.id
+    story_ids = data.story_ids[in_iteration]
+    points = data.story_points[in_iteration]
+    status = data.story_status[in_iteration]
+
+    selected = data.change_iteration == iteration.id
+    change_story = data.change_story[selected]
+    change_from = data.change_from[selected]
+    change_to = data.change_to[selected]
+    change_time = data.change_time[selected]
+    change_points = points[np.searchsorted(story_ids, change_story)]
+    was_done = change_from >= Story.STATUS_COMPLETED
+    is_done = change_to >= Story.STATUS_COMPLETED
+
+    # Whether each story was done before its first logged change.
+    done_before = status >= Story.STATUS_COMPLETED
+    logged, first = _first_per_story(change_story, np.ones(change_story.size, dtype=bool))
+    done_before[np.searchsorted(story_ids, logged)] = was_done[first]
+
+    days = (iteration.end_date - iteration.start_date).days + 1
+    day_ends = _timestamp(iteration.start_date) + DAY * np.arange(1, days + 1)
+    # A change counts from the end of the day it happened on; earlier ones
+    # from the end of the first day.
+    day = np.searchsorted(day_ends, change_time, side='right')
+    within = day < days
+    delta = (is_done.astype(np.int64) - was_done) * change_points
+    done_by_day = (np.cumsum(np.bincount(day[within], weights=delta[within], minlength=days))
+                   + points[done_before].sum())
+    committed = int(points.sum())
+    remaining = committed - done_by_day
+
+    elapsed = min(days, max(0, (today - iteration.start_date).days + 1))
+    if elapsed:
+        completed = int(done_by_day[elapsed - 1])
+    else:
+        completed = int(points[done_before].sum())
+
+    started_ids, started = _first_per_story(change_story, change_to >= Story.STATUS_STARTED)
+    done_ids, done = _first_per_story(change_story, is_done)
+    common = np.intersect1d(started_ids, done_ids, assume_unique=True)
+    start_times = change_time[started[np.searchsorted(started_ids, common)]]
+    done_times = change_time[done[np.searchsorted(done_ids, common)]]
+    cycle_days = np.maximum(done_times - start_times, 0) / DAY
+
+    return {
+        'iteration': iteration.id,
+        'title': iteration.title,
+        'start_date': iteration.start_date.isoformat(),
+        'end_date': iteration.end_date.isoformat(),
+        'committed': committed,
+        'completed': completed,
+        'burndown': {
+            'days': [(iteration.start_date + datetime.timedelta(days=i)).isoformat() for i in xrange(days)],
+            'ideal': [round(float(value), 2) for value in np.linspace(committed, 0, days)],
+            'remaining': [int(value) for value in remaining[:elapsed]] + [None] * (days - elapsed),
+        },
+        'cycle_time': _distribution(cycle_days),
+    }
+
+
+def get_iteration_analytics(iterations, today=None):
+    """Return {iteration id: figures} for the iterations, from the cache when possible.
+
+    Args:
+      iterations: The iterations, which may belong to different projects.
+      today: The date the figures are taken on, today by default.
+    """
+    today = today or datetime.date.today()
+    iterations = list(iterations)
+    if not iterations:
+        return {}
+    revisions = dict(IterationStats.objects.filter(iteration__in=iterations, bucket=BUCKET_ITERATION)
+                     .values_list('iteration_id', 'revision'))
+    keys = dict((iteration.id, _cache_key(iteration, revisions.get(iteration.id, 0), today))
+                for iteration in iterations)
+    cached = cache.get_many(keys.values())
+    figures = dict((iteration.id, cached[keys[iteration.id]])
+                   for iteration in iterations if keys[iteration.id] in cached)
+    missing = [iteration for iteration in iterations if iteration.id not in figures]
+    if missing:
+        data = IterationData(missing)
+        computed = dict((iteration.id, compute_iteration_analytics(iteration, data, today))
+                        for iteration in missing)
+        cache.set_many(dict((keys[iteration_id], value) for iteration_id, value in computed.items()),
+                       ANALYTICS_CACHE_TIMEOUT)
+        figures.update(computed)
+    return figures
+
+
+def get_velocity(project, today=None):
+    """Return the committed and completed points of every iteration of the project.
+
+    The average is taken over the last VELOCITY_WINDOW iterations that ended
+    before today.
+    """
+    today = today or datetime.date.today()
+    iterations = list(Iteration.objects.filter(project_id=project.id).order_by('start_date', 'id'))
+    figures = get_iteration_analytics(iterations, today)
+    rows = []
+    for iteration in iterations:
+        row = dict((name, figures[iteration.id][name])
+                   for name in ('iteration', 'title', 'start_date', 'end_date', 'committed', 'completed'))
+        row['cycle_time_p50'] = figures[iteration.id]['cycle_time']['p50']
+        rows.append(row)
+    finished = np.array([figures[iteration.id]['completed'] for iteration in iterations
+                         if iteration.end_date < today][-VELOCITY_WINDOW:])
+    return {
+        'iterations': rows,
+        'average': round(float(finished.mean()), 2) if finished.size else None,
+    }
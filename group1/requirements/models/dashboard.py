@@ -0,0 +1,81 @@
+"""Per-project rollups shown on the dashboard.
+
+Every number for every project of a user comes from three grouped queries,
+one per table (iteration stats, issues, iterations), each joined on the user's
+associations, so the dashboard costs the same whether the user is in one
+project or a thousand.  Story totals are summed from the few IterationStats
+rows of each project rather than from its stories.
+"""
+import datetime
+
+from django.db.models import Count
+from django.db.models import Sum
+
+from issue_tracker.models import Issue
+from issue_tracker.models import OPEN_STATUSES
+from iteration import Iteration
+from iteration_stats import IterationStats
+from iteration_stats import STATUS_FIELDS
+from story import Story
+
+
+class ProjectSummary(object):
+    """The rollup of one project."""
+
+    def __init__(self):
+        self.status_counts = dict((status, 0) for status, label in Story.STATUS_CHOICES)
+        self.points = 0
+        self.hours = 0
+        self.open_issues = 0
+        self.current_iteration = None
+
+    @property
+    def story_count(self):
+        return sum(self.status_counts.values())
+
+    @property
+    def stories_by_status(self):
+        """(label, count) of every story status, in workflow order."""
+        return [(label, self.status_counts[status]) for status, label in Story.STATUS_CHOICES]
+
+
+def get_project_summaries(userID, today=None):
+    """Return {project id: ProjectSummary} for every project of the user.
+
+    Args:
+      userID: The user whose projects are summed up.
+      today: The date deciding the current iteration, today by default.
+    """
+    today = today or datetime.date.today()
+    summaries = {}
+
+    def summary(project_id):
+        if project_id not in summaries:
+            summaries[project_id] = ProjectSummary()
+        return summaries[project_id]
+
+    totals = dict((field, Sum(field)) for field in STATUS_FIELDS.values())
+    stats = (IterationStats.objects.filter(project__userassociation__user_id=userID)
+             .values('project_id')
+             .annotate(points=Sum('points'), hours=Sum('hours'), **totals)
+             .order_by())
+    for row in stats:
+        project = summary(row['project_id'])
+        for status, field in STATUS_FIELDS.items():
+            project.status_counts[status] = row[field] or 0
+        project.points = row['points'] or 0
+        project.hours = row['hours'] or 0
+
+    issues = (Issue.objects.filter(project__userassociation__user_id=userID,
+                                   status__in=[status for status, label in OPEN_STATUSES])
+              .values('project_id').annotate(open_issues=Count('id')).order_by())
+    for row in issues:
+        summary(row['project_id']).open_issues = row['open_issues']
+
+    # When iterations overlap the one started last is the current one.
+    iterations = Iteration.objects.filter(project__userassociation__user_id=userID,
+                                          start_date__lte=today,
+                                          end_date__gte=today).order_by('start_date', 'id')
+    for iteration in iterations:
+        summary(iteration.project_id).current_iteration = iteration
+    return summaries
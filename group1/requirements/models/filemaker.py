@@ -6,6 +6,7 @@ from iteration import Iteration
 from user_association import UserAssociation
 from django.http import HttpResponse
 
+from requirements.models import analytics
 from requirements.models import project_api
 from requirements.models import task
 from project import Project
@@ -15,6 +16,7 @@ from reportlab.lib.styles import ParagraphStyle
 from reportlab.platypus import Paragraph
 
 from reportlab.lib import colors
+from reportlab.graphics.charts.lineplots import LinePlot
 from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.shapes import Line
 from reportlab.graphics.shapes import Drawing
@@ -23,6 +25,23 @@ from reportlab.graphics.shapes import Drawing
 
 
 
+# The PDF flags, in the order they appear on the report dialog.
+REPORT_OPTIONS = (
+    'iteration_description',
+    'iteration_duration',
+    'story_description',
+    'story_reason',
+    'story_test',
+    'story_task',
+    'story_owner',
+    'story_hours',
+    'story_status',
+    'story_points',
+    'pie_chart',
+    'burndown_chart',
+)
+
+
 class PDF(ProjMgmtBase):
     iteration_description = models.BooleanField(default = True)
     iteration_duration = models.BooleanField(default = True)
@@ -35,6 +54,7 @@ class PDF(ProjMgmtBase):
     story_status = models.BooleanField(default = True)
     story_points = models.BooleanField(default = True)
     pie_chart = models.BooleanField(default = True)
+    burndown_chart = models.BooleanField(default = False)
 
     class Meta:
         app_label = 'requirements'
@@ -92,6 +112,68 @@ class PDF(ProjMgmtBase):
 #         return "None5"
 
 #--------------Below are PDF makers:----------------
+# Stories are turned into flowables this many at a time while the document is
+# being laid out, so big projects are never held as one huge flowable list.
+STORY_CHUNK_SIZE = 50
+
+_style_dic = None
+
+
+class ReportData(object):
+    """Everything a project report shows, loaded with a fixed number of queries.
+
+    stories maps an iteration id, or None for the icebox, to its stories in id
+    order.  Story owners are selected with the stories, and their tasks are
+    prefetched when the report lists tasks.
+    """
+
+    def __init__(self, ProjectID, args):
+        self.project = project_api.get_project(ProjectID)
+        self.iterations = list(project_api.get_iterations_for_project(self.project).order_by('id'))
+        self.stories = dict((iteration.id, []) for iteration in self.iterations)
+        self.stories[None] = []
+        stories = Story.objects.filter(project=self.project).order_by('id')
+        if args['story_owner']:
+            stories = stories.select_related('owner')
+        if args['story_task']:
+            stories = stories.prefetch_related('task_set')
+        for story in stories:
+            self.stories.setdefault(story.iteration_id, []).append(story)
+
+    def story_counts(self):
+        return [len(self.stories[None])] + [len(self.stories[iteration.id]) for iteration in self.iterations]
+
+    def story_names(self):
+        return ['icebox'] + [iteration.title for iteration in self.iterations]
+
+
+class FlowableQueue(list):
+    """The flowable list handed to doc.build, filled up lazily.
+
+    Platypus consumes flowables from the front of the list and checks len()
+    before each one, so topping the list up there keeps only a few chunks of
+    flowables alive at any time.
+
+    This relies on BaseDocTemplate.build looping on `while len(flowables)` and
+    deleting flowables[0] in place, as verified with reportlab 2.7, the version
+    pinned in docker/prereqs/dependencies.txt, and 3.5.  Check it again, with
+    test_filemaker, before upgrading reportlab: a build that iterated over the
+    list instead would silently stop after the first chunks.
+    """
+
+    def __init__(self, chunks):
+        super(FlowableQueue, self).__init__()
+        self._chunks = iter(chunks)
+
+    def __len__(self):
+        while self._chunks is not None and list.__len__(self) < STORY_CHUNK_SIZE:
+            try:
+                self.extend(next(self._chunks))
+            except StopIteration:
+                self._chunks = None
+        return list.__len__(self)
+
+
 def make_Project_Statement(content, Project):
     try:
         styles = get_style_dic()
@@ -153,7 +235,8 @@ def make_Stories_Statement(content, stories, args):
         return "None5"
 
 def make_Task_Statment(content, story):
-    tasks = task.get_tasks_for_story(story)
+    # Uses the tasks prefetched by ReportData instead of a query per story.
+    tasks = story.task_set.all()
     styles = get_style_dic()
     content.append(Paragraph("Task:", styles['storyNormal']))
     i = 1
@@ -161,97 +244,98 @@ def make_Task_Statment(content, story):
         content.append(Paragraph(str(i)+". "+t.description, styles['taskNormal']))
         i = i+1
 
-def get_story_count_list(ProjectID):
-    count = []
-    try:
-        project = project_api.get_project(ProjectID)
-
-        count.append(project_api.get_stories_with_no_iteration(project).count())
+def _stories_in_chunks(content, stories, args):
+    for start in xrange(0, len(stories), STORY_CHUNK_SIZE):
+        make_Stories_Statement(content, stories[start:start + STORY_CHUNK_SIZE], args)
+        yield content
+        content = []
+    if content:
+        yield content
 
-        iterations = project_api.get_iterations_for_project(project)
-        for iteration in iterations:
-            count.append(project_api.get_stories_for_iteration(iteration).count())
+def generate_report_chunks(data, args):
+    """Yield the report flowables a few stories at a time."""
+    styles = get_style_dic()
 
-        return count
-    except Exception as e:
-        return "None6"
+    content = []
+    make_Project_Statement(content, data.project)
+    add_Line(content)
+    content.append(Paragraph("IceBox", styles['iterTitle']))
+    for chunk in _stories_in_chunks(content, data.stories[None], args):
+        yield chunk
+    yield [Paragraph("", styles['iterSpace'])]
+
+    for iteration in data.iterations:
+        content = []
+        make_Iteration_Statement(content, iteration, args)
+        for chunk in _stories_in_chunks(content, data.stories[iteration.id], args):
+            yield chunk
+        yield [Paragraph("", styles['iterSpace'])]
+
+    if args['pie_chart']:
+        content = [Paragraph("&nbsp;", styles['bigSpace']),
+                   Paragraph("Stories Number In Iterations", styles['iterTitle'])]
+        draw_Pie(content, data)
+        yield content
+
+    # Reports queued before the option existed do not have it.
+    if args.get('burndown_chart'):
+        figures = analytics.get_iteration_analytics(data.iterations)
+        content = [Paragraph("&nbsp;", styles['bigSpace']),
+                   Paragraph("Burndown", styles['iterTitle'])]
+        for iteration in data.iterations:
+            make_Burndown_Statement(content, figures[iteration.id])
+        yield content
 
-def get_story_name_list(ProjectID):
-    name = ['icebox']
+def process_pdf(doc, ProjectID, args):
     try:
-        project = project_api.get_project(ProjectID)
-        iterations = project_api.get_iterations_for_project(project)
-        for iteration in iterations:
-            name.append(iteration.title)
-
-        return name
+        data = ReportData(ProjectID, args)
+        doc.build(FlowableQueue(generate_report_chunks(data, args)))
     except Exception as e:
-        return "None7"
+        return "None8"
 
-def process_pdf(doc, ProjectID, args):
-    try:
-        story = []
-        styles = get_style_dic()
+def _build_style_dic():
+    sheet = getSampleStyleSheet()
+    dic = {}
 
-        project = project_api.get_project(ProjectID)
-        make_Project_Statement(story, project)
-        add_Line(story)
+    dic['projTitle'] = ParagraphStyle('projTitle', parent=sheet['Heading1'])
+    dic['projDes'] = ParagraphStyle('projDes', parent=sheet['Italic'], fontSize=13)
 
-        story.append(Paragraph("IceBox", styles['iterTitle']))
-        make_Stories_Statement(story, project_api.get_stories_with_no_iteration(project), args)
-        story.append(Paragraph("", styles['iterSpace']))
+    dic['iterTitle'] = ParagraphStyle('iterTitle', parent=sheet['Heading2'], leading=10)
+    dic['iterDes'] = ParagraphStyle('iterDes', parent=sheet['Italic'], fontSize=11)
+    dic['iterNormal'] = ParagraphStyle('iterNormal', parent=sheet['Normal'], fontSize=9)
+    dic['iterSpace'] = ParagraphStyle('iterSpace', parent=sheet['Normal'], leading=40)
 
-        iterations = project_api.get_iterations_for_project(project)
-        for iteration in iterations:
-            make_Iteration_Statement(story, iteration, args)
-            make_Stories_Statement(story, project_api.get_stories_for_iteration(iteration), args)
-            story.append(Paragraph("", styles['iterSpace']))
+    dic['storyTitle'] = ParagraphStyle('storyTitle', parent=sheet['Heading2'],
+                                       leading=6, fontSize=11, leftIndent=30)
+    dic['storyDes'] = ParagraphStyle('storyDes', parent=sheet['Italic'],
+                                     fontSize=8, leading=10, leftIndent=30)
+    dic['storyNormal'] = ParagraphStyle('storyNormal', parent=sheet['Normal'], leftIndent=30)
+    dic['storySpace'] = ParagraphStyle('storySpace', parent=sheet['Normal'], leading=10)
 
-        if args['pie_chart']:
-            story.append(Paragraph("&nbsp;", styles['bigSpace']))
-            story.append(Paragraph("Stories Number In Iterations", styles['iterTitle']))
-            draw_Pie(story, ProjectID)
+    dic['taskNormal'] = ParagraphStyle('taskNormal', parent=sheet['Normal'], leftIndent=60)
 
-        doc.build(story)
-    except Exception as e:
-        return "None8"
+    dic['bigSpace'] = ParagraphStyle('bigSpace', parent=sheet['Normal'], leading=50)
+
+    return dic
 
 def get_style_dic():
-    dic = {}
+    """Return the report paragraph styles.
 
-    dic['projTitle'] = getSampleStyleSheet()['Heading1']
-    dic['projDes'] = getSampleStyleSheet()['Italic']
-    dic['projDes'].fontSize = 13
-
-    dic['iterTitle'] = getSampleStyleSheet()['Heading2']
-    dic['iterTitle'].leading = 10
-    dic['iterDes'] = getSampleStyleSheet()['Italic']
-    dic['iterDes'].fontSize = 11
-    dic['iterNormal'] = getSampleStyleSheet()['Normal']
-    dic['iterNormal'].fontSize = 9
-    dic['iterSpace'] = getSampleStyleSheet()['Normal']
-    dic['iterSpace'].leading = 40
-
-    dic['storyTitle'] = getSampleStyleSheet()['Heading2']
-    dic['storyTitle'].leading = 6
-    dic['storyTitle'].fontSize = 11
-    dic['storyTitle'].leftIndent = 30
-    dic['storyDes'] = getSampleStyleSheet()['Italic']
-    dic['storyDes'].fontSize = 8
-    dic['storyDes'].leading = 10
-    dic['storyDes'].leftIndent = 30
-    dic['storyNormal'] = getSampleStyleSheet()['Normal']
-    dic['storyNormal'].leftIndent = 30
-    dic['storySpace'] = getSampleStyleSheet()['Normal']
-    dic['storySpace'].leading = 10
-
-    dic['taskNormal'] = getSampleStyleSheet()['Normal']
-    dic['taskNormal'].leftIndent = 60
-
-    dic['bigSpace'] = getSampleStyleSheet()['Normal']
-    dic['bigSpace'].leading = 50
+    They are built on the first call and shared afterwards, so callers must not
+    modify them.
+    """
+    global _style_dic
+    if _style_dic is None:
+        _style_dic = _build_style_dic()
+    return _style_dic
 
-    return dic
+def make_Burndown_Statement(content, figures):
+    styles = get_style_dic()
+    summary = "%s: %d of %d points completed" % (figures['title'], figures['completed'], figures['committed'])
+    if figures['cycle_time']['p50'] is not None:
+        summary += ", median cycle time %.1f days" % figures['cycle_time']['p50']
+    content.append(Paragraph(summary, styles['iterNormal']))
+    draw_Burndown(content, figures['burndown'])
 
 def add_Line(story):
     d = Drawing(450, 10)
@@ -259,12 +343,12 @@ def add_Line(story):
     d.add(l)
     story.append(d)
 
-def draw_Pie(story, ProjectID):
+def draw_Pie(story, data):
     d = Drawing(140, 180)
     pie = Pie()
     pie.sideLabels = 1
-    pie.labels= get_story_name_list(ProjectID)
-    pie.data = get_story_count_list(ProjectID)
+    pie.labels = data.story_names()
+    pie.data = data.story_counts()
     pie.width = 140
     pie.height = 140
     pie.y = 0
@@ -272,3 +356,22 @@ def draw_Pie(story, ProjectID):
     d.add(pie)
     story.append(d)
 
+def draw_Burndown(story, burndown):
+    ideal = list(enumerate(burndown['ideal']))
+    remaining = [(day, points) for day, points in enumerate(burndown['remaining']) if points is not None]
+    if len(ideal) < 2:
+        return
+    d = Drawing(400, 120)
+    plot = LinePlot()
+    plot.x = 30
+    plot.y = 15
+    plot.width = 350
+    plot.height = 90
+    plot.data = [ideal] + ([remaining] if remaining else [])
+    plot.lines[0].strokeColor = colors.lightgrey
+    plot.lines[1].strokeColor = colors.blue
+    plot.xValueAxis.valueMin = 0
+    plot.xValueAxis.valueMax = len(ideal) - 1
+    plot.yValueAxis.valueMin = 0
+    d.add(plot)
+    story.append(d)
@@ -20,6 +20,13 @@ class ProjectFile(models.Model):
     def does_attachment_exist(self):
         return bool(self.file)
 
+    class Meta:
+        app_label = 'requirements'
+        # Not db_index: SQLite loses the deferred indexes of this table when the
+        # initial migration remakes requirements_project, while index_together
+        # is applied by an operation of its own afterwards.
+        index_together = (('uuid',),)
+
 
 def delete(fileUUID):
     try:
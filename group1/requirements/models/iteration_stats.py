@@ -0,0 +1,244 @@
+"""Story totals of every iteration, icebox and backlog, kept up to date.
+
+IterationStats holds one row per iteration of a project plus one for its
+icebox and one for its backlog, with the number of stories in each status and
+the summed points and hours of those stories.  The signal handlers below move
+a story's share from the row it was loaded in to the row it is saved in, in
+the same transaction as the story, so charts and sidebars read the totals of
+a list with a single indexed lookup instead of loading its stories.
+
+Bulk updates of stories do not send signals; run
+`manage.py rebuild_iteration_stats` after changing stories that way.
+"""
+from django.db import IntegrityError
+from django.db import models
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import Sum
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_init
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from iteration import Iteration
+from project import Project
+from story import Story
+
+BUCKET_ITERATION = Story.STORY_BELONGS_ITERATION
+BUCKET_ICEBOX = Story.STORY_BELONGS_ICEBOX
+BUCKET_BACKLOG = Story.STORY_BELONGS_BACKLOG
+
+STATUS_FIELDS = {
+    Story.STATUS_UNSTARTED: 'unstarted',
+    Story.STATUS_STARTED: 'started',
+    Story.STATUS_COMPLETED: 'completed',
+    Story.STATUS_ACCEPTED: 'accepted',
+}
+
+
+class IterationStats(models.Model):
+    """The totals of the stories in one iteration, or in the icebox or backlog
+    of a project (iteration is then None)."""
+
+    BUCKET_CHOICES = (
+        (BUCKET_ITERATION, "Iteration"),
+        (BUCKET_ICEBOX, "Icebox"),
+        (BUCKET_BACKLOG, "Backlog"),
+    )
+
+    project = models.ForeignKey(Project)
+    iteration = models.ForeignKey(Iteration, blank=True, null=True)
+    bucket = models.CharField(choices=BUCKET_CHOICES, max_length=16)
+    unstarted = models.IntegerField(default=0)
+    started = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    accepted = models.IntegerField(default=0)
+    points = models.IntegerField(default=0)
+    hours = models.IntegerField(default=0)
+    # Goes up with every change of the row, for caching what is derived
+    # from its stories.
+    revision = models.IntegerField(default=0)
+    # The row's (project, iteration, bucket) as one non-null value. Databases
+    # let any number of rows share a NULL iteration under unique_together, so
+    # this is what keeps two icebox or backlog rows of a project from being
+    # created at once.
+    bucket_key = models.CharField(max_length=64, unique=True)
+
+    @property
+    def story_count(self):
+        return self.unstarted + self.started + self.completed + self.accepted
+
+    @property
+    def stories_by_status(self):
+        """(label, count) of every story status, in workflow order."""
+        return [(label, getattr(self, STATUS_FIELDS[status])) for status, label in Story.STATUS_CHOICES]
+
+    class Meta:
+        app_label = 'requirements'
+        unique_together = (('project', 'bucket', 'iteration'),)
+
+
+def get_bucket(project_id, iteration_id, belong):
+    """Return the (project id, iteration id, bucket) row a story is counted in."""
+    if iteration_id is not None:
+        return (project_id, iteration_id, BUCKET_ITERATION)
+    if belong == BUCKET_BACKLOG:
+        return (project_id, None, BUCKET_BACKLOG)
+    # Stories taken out of an iteration keep belong == ITERATION.
+    return (project_id, None, BUCKET_ICEBOX)
+
+
+def _bucket_key(key):
+    project_id, iteration_id, bucket = key
+    return '%s:%s:%s' % (project_id, bucket, '' if iteration_id is None else iteration_id)
+
+
+def _new_row(key, **fields):
+    """Return an unsaved row for the (project id, iteration id, bucket) key."""
+    return IterationStats(project_id=key[0], iteration_id=key[1], bucket=key[2], bucket_key=_bucket_key(key),
+                          **fields)
+
+
+def _number(value):
+    # Stories built from request data hold strings until they are reloaded.
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _share(story):
+    return (get_bucket(story.project_id, story.iteration_id, story.belong),
+            _number(story.status), _number(story.points), _number(story.hours))
+
+
+def _get_rows(project_id, iteration_id, bucket):
+    return IterationStats.objects.filter(project_id=project_id, iteration_id=iteration_id, bucket=bucket)
+
+
+def _apply(share, sign):
+    key, status, points, hours = share
+    changes = {'points': points, 'hours': hours}
+    if status in STATUS_FIELDS:
+        changes[STATUS_FIELDS[status]] = 1
+    updates = dict((name, F(name) + sign * value) for name, value in changes.items())
+    rows = _get_rows(*key)
+    if rows.update(revision=F('revision') + 1, **updates) or sign < 0:
+        return
+    try:
+        # In a savepoint, so that losing the race leaves the story's
+        # transaction usable.
+        with transaction.atomic():
+            _new_row(key, revision=1, **changes).save(force_insert=True)
+    except IntegrityError:
+        # Another transaction created the row first; bucket_key made it wait.
+        rows.update(revision=F('revision') + 1, **updates)
+
+
+def get_iteration_stats(iteration):
+    """Return the totals of the iteration."""
+    return get_bucket_stats(iteration.project_id, iteration.id, BUCKET_ITERATION)
+
+
+def get_bucket_stats(project_id, iteration_id, bucket):
+    """Return the totals of one row, all zero when it has no stories yet."""
+    stats = _get_rows(project_id, iteration_id, bucket).first()
+    if stats is None:
+        stats = _new_row((project_id, iteration_id, bucket))
+    return stats
+
+
+def get_stats_for_project(project):
+    """Return the totals of every iteration, the icebox and the backlog of the project."""
+    return IterationStats.objects.filter(project_id=project.id)
+
+
+def get_stats_for_buckets(keys):
+    """Return the rows of the given (project id, iteration id, bucket) keys, in
+    order, all zero for those without stories."""
+    keys = list(keys)
+    rows = Q(pk__in=[])
+    for project_id, iteration_id, bucket in keys:
+        rows |= Q(project_id=project_id, iteration_id=iteration_id, bucket=bucket)
+    found = dict(((stats.project_id, stats.iteration_id, stats.bucket), stats)
+                 for stats in IterationStats.objects.filter(rows))
+    return [found.get(key) or _new_row(key) for key in keys]
+
+
+def rebuild_iteration_stats(project_id=None):
+    """Recompute the totals from the stories with one grouped query.
+
+    Args:
+      project_id: The project to rebuild, every project by default.
+    Returns:
+      The number of rows written.
+    """
+    stories = Story.objects.all()
+    stats = IterationStats.objects.all()
+    if project_id is not None:
+        stories = stories.filter(project_id=project_id)
+        stats = stats.filter(project_id=project_id)
+    totals = (stories.values('project_id', 'iteration_id', 'belong', 'status')
+              .annotate(stories=Count('id'), points=Sum('points'), hours=Sum('hours'))
+              .order_by())
+    # Rebuilt rows move on from the old revisions, which may be cached.
+    revisions = dict(((row['project_id'], row['iteration_id'], row['bucket']), row['revision'])
+                     for row in stats.values('project_id', 'iteration_id', 'bucket', 'revision'))
+    rows = {}
+    for total in totals:
+        key = get_bucket(total['project_id'], total['iteration_id'], total['belong'])
+        if key not in rows:
+            rows[key] = _new_row(key, revision=revisions.get(key, 0) + 1)
+        row = rows[key]
+        field = STATUS_FIELDS.get(total['status'])
+        if field:
+            setattr(row, field, getattr(row, field) + total['stories'])
+        row.points += total['points'] or 0
+        row.hours += total['hours'] or 0
+    # Emptied rows stay, so that their revision keeps going up.
+    for key, revision in revisions.items():
+        if key not in rows:
+            rows[key] = _new_row(key, revision=revision + 1)
+    with transaction.atomic():
+        stats.delete()
+        IterationStats.objects.bulk_create(rows.values())
+    return len(rows)
+
+
+# Story.save runs these in its transaction; post_delete is sent inside the
+# transaction of the delete.
+
+@receiver(post_init, sender=Story)
+def _remember_share(sender, instance, **kwargs):
+    # The row the story was loaded in, to take it out of when it moves.
+    instance._stats_share = _share(instance) if instance.pk is not None else None
+
+
+@receiver(post_save, sender=Story)
+def _story_saved(sender, instance, created=False, **kwargs):
+    current = _share(instance)
+    previous = None if created else getattr(instance, '_stats_share', None)
+    if previous != current:
+        if previous is not None:
+            _apply(previous, -1)
+        _apply(current, 1)
+    instance._stats_share = current
+
+
+@receiver(post_delete, sender=Story)
+def _story_deleted(sender, instance, **kwargs):
+    _apply(getattr(instance, '_stats_share', None) or _share(instance), -1)
+
+
+@receiver(post_delete, sender=Iteration)
+def _iteration_deleted(sender, instance, **kwargs):
+    # Its stories were moved to the icebox by an UPDATE, without signals.
+    rebuild_iteration_stats(instance.project_id)
+
+
+@receiver(post_delete, sender=Project)
+def _project_deleted(sender, instance, **kwargs):
+    # Deleting its iterations above rebuilt rows the delete had not collected.
+    IterationStats.objects.filter(project_id=instance.id).delete()
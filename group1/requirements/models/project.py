@@ -20,5 +20,7 @@ class Project(ProjMgmtBase):
         )
 
         app_label = 'requirements'
+        # For the prefix lookups of the project autocomplete.
+        index_together = (('title',),)
 
 
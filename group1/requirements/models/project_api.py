@@ -2,9 +2,13 @@ from user_association import UserAssociation
 from project import Project
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
 from iteration import Iteration
 from story import Story
+import iteration_stats
 import user_association
+import user_manager
 
 
 def get_all_projects():
@@ -18,7 +22,8 @@ def get_associations_for_user(userID):
 
 
 def get_projects_for_user(userID):
-    return Project.objects.filter(users__id__contains=userID)
+    # user_manager.get_memberships returns the same projects with the user's roles.
+    return Project.objects.filter(userassociation__user_id=userID).order_by('title', 'id')
 
 
 def get_project(projectID):
@@ -33,8 +38,7 @@ def get_project_users(projectID):
 
 
 def can_user_access_project(userID, projectID):
-    return UserAssociation.objects.filter(
-        user__id=userID, project__id=projectID).count() > 0
+    return user_manager.get_association(projectID, userID) is not None
 
 
 def create_project(user, fields):
@@ -82,8 +86,8 @@ def add_user_to_project(projectID, username, user_role):
     try:
         proj = Project.objects.get(id=projectID)
         user = User.objects.get(username=username)
-        association = UserAssociation(user=user, project=proj, role=user_role)
-        association.save()
+        # Adding a member again changes their role.
+        UserAssociation.objects.update_or_create(user=user, project=proj, defaults={'role': user_role})
 
     except ObjectDoesNotExist:
         return
@@ -148,15 +152,33 @@ def move_story_to_icebox(story):
     story.save()
 
 
+def move_stories(project, storyIDs, belong, iteration=None):
+    # Moves many stories of the project to the iteration, or to the backlog or
+    # icebox when iteration is None, with one UPDATE. It bypasses the Story
+    # signals, so the iteration totals of the project are rebuilt in the same
+    # transaction. Returns {story id: (previous iteration id, previous belong)}.
+    storyIDs = set(storyIDs)
+    if iteration is not None and iteration.project_id != project.id:
+        raise ValueError("The iteration is not in the project")
+    with transaction.atomic():
+        previous = dict(
+            (storyID, (iterationID, old_belong)) for storyID, iterationID, old_belong in
+            Story.objects.select_for_update().filter(project_id=project.id, id__in=storyIDs)
+            .values_list('id', 'iteration_id', 'belong'))
+        if len(previous) != len(storyIDs):
+            raise ValueError("The stories are not all in the project")
+        Story.objects.filter(id__in=storyIDs).update(
+            iteration=iteration, belong=belong, last_updated=timezone.now())
+        iteration_stats.rebuild_iteration_stats(project.id)
+    return previous
+
+
 def get_iterations_for_project(project):
     return Iteration.objects.filter(project__id=project.id)
 
 
 def user_owns_project(user, project):
-    ua_list = UserAssociation.objects.filter(user=user, project=project)
-    if not ua_list.exists():
-        return False
-    return user_association.ROLE_OWNER == ua_list[0].role
+    return user_manager.isOwner(project.id, user.id)
 
 
 def change_user_role(the_project, the_user, the_role):
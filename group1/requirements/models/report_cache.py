@@ -0,0 +1,99 @@
+"""Disk cache of rendered PDF reports.
+
+A report is stored under a key hashed from the project, the report options
+and the project's revision token, so a report is only ever rendered once per
+state of the project.  The cache lives in REPORT_ROOT and is kept under
+REPORT_CACHE_MAX_BYTES by removing the least recently used reports; every hit
+refreshes the file's modification time.
+"""
+import datetime
+import hashlib
+import os
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models import Max
+
+from iteration import Iteration
+from report_job import get_report_path
+from report_job import get_report_root
+from report_job import options_key
+from story import Story
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def get_project_revision(project):
+    """Return a token that changes whenever anything shown in the report does.
+
+    It combines the last_updated stamps of the project, its iterations and its
+    stories with their counts, which catch deletions.  Task edits are covered
+    because saving or deleting a task bumps its story's last_updated.
+    """
+    iterations = Iteration.objects.filter(project=project).aggregate(
+        last=Max('last_updated'), count=Count('id'))
+    stories = Story.objects.filter(project=project).aggregate(
+        last=Max('last_updated'), count=Count('id'))
+    return '%s|%s|%d|%s|%d' % (project.last_updated,
+                               iterations['last'], iterations['count'],
+                               stories['last'], stories['count'])
+
+
+def get_cache_key(project, args):
+    """Return the content address of the report of the project as it is now."""
+    source = '%d|%s|%s' % (project.id, options_key(args), get_project_revision(project))
+    if args.get('burndown_chart'):
+        # The burndown runs up to today.
+        source += '|%s' % datetime.date.today()
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def get(key):
+    """Return the path of the cached report and mark it used, or None."""
+    path = get_report_path(key)
+    try:
+        os.utime(path, None)
+    except OSError:
+        return None
+    return path
+
+
+def put(key, source):
+    """Move the rendered file at source into the cache and evict old reports."""
+    path = get_report_path(key)
+    os.rename(source, path)
+    evict(keep=path)
+    return path
+
+
+def evict(keep=None):
+    """Remove the least recently used reports until the cache fits its size limit.
+
+    Args:
+      keep: A path that is never removed, e.g. the report just stored.
+    """
+    max_bytes = getattr(settings, 'REPORT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+    root = get_report_root()
+    entries = []
+    total = 0
+    for name in os.listdir(root):
+        if not name.endswith('.pdf'):
+            continue
+        path = os.path.join(root, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+    entries.sort()
+    for mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
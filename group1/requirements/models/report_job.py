@@ -0,0 +1,69 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import models
+from project import Project
+from filemaker import REPORT_OPTIONS
+
+
+def get_report_root():
+    """The directory rendered reports are stored in (REPORT_ROOT setting)."""
+    return getattr(settings, 'REPORT_ROOT', os.path.join(settings.BASE_DIR, 'report_files'))
+
+
+def get_report_path(key):
+    """Where the report stored under the given cache key lives."""
+    return os.path.join(get_report_root(), '%s.pdf' % key)
+
+
+def options_key(args):
+    """Canonical string for a dict of PDF flags, e.g. 'pie_chart,story_task'."""
+    return ','.join(option for option in REPORT_OPTIONS if args.get(option))
+
+
+def options_from_key(key):
+    enabled = set(key.split(',')) if key else set()
+    return dict((option, option in enabled) for option in REPORT_OPTIONS)
+
+
+class ReportJob(models.Model):
+    """A PDF report export, rendered in the background.
+
+    cache_key addresses the rendered file in report_cache; it is derived from
+    the project, the report options and the project's revision, so asking for
+    the same report again reuses the job or at least its file.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    project = models.ForeignKey(Project)
+    requested_by = models.ForeignKey(User, null=True, on_delete=models.SET_NULL)
+    options = models.CharField(max_length=512, blank=True, default='')
+    cache_key = models.CharField(max_length=40, db_index=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    error = models.CharField(max_length=1024, blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True)
+
+    class Meta:
+        app_label = 'requirements'
+
+    def get_options(self):
+        return options_from_key(self.options)
+
+    def get_path(self):
+        return get_report_path(self.cache_key)
+
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
@@ -0,0 +1,150 @@
+"""Background rendering of PDF report exports.
+
+makepdf queues a ReportJob and returns straight away; the browser then polls
+the job status and downloads the file once it is rendered.  Where jobs run is
+picked with the REPORT_WORKER setting:
+
+  'thread'   (default) a pool of REPORT_WORKERS threads in the web process.
+  'channels' the requirements.report channel, consumed by `manage.py runworker`.
+  'sync'     inside the request itself, for tests and debugging.
+
+A job still queued REPORT_JOB_TIMEOUT seconds after it was created, or still
+running that long after it started, is taken for lost, e.g. with a worker that
+was restarted; it is marked failed and the next request for the report queues
+it again.
+"""
+import datetime
+import logging
+import os
+import threading
+from multiprocessing.pool import ThreadPool
+
+from channels import Channel
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.utils import timezone
+from reportlab.platypus import SimpleDocTemplate
+
+import filemaker
+import report_cache
+from report_job import ReportJob
+from report_job import get_report_root
+from report_job import options_key
+
+REPORT_CHANNEL = 'requirements.report'
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPool(getattr(settings, 'REPORT_WORKERS', 2))
+    return _pool
+
+
+def _is_stale(job):
+    timeout = datetime.timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 600))
+    since = job.started if job.status == ReportJob.STATUS_RUNNING else job.created
+    return since is not None and since < timezone.now() - timeout
+
+
+def _fail_stale(job):
+    """Mark the job failed when it is stale, returning whether it was."""
+    if not _is_stale(job):
+        return False
+    logger.warning('Report job %d was %s for too long; queueing it again', job.id, job.status)
+    # Unless a worker got to it meanwhile.
+    return bool(ReportJob.objects.filter(id=job.id, status=job.status).update(
+        status=ReportJob.STATUS_FAILED, error='Timed out.', finished=timezone.now()))
+
+
+def request_report(project, args, user=None):
+    """Return the job rendering this report, queueing a new one if needed.
+
+    When the report of the project as it is now is already in the cache the
+    job is done straight away.
+
+    Args:
+      project: The project to report on.
+      args: A dict of the PDF flags, see filemaker.REPORT_OPTIONS.
+      user: The user asking for the report.
+    """
+    key = report_cache.get_cache_key(project, args)
+    job = ReportJob.objects.filter(cache_key=key).exclude(
+        status=ReportJob.STATUS_FAILED).order_by('-id').first()
+    if job is not None and not job.is_finished():
+        if not _fail_stale(job):
+            return job
+        job = None
+    if report_cache.get(key) is not None:
+        if job is None:
+            job = ReportJob.objects.create(project=project, requested_by=user, options=options_key(args),
+                                           cache_key=key, status=ReportJob.STATUS_DONE,
+                                           finished=timezone.now())
+        return job
+    job = ReportJob.objects.create(project=project, requested_by=user, options=options_key(args),
+                                   cache_key=key)
+    dispatch(job)
+    # The worker may have got to it already.
+    job.refresh_from_db()
+    return job
+
+
+def dispatch(job):
+    worker = getattr(settings, 'REPORT_WORKER', 'thread')
+    if worker == 'thread':
+        _get_pool().apply_async(_run_in_thread, (job.id,))
+    elif worker == 'channels':
+        Channel(REPORT_CHANNEL).send({'job_id': job.id})
+    elif worker == 'sync':
+        run_job(job.id)
+    else:
+        raise ImproperlyConfigured('Unknown REPORT_WORKER %r.' % worker)
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        # Each pool thread has a connection of its own; don't leave it open.
+        connection.close()
+
+
+def run_job(job_id):
+    """Render a queued job.
+
+    Returns:
+      False when the job was not queued any more, e.g. because another worker
+      took it first, True otherwise.
+    """
+    if not ReportJob.objects.filter(id=job_id, status=ReportJob.STATUS_QUEUED).update(
+            status=ReportJob.STATUS_RUNNING, started=timezone.now()):
+        return False
+    job = ReportJob.objects.get(id=job_id)
+    partial = os.path.join(get_report_root(), 'job_%d.part' % job.id)
+    try:
+        if not os.path.isdir(get_report_root()):
+            os.makedirs(get_report_root())
+        with open(partial, 'wb') as output:
+            # process_pdf returns an error string instead of raising.
+            error = filemaker.process_pdf(SimpleDocTemplate(output), job.project_id, job.get_options())
+        if error is not None:
+            raise RuntimeError('The report could not be rendered.')
+        report_cache.put(job.cache_key, partial)
+    except Exception as e:
+        logger.exception('Report job %d failed', job_id)
+        if os.path.exists(partial):
+            os.remove(partial)
+        ReportJob.objects.filter(id=job_id).update(status=ReportJob.STATUS_FAILED, error=str(e)[:1024],
+                                                   finished=timezone.now())
+        return True
+    # A job that ran past REPORT_JOB_TIMEOUT stays failed; its file is cached all the same.
+    ReportJob.objects.filter(id=job_id, status=ReportJob.STATUS_RUNNING).update(
+        status=ReportJob.STATUS_DONE, finished=timezone.now())
+    return True
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db import transaction
 from django.contrib.auth.models import User
 from base import ProjMgmtBase
 from project import Project
@@ -99,6 +100,12 @@ class Story(ProjMgmtBase):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # post_save updates the iteration totals, see iteration_stats; it is
+        # sent after Model.save commits, so both go in one transaction here.
+        with transaction.atomic():
+            super(Story, self).save(*args, **kwargs)
+
     def description_as_list(self):
         return self.description.split('\n')
 
@@ -110,6 +117,8 @@ class Story(ProjMgmtBase):
 
     class Meta:
         app_label = 'requirements'
+        # The iteration, backlog and icebox lists of a project.
+        index_together = (('project', 'iteration'), ('project', 'belong'))
 
 
 def get_stories_for_project(project):
@@ -118,6 +127,18 @@ def get_stories_for_project(project):
     return Story.objects.filter(project_id=project.id)
 
 
+def get_stories_with_details_for_project(project):
+    # Loads every story of the project together with its owner, iteration,
+    # tasks, comments and attachments. The related rows are fetched with one
+    # query per relation and grouped per story (story.task_set.all etc.), so
+    # the cost depends only on the size of this project.
+    if project is None:
+        return None
+    return Story.objects.filter(project_id=project.id).select_related(
+        'owner', 'iteration').prefetch_related(
+        'task_set', 'storycomment_set', 'storyattachment_set')
+
+
 def get_story(storyID):
     try:
         return Story.objects.get(id=storyID)
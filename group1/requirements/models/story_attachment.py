@@ -8,7 +8,7 @@ from story import *
 class StoryAttachment(models.Model):
     
     # name of the file when it is stored in project_files (avoids conflicts)
-    uuid = models.CharField(max_length=255,null=True)
+    uuid = models.CharField(max_length=255,null=True, db_index=True)
     story = models.ForeignKey(Story)
     # original uploaded file name
     name = models.CharField(max_length=255,null=True)
@@ -0,0 +1,57 @@
+"""Append-only log of story status changes.
+
+A StoryStatusChange row is written in the transaction of every save that
+creates a story or changes its status, recording the iteration the story was
+in at the time.  Rows are never updated; the burndown, velocity and cycle time
+figures in analytics are computed from them.
+"""
+from django.db import models
+from django.db.models.signals import post_init
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from iteration import Iteration
+from project import Project
+from story import Story
+
+
+class StoryStatusChange(models.Model):
+    story = models.ForeignKey(Story)
+    project = models.ForeignKey(Project)
+    iteration = models.ForeignKey(Iteration, blank=True, null=True, on_delete=models.SET_NULL)
+    # None for the status a story was created with.
+    from_status = models.IntegerField(choices=Story.STATUS_CHOICES, blank=True, null=True)
+    to_status = models.IntegerField(choices=Story.STATUS_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        app_label = 'requirements'
+        # The history of a set of stories, in order.
+        index_together = (('story', 'changed_at'),)
+
+
+def _status(story):
+    # Stories built from request data hold strings until they are reloaded.
+    return Story._meta.get_field('status').to_python(story.status)
+
+
+def get_history(story):
+    """Return the status changes of the story, oldest first."""
+    return StoryStatusChange.objects.filter(story_id=story.id).order_by('changed_at', 'id')
+
+
+@receiver(post_init, sender=Story)
+def _remember_status(sender, instance, **kwargs):
+    instance._logged_status = instance.status if instance.pk is not None else None
+
+
+@receiver(post_save, sender=Story)
+def _story_saved(sender, instance, created=False, **kwargs):
+    status = _status(instance)
+    previous = None if created else getattr(instance, '_logged_status', None)
+    if created or status != previous:
+        StoryStatusChange.objects.create(story_id=instance.id, project_id=instance.project_id,
+                                         iteration_id=instance.iteration_id,
+                                         from_status=previous, to_status=status)
+    instance._logged_status = status
@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
 from story import Story
 
 
@@ -42,3 +46,12 @@ def create_task(story, fields):
     task = Task(story=story, description=description)
     task.save()
     return task
+
+
+# Tasks are part of their story, as far as its last_updated stamp and the
+# report cache built on it are concerned. The update sends no Story signals.
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def _task_changed(sender, instance=None, **kwargs):
+    Story.objects.filter(id=instance.story_id).update(last_updated=timezone.now())
@@ -10,6 +10,25 @@ PERM_CREATE_STORY = "CreateStory"
 PERM_EDIT_STORY = "EditStory"
 PERM_DELETE_STORY = "DeleteStory"
 
+# This is where the permissions associated with a role are defined. The sets are
+# built once at import time and shared by every permission check.
+ROLE_PERMISSIONS = {
+    ROLE_CLIENT: frozenset([PERM_CREATE_STORY, PERM_EDIT_STORY, "AcceptStory"]),
+    ROLE_DEVELOPER: frozenset([PERM_CREATE_STORY, PERM_EDIT_STORY, "EditHours", "EditPoints", "EditType",
+                               "ChangeStoryStatus", "AddTasks", "EditTasks", "EditOwner"]),
+    ROLE_OWNER: frozenset([PERM_CREATE_STORY, PERM_EDIT_STORY, PERM_DELETE_STORY, "AcceptStory",
+                           "EditHours", "EditType", "EditPoints", "SelectStoryStatus", "AddTasks", "EditTasks",
+                           "AddUser", "DeleteUser", "ChangePermissions",
+                           "PauseStory", "EditAccepted", "EditPaused", "MoveStoryToIteration",
+                           "EditProject", "DeleteProject", "AddIteration", "EditIteration", "DeleteIteration",
+                           "EditOwner"]),
+}
+
+
+def get_role_permission_set(role):
+    # Returns the frozen set of permissions for the role, empty for unknown roles.
+    return ROLE_PERMISSIONS.get(role, frozenset())
+
 
 class UserAssociation(models.Model):
     user = models.ForeignKey(User)
@@ -19,35 +38,16 @@ class UserAssociation(models.Model):
     def get_permission(self, permission):
         # Checks whether the association's user has the specified permission on the
         # association's project.
-        return permission in self.get_role_permissions(self.role)
-
-        def test_function():
-            return false
+        return permission in get_role_permission_set(self.role)
 
     def get_role_permissions(self, role):
-
         # The role passed should be one of the string constants defined above.
-        # This method is where the permissions associated with a role are defined.
-        # It should return an array of strings representing permissions.
-        role_dictionary = {
-            # <<<<<<< HEAD
-            #             ROLE_CLIENT: [PERM_CREATE_STORY],
-            #             ROLE_DEVELOPER: [PERM_CREATE_STORY, PERM_EDIT_STORY, PERM_DELETE_STORY],
-            #             ROLE_OWNER: [PERM_CREATE_STORY, PERM_EDIT_STORY, PERM_DELETE_STORY,
-            #                           "AddUser", "DeleteUser", "ChangePermissions", "EditProject", "DeleteProject", "AddIteration"]
-            # =======
-            ROLE_CLIENT: [PERM_CREATE_STORY, PERM_EDIT_STORY, "AcceptStory"],
-            ROLE_DEVELOPER: [PERM_CREATE_STORY, PERM_EDIT_STORY, "EditHours", "EditPoints", "EditType",
-                             "ChangeStoryStatus", "AddTasks", "EditTasks", "EditOwner"],
-            ROLE_OWNER: [PERM_CREATE_STORY, PERM_EDIT_STORY, PERM_DELETE_STORY, "AcceptStory",
-                         "EditHours", "EditType", "EditPoints", "SelectStoryStatus", "AddTasks", "EditTasks",
-                         "AddUser", "DeleteUser", "ChangePermissions",
-                         "PauseStory", "EditAccepted", "EditPaused", "MoveStoryToIteration",
-                         "EditProject", "DeleteProject", "AddIteration", "EditIteration", "DeleteIteration", "EditOwner"]
-            # >>>>>>> newfeature-addpermissionforeditstory
-        }
+        # It returns an array of strings representing permissions.
         # TODO: exception handling if permission string not found.
-        return role_dictionary[role]
+        return list(ROLE_PERMISSIONS[role])
 
     class Meta:
         app_label = 'requirements'
+        # A user has one role per project; see the dedupe_user_associations
+        # command for databases created before this was enforced.
+        unique_together = (('user', 'project'),)
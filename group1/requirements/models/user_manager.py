@@ -16,22 +16,66 @@ def createUser(request):
 def getActiveUsers():
     return User.objects.filter(is_active=True)
 
-def __hasRole(projectID, userID, roleName):
-    assoc = __getAssoc(projectID, userID)
-    if assoc.count() == 0:
-        return False
-    ua = assoc.first()
-    return ua.get_permission(roleName)
+class PermissionContext(object):
+    """
+    A user's association with a project and the permissions it grants, resolved
+    once and shared by the decorators, the views and the templates.
+    """
+
+    def __init__(self, association):
+        self.association = association
+        if association is None:
+            self.role = None
+            self.permissions = frozenset()
+        else:
+            self.role = association.role
+            self.permissions = user_association.get_role_permission_set(association.role)
+
+    def can_access(self):
+        return self.association is not None
+
+    def has_permission(self, permission):
+        return permission in self.permissions
+
+    def is_owner(self):
+        return self.role == user_association.ROLE_OWNER
+
 
-def __getAssoc(projectID, userID):
+def get_association(projectID, userID):
+    # Not cached across requests: every worker has to see a removed member at
+    # once. get_permission_context keeps the answer for the rest of the request.
     return UserAssociation.objects.filter(
-        project__id=projectID, user__id=userID)
+        project__id=int(projectID), user__id=userID).select_related('project').first()
+
+def get_memberships(userID):
+    # Returns the user's associations, each with its project loaded, ordered by
+    # project title. These (project, role) pairs come from one join on the
+    # indexed user_id column. Like get_association they are not cached across
+    # requests, so that every worker sees a membership change at once.
+    return list(UserAssociation.objects.filter(user_id=userID).select_related('project')
+                .order_by('project__title', 'project__id'))
+
+def get_user_projects(userID):
+    # The projects of the user, as listed in the sidebar.
+    return [association.project for association in get_memberships(userID)]
+
+def get_permission_context(request, projectID):
+    # Resolves the permission context of the requesting user once per
+    # (request, project); later calls within the same request are free.
+    contexts = getattr(request, '_permission_contexts', None)
+    if contexts is None:
+        contexts = request._permission_contexts = {}
+    projectID = int(projectID)
+    if projectID not in contexts:
+        contexts[projectID] = PermissionContext(
+            get_association(projectID, request.user.id))
+    return contexts[projectID]
+
+def __hasRole(projectID, userID, roleName):
+    return PermissionContext(get_association(projectID, userID)).has_permission(roleName)
 
 def isOwner(projectID, userID):
-    assoc = __getAssoc(projectID, userID)
-    if assoc.count() == 0:
-        return False
-    return user_association.ROLE_OWNER == assoc.first().role
+    return PermissionContext(get_association(projectID, userID)).is_owner()
 
 # Decorator function that can be used to wrap a view method. The view method must take
 # request and projectID as arguments. The decorator will redirect to
@@ -41,7 +85,7 @@ def isOwner(projectID, userID):
 def user_has_role(role):
     def _my_decorator(view_method):
         def _decorator(request, projectID, *args, **kwargs):
-            if not __hasRole(projectID, request.user.id, role):
+            if not get_permission_context(request, projectID).has_permission(role):
                 return HttpResponse(
                     'You do not have permision to perform this function', status=401)
             return view_method(request, projectID, *args, **kwargs)
@@ -55,7 +99,7 @@ def user_has_role(role):
 def user_owns_project():
     def _my_decorator(view_method):
         def _decorator(request, projectID, *args, **kwargs):
-            if not isOwner(projectID, request.user.id):
+            if not get_permission_context(request, projectID).is_owner():
                 return HttpResponse(
                     'You do not have permision to perform this function', status=401)
             return view_method(request, projectID, *args, **kwargs)
@@ -69,7 +113,7 @@ def user_owns_project():
 def user_can_access_project():
     def _my_decorator(view_method):
         def _decorator(request, projectID, *args, **kwargs):
-            if __getAssoc(projectID, request.user.id).count() == 0:
+            if not get_permission_context(request, projectID).can_access():
                 return HttpResponse(
                     'You do not have permision to perform this function', status=401)
             return view_method(request, projectID, *args, **kwargs)
@@ -80,4 +124,5 @@ def canCreateStoryInProject(projectID, userID):
     return __hasRole(projectID, userID, user_association.PERM_CREATE_STORY)
 
 def canEditStoryInProject(projectID, userID):
-    return __hasRole(projectID, userID, user_association.PERM_EDIT_STORY)
\ No newline at end of file
+    return __hasRole(projectID, userID, user_association.PERM_EDIT_STORY)
+
@@ -0,0 +1,160 @@
+"""Rate limiting of sign in attempts.
+
+Failed attempts are counted per client IP and per username with a sliding
+window counter: each window of LOGIN_RATELIMIT_WINDOW seconds has one counter
+in the cache, and the number of recent failures is estimated as the current
+window's count plus the previous window's count weighted by how much of it
+still overlaps the sliding window.  Checking an address or a username is a
+single get_many of two keys and recording a failure two increments, whatever
+the traffic.
+
+The counters live in the cache named by LOGIN_RATELIMIT_CACHE (default
+'ratelimit', see CACHES in the settings), which has to be shared by the
+processes, or each would allow the full number of failures.  Counters are set
+to expire after two windows and nothing else removes them: redis drops them
+itself, and the file cache drops expired entries when they are read or when
+it reaches its MAX_ENTRIES.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+
+from group1.shared_cache import get_shared_cache
+
+DEFAULT_ATTEMPTS = 3
+DEFAULT_WINDOW = 60
+DEFAULT_SLOW_INTERVAL = 5
+
+
+def get_client_ip(request):
+    """Return the address the request came from, behind at most one proxy."""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_cache():
+    return get_shared_cache('LOGIN_RATELIMIT_CACHE', 'ratelimit')
+
+
+class SlidingWindowLimiter(object):
+    """Counts events per identifier over a sliding window kept in the cache.
+
+    Args:
+      prefix: Namespace of the limiter's cache keys.
+      limit: The number of events allowed per window.
+      window: The length of the window in seconds.
+    """
+
+    def __init__(self, prefix, limit, window):
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+
+    def digest(self, ident):
+        # Hashing keeps arbitrary usernames within the key rules of memcached.
+        return hashlib.md5(ident.encode('utf-8')).hexdigest()
+
+    def keys(self, ident, now):
+        """Return the current and previous window keys of ident, and how far
+        into the current window now is (0 to 1)."""
+        digest = self.digest(ident)
+        number, offset = divmod(now, self.window)
+        number = int(number)
+        return ('%s:%s:%d' % (self.prefix, digest, number),
+                '%s:%s:%d' % (self.prefix, digest, number - 1),
+                offset / float(self.window))
+
+    def estimate(self, counts, keys):
+        current, previous, elapsed = keys
+        return counts.get(current, 0) + counts.get(previous, 0) * (1 - elapsed)
+
+    def incr(self, cache, key):
+        # The counter outlives its window so that it can still be weighed in
+        # as the previous one.
+        cache.add(key, 0, timeout=2 * self.window)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # It expired in between.
+            cache.set(key, 1, timeout=2 * self.window)
+            return 1
+
+
+class LoginRateLimiter(object):
+    """Limits sign in from an IP address and for a username after repeated failures.
+
+    Both are limited to LOGIN_RATELIMIT_ATTEMPTS failures per
+    LOGIN_RATELIMIT_WINDOW seconds.  An address over its limit is blocked,
+    which stops one client from trying many usernames.  A username over its
+    limit is only slowed down, to one attempt per LOGIN_RATELIMIT_SLOW_INTERVAL
+    seconds from any address, which stops attacks spread over many addresses
+    without letting anyone lock its owner out.
+    """
+
+    def __init__(self, limit=None, window=None, cache=None, interval=None):
+        limit = limit or getattr(settings, 'LOGIN_RATELIMIT_ATTEMPTS', DEFAULT_ATTEMPTS)
+        window = window or getattr(settings, 'LOGIN_RATELIMIT_WINDOW', DEFAULT_WINDOW)
+        self.cache = cache or get_cache()
+        self.by_ip = SlidingWindowLimiter('login:ip', limit, window)
+        self.by_username = SlidingWindowLimiter('login:user', limit, window)
+        self.window = window
+        self.interval = interval or getattr(settings, 'LOGIN_RATELIMIT_SLOW_INTERVAL', DEFAULT_SLOW_INTERVAL)
+
+    def _keys(self, ip, username, now):
+        return (self.by_ip.keys(ip, now), self.by_username.keys(username.lower(), now))
+
+    def _turn_key(self, username):
+        return 'login:turn:%s' % self.by_username.digest(username.lower())
+
+    def _failures(self, ip, username, now):
+        ip_keys, username_keys = self._keys(ip, username, now)
+        counts = self.cache.get_many(ip_keys[:2] + username_keys[:2])
+        return self.by_ip.estimate(counts, ip_keys), self.by_username.estimate(counts, username_keys)
+
+    def remaining(self, ip, username, now=None):
+        """Return the number of failures left before the address is blocked or the username slowed."""
+        now = time.time() if now is None else now
+        return max(0, int(self.by_ip.limit - max(self._failures(ip, username, now))))
+
+    def is_blocked(self, ip, now=None):
+        """Return whether the address is over its limit."""
+        now = time.time() if now is None else now
+        keys = self.by_ip.keys(ip, now)
+        return self.by_ip.estimate(self.cache.get_many(keys[:2]), keys) >= self.by_ip.limit
+
+    def is_slowed(self, username, now=None):
+        """Return whether the username is over its limit."""
+        now = time.time() if now is None else now
+        keys = self.by_username.keys(username.lower(), now)
+        return self.by_username.estimate(self.cache.get_many(keys[:2]), keys) >= self.by_username.limit
+
+    def take_turn(self, username):
+        """Return whether an attempt for a slowed username may go ahead now.
+
+        One attempt per LOGIN_RATELIMIT_SLOW_INTERVAL seconds goes ahead,
+        whether its password is right or not.
+        """
+        return self.cache.add(self._turn_key(username), 1, timeout=self.interval)
+
+    def record_failure(self, ip, username, now=None):
+        """Count a failed attempt and return the failures left, as remaining()."""
+        now = time.time() if now is None else now
+        ip_keys, username_keys = self._keys(ip, username, now)
+        self.by_ip.incr(self.cache, ip_keys[0])
+        self.by_username.incr(self.cache, username_keys[0])
+        # The failure uses up the username's turn, should it be slowed now.
+        self.cache.set(self._turn_key(username), 1, timeout=self.interval)
+        return self.remaining(ip, username, now)
+
+    def record_success(self, ip, username, now=None):
+        """Forget the failures of the username once its owner signed in.
+
+        The address keeps its count, so that one valid account does not let a
+        client keep guessing at others.
+        """
+        now = time.time() if now is None else now
+        self.cache.delete_many(self._keys(ip, username, now)[1][:2])
+
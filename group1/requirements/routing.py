@@ -0,0 +1,9 @@
+from channels import route
+from requirements.models.report_queue import REPORT_CHANNEL
+from .consumers import render_report
+
+
+channel_routing = [
+    # PDF report exports, see requirements.models.report_queue.
+    route(REPORT_CHANNEL, render_report),
+]
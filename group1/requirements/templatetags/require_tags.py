@@ -11,7 +11,11 @@ def check_permission(association, the_project, permission):
     # 2) Does the user have the specified permission for that project?
     # Returns true if both are true, otherwise false.
 
-    if association.project == the_project and association.get_permission(
+    # The association comes from the request's permission context, so its
+    # permissions are a precomputed set and no query is needed here.
+    if association is None:
+        return False
+    if association.project_id == the_project.id and association.get_permission(
             permission):
         return True
     else:
@@ -3,3 +3,16 @@ import test_story
 import test_iteration
 import test_other
 import test_roles
+import test_project_detail
+import test_permission_context
+import test_filemaker
+import test_report_queue
+import test_report_cache
+import test_ratelimit
+import test_session_security
+import test_indexes
+import test_memberships
+import test_dashboard
+import test_iteration_stats
+import test_analytics
+import test_move_stories
@@ -0,0 +1,159 @@
+import datetime
+import json
+import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from reportlab.platypus import SimpleDocTemplate
+from requirements.models import analytics
+from requirements.models import filemaker
+from requirements.models import iteration as mdl_iteration
+from requirements.models import project_api
+from requirements.models import story as mdl_story
+from requirements.models import story_history
+from requirements.models.iteration import Iteration
+from requirements.models.story import Story
+from requirements.models.story_history import StoryStatusChange
+
+
+def _at(day, hour=0):
+    return timezone.make_aware(datetime.datetime(2016, 10, day, hour), timezone.utc)
+
+
+class StoryHistoryTestCase(TestCase):
+
+    def setUp(self):
+        self.__user = User.objects.create_user(username="owner", password="pass")
+        self.__project = project_api.create_project(self.__user, {'title': 'proj', 'description': 'desc'})
+
+    def test_changes_are_logged(self):
+        story = mdl_story.create_story(self.__project, {'title': 's', 'status': '2'})
+        story.title = 'renamed'
+        story.save()
+        story = Story.objects.get(id=story.id)
+        story.status = Story.STATUS_COMPLETED
+        story.save()
+        self.assertEqual([(c.from_status, c.to_status) for c in story_history.get_history(story)],
+                         [(None, Story.STATUS_STARTED), (Story.STATUS_STARTED, Story.STATUS_COMPLETED)])
+
+    def test_change_records_the_iteration(self):
+        iteration = Iteration.objects.create(project=self.__project, title='it', start_date=datetime.date.today(),
+                                             end_date=datetime.date.today())
+        story = Story.objects.create(project=self.__project, title='s')
+        mdl_iteration.move_story_to_iteration(story, iteration)
+        story.status = Story.STATUS_STARTED
+        story.save()
+        self.assertEqual(story_history.get_history(story).last().iteration, iteration)
+
+
+class AnalyticsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.__user = User.objects.create_user(username="owner", password="pass")
+        self.__project = project_api.create_project(self.__user, {'title': 'proj', 'description': 'desc'})
+        self.__iteration = Iteration.objects.create(project=self.__project, title='it1',
+                                                    start_date=datetime.date(2016, 10, 1),
+                                                    end_date=datetime.date(2016, 10, 5))
+        self.__a = self.__create_story('a', 3, Story.STATUS_COMPLETED, [
+            (None, Story.STATUS_UNSTARTED, _at(1)),
+            (Story.STATUS_UNSTARTED, Story.STATUS_STARTED, _at(1, 10)),
+            (Story.STATUS_STARTED, Story.STATUS_COMPLETED, _at(3, 12))])
+        self.__b = self.__create_story('b', 2, Story.STATUS_ACCEPTED, [
+            (None, Story.STATUS_UNSTARTED, _at(1)),
+            (Story.STATUS_UNSTARTED, Story.STATUS_STARTED, _at(2)),
+            (Story.STATUS_STARTED, Story.STATUS_ACCEPTED, _at(4, 12))])
+
+    def __create_story(self, title, points, status, changes):
+        story = Story.objects.create(project=self.__project, title=title, points=points)
+        mdl_iteration.move_story_to_iteration(story, self.__iteration)
+        # Replace the logged history with one inside the iteration.
+        Story.objects.filter(id=story.id).update(status=status)
+        StoryStatusChange.objects.filter(story=story).delete()
+        for from_status, to_status, changed_at in changes:
+            StoryStatusChange.objects.create(story=story, project=self.__project, iteration=self.__iteration,
+                                             from_status=from_status, to_status=to_status, changed_at=changed_at)
+        return story
+
+    def __figures(self, today=datetime.date(2016, 10, 10)):
+        return analytics.get_iteration_analytics([self.__iteration], today)[self.__iteration.id]
+
+    def test_burndown(self):
+        figures = self.__figures()
+        self.assertEqual(figures['burndown']['days'][0], '2016-10-01')
+        self.assertEqual(figures['burndown']['remaining'], [5, 5, 2, 0, 0])
+        self.assertEqual(figures['burndown']['ideal'], [5.0, 3.75, 2.5, 1.25, 0.0])
+        self.assertEqual((figures['committed'], figures['completed']), (5, 5))
+
+    def test_burndown_stops_at_today(self):
+        figures = self.__figures(datetime.date(2016, 10, 2))
+        self.assertEqual(figures['burndown']['remaining'], [5, 5, None, None, None])
+        self.assertEqual(figures['completed'], 0)
+
+    def test_story_without_history_counts_as_it_is(self):
+        story = Story.objects.create(project=self.__project, title='c', points=4, status=Story.STATUS_ACCEPTED)
+        mdl_iteration.move_story_to_iteration(story, self.__iteration)
+        StoryStatusChange.objects.filter(story=story).delete()
+        self.assertEqual(self.__figures()['burndown']['remaining'], [5, 5, 2, 0, 0])
+        self.assertEqual(self.__figures()['committed'], 9)
+
+    def test_moving_a_story_out_keeps_the_figures(self):
+        before = self.__figures()
+        mdl_iteration.move_story_to_backlog(Story.objects.get(id=self.__a.id))
+        self.assertEqual(self.__figures(), before)
+
+    def test_cycle_time(self):
+        cycle_time = self.__figures()['cycle_time']
+        self.assertEqual(cycle_time['count'], 2)
+        self.assertEqual(cycle_time['p50'], round((2 + 2.0 / 24 + 2.5) / 2, 2))
+        self.assertEqual([bucket['stories'] for bucket in cycle_time['histogram'] if bucket['days'] == '2-3'], [2])
+
+    def test_epoch_from_the_database_matches_python(self):
+        data = analytics.IterationData([self.__iteration])
+        epoch_sql = analytics.EPOCH_SQL.pop('sqlite')
+        try:
+            fallback = analytics.IterationData([self.__iteration])
+        finally:
+            analytics.EPOCH_SQL['sqlite'] = epoch_sql
+        for name in ('change_iteration', 'change_story', 'change_from', 'change_to', 'change_time', 'story_ids'):
+            self.assertEqual(list(getattr(data, name)), list(getattr(fallback, name)))
+
+    def test_cached_until_the_iteration_changes(self):
+        self.__figures()
+        with self.assertNumQueries(1):
+            self.__figures()
+        story = Story.objects.get(id=self.__a.id)
+        story.points = 5
+        story.save()
+        self.assertEqual(self.__figures()['committed'], 7)
+
+    def test_velocity(self):
+        Iteration.objects.create(project=self.__project, title='it2', start_date=datetime.date(2016, 10, 6),
+                                 end_date=datetime.date(2016, 10, 19))
+        velocity = analytics.get_velocity(self.__project, datetime.date(2016, 10, 10))
+        self.assertEqual([(row['title'], row['committed'], row['completed']) for row in velocity['iterations']],
+                         [('it1', 5, 5), ('it2', 0, 0)])
+        self.assertEqual(velocity['average'], 5.0)
+
+    def test_endpoints(self):
+        self.client.login(username="owner", password="pass")
+        response = self.client.get('/requirements/iterationanalytics/%d/%d' % (self.__project.id,
+                                                                               self.__iteration.id))
+        self.assertEqual(json.loads(response.content)['committed'], 5)
+        response = self.client.get('/requirements/velocity/%d' % self.__project.id)
+        self.assertEqual(json.loads(response.content)['iterations'][0]['completed'], 5)
+
+    def test_endpoints_need_access(self):
+        User.objects.create_user(username="stranger", password="pass")
+        self.client.login(username="stranger", password="pass")
+        response = self.client.get('/requirements/velocity/%d' % self.__project.id)
+        self.assertEqual(response.status_code, 401)
+
+    def test_pdf_section(self):
+        output = StringIO.StringIO()
+        args = dict((option, False) for option in filemaker.REPORT_OPTIONS)
+        args['burndown_chart'] = True
+        self.assertIsNone(filemaker.process_pdf(SimpleDocTemplate(output), str(self.__project.id), args))
+        self.assertTrue(output.getvalue().startswith('%PDF'))
@@ -0,0 +1,80 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from issue_tracker.models import Issue
+from requirements.models import dashboard
+from requirements.models import project_api
+from requirements.models.iteration import Iteration
+from requirements.models.story import Story
+
+TODAY = datetime.date(2016, 10, 15)
+
+
+class DashboardTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.__user = User.objects.create_user(username="owner", password="pass")
+        self.__other = User.objects.create_user(username="other", password="pass")
+        self.__project = self.__create_project('mine')
+
+    def __create_project(self, title, user=None):
+        project = project_api.create_project(user or self.__user, {'title': title, 'description': 'desc'})
+        Story.objects.create(project=project, title='s1', status=Story.STATUS_STARTED, points=3, hours=5)
+        Story.objects.create(project=project, title='s2', status=Story.STATUS_STARTED, points=2, hours=1)
+        Story.objects.create(project=project, title='s3', status=Story.STATUS_ACCEPTED, points=1, hours=2)
+        Issue.objects.create(title='open', project=project, status='Open-Assigned')
+        Issue.objects.create(title='closed', project=project, status='Closed-Fixed')
+        return project
+
+    def test_summary(self):
+        Iteration.objects.create(project=self.__project, title='past', start_date=datetime.date(2016, 9, 1),
+                                 end_date=datetime.date(2016, 9, 30))
+        current = Iteration.objects.create(project=self.__project, title='now',
+                                           start_date=datetime.date(2016, 10, 1),
+                                           end_date=datetime.date(2016, 10, 31))
+        summary = dashboard.get_project_summaries(self.__user.id, TODAY)[self.__project.id]
+        self.assertEqual(summary.story_count, 3)
+        self.assertEqual(summary.stories_by_status,
+                         [('Unstarted', 0), ('Started', 2), ('Completed', 0), ('Accepted', 1)])
+        self.assertEqual(summary.points, 6)
+        self.assertEqual(summary.hours, 8)
+        self.assertEqual(summary.open_issues, 1)
+        self.assertEqual(summary.current_iteration, current)
+
+    def test_only_the_users_projects(self):
+        others = self.__create_project('theirs', user=self.__other)
+        summaries = dashboard.get_project_summaries(self.__user.id, TODAY)
+        self.assertEqual(summaries.keys(), [self.__project.id])
+        self.assertIsNone(summaries[self.__project.id].current_iteration)
+        self.assertIn(others.id, dashboard.get_project_summaries(self.__other.id, TODAY))
+
+    def test_query_count_is_flat(self):
+        with self.assertNumQueries(3):
+            dashboard.get_project_summaries(self.__user.id, TODAY)
+        for i in range(5):
+            self.__create_project('more %d' % i)
+        with self.assertNumQueries(3):
+            dashboard.get_project_summaries(self.__user.id, TODAY)
+
+    def __dashboard_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/requirements/projects')
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_dashboard(self):
+        self.client.login(username='owner', password='pass')
+        response, queries = self.__dashboard_queries()
+        self.assertContains(response, '3 stories')
+        self.assertContains(response, '1 open issues')
+        few = self.__dashboard_queries()[1]
+        for i in range(5):
+            self.__create_project('more %d' % i)
+        # The first view after the change reloads the cached memberships.
+        self.__dashboard_queries()
+        self.assertEqual(self.__dashboard_queries()[1], few)
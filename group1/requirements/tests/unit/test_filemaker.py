@@ -0,0 +1,86 @@
+import StringIO
+
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.contrib.auth.models import User
+from reportlab.platypus import SimpleDocTemplate
+from requirements.models import filemaker
+from requirements.models import iteration as mdl_iteration
+from requirements.models import project_api
+from requirements.models import story as mdl_story
+from requirements.models import task as mdl_task
+
+ALL_OPTIONS = dict((option, True) for option in (
+    'iteration_description', 'iteration_duration', 'story_description',
+    'story_reason', 'story_test', 'story_task', 'story_owner', 'story_hours',
+    'story_status', 'story_points', 'pie_chart'))
+
+
+class PDFReportTestCase(TestCase):
+
+    def setUp(self):
+        self.__owner = User.objects.create_user(
+            username="owner", password="pass")
+        self.__project = project_api.create_project(
+            self.__owner, {'title': 'mine', 'description': 'desc'})
+        self.__iteration = mdl_iteration.create_iteration(
+            self.__project, {'title': 'first', 'description': 'iter desc'})
+        self.client.login(username="owner", password="pass")
+
+    def __populate(self, stories):
+        for i in range(stories):
+            s = mdl_story.create_story(
+                self.__project, {'title': 'story %d' % i,
+                                 'owner': self.__owner})
+            if i % 2:
+                s.iteration = self.__iteration
+                s.save()
+            mdl_task.create_task(s, {'description': 'task %d' % i})
+
+    def __count_report_queries(self):
+        output = StringIO.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            filemaker.process_pdf(SimpleDocTemplate(output),
+                                  str(self.__project.id), ALL_OPTIONS)
+        self.assertTrue(output.getvalue().startswith('%PDF'))
+        return len(queries)
+
+    def test_report_queries_do_not_grow_with_stories(self):
+        self.__populate(2)
+        few = self.__count_report_queries()
+        self.__populate(20)
+        self.assertEqual(self.__count_report_queries(), few)
+
+    def test_styles_are_built_once(self):
+        self.assertIs(filemaker.get_style_dic(), filemaker.get_style_dic())
+
+    def test_report_data_groups_stories(self):
+        self.__populate(4)
+        data = filemaker.ReportData(str(self.__project.id), ALL_OPTIONS)
+        self.assertEqual(data.story_counts(), [2, 2])
+        self.assertEqual(data.story_names(), ['icebox', 'first'])
+
+    def test_chunks_cover_every_story(self):
+        self.__populate(filemaker.STORY_CHUNK_SIZE + 5)
+        data = filemaker.ReportData(str(self.__project.id), ALL_OPTIONS)
+        flowables = [f for chunk in
+                     filemaker.generate_report_chunks(data, ALL_OPTIONS)
+                     for f in chunk]
+        titles = [f.text for f in flowables
+                  if getattr(f, 'style', None) is not None and
+                  f.style.name == 'storyTitle']
+        self.assertEqual(len(titles), filemaker.STORY_CHUNK_SIZE + 5)
+
+    def test_queue_renders_every_page(self):
+        stories = filemaker.STORY_CHUNK_SIZE * 3
+        self.__populate(stories)
+        queued = SimpleDocTemplate(StringIO.StringIO(), pageCompression=0)
+        filemaker.process_pdf(queued, str(self.__project.id), ALL_OPTIONS)
+        # The same report built from a plain list, the way platypus expects it.
+        data = filemaker.ReportData(str(self.__project.id), ALL_OPTIONS)
+        listed = SimpleDocTemplate(StringIO.StringIO())
+        listed.build([f for chunk in filemaker.generate_report_chunks(data, ALL_OPTIONS) for f in chunk])
+        self.assertGreater(listed.page, 2)
+        self.assertEqual(queued.page, listed.page)
+        self.assertIn('story %d' % (stories - 1), queued.filename.getvalue())
@@ -0,0 +1,66 @@
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.db import connection
+from django.db import transaction
+from django.test import TestCase
+from requirements.models import files as mdl_files
+from requirements.models import project_api
+from requirements.models import story_attachment as mdl_attachment
+from requirements.models import user_association
+from requirements.models.story import Story
+from requirements.models.user_association import UserAssociation
+
+
+def query_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    cursor = connection.cursor()
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    return ' / '.join(row[-1] for row in cursor.fetchall())
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax.')
+class IndexTestCase(TestCase):
+
+    def setUp(self):
+        self.__owner = User.objects.create_user(
+            username="owner", password="pass")
+        self.__project = project_api.create_project(
+            self.__owner, {'title': 'mine', 'description': 'desc'})
+
+    def __assertUsesIndex(self, queryset, index):
+        plan = query_plan(queryset)
+        self.assertIn('USING', plan)
+        self.assertIn(index, plan)
+
+    def test_icebox_stories(self):
+        self.__assertUsesIndex(project_api.get_stories_with_no_iteration(self.__project),
+                               '(project_id=? AND iteration_id=?)')
+
+    def test_stories_by_belong(self):
+        self.__assertUsesIndex(Story.objects.filter(project=self.__project, belong='BACKLOG'),
+                               '(project_id=? AND belong=?)')
+
+    def test_attachment_by_uuid(self):
+        self.__assertUsesIndex(mdl_attachment.StoryAttachment.objects.filter(uuid='x'), '(uuid=?)')
+
+    def test_project_file_by_uuid(self):
+        self.__assertUsesIndex(mdl_files.ProjectFile.objects.filter(uuid='x'), '(uuid=?)')
+
+    def test_association_by_user_and_project(self):
+        self.__assertUsesIndex(UserAssociation.objects.filter(user=self.__owner, project=self.__project),
+                               '(user_id=? AND project_id=?)')
+
+    def test_association_is_unique(self):
+        with transaction.atomic():
+            self.assertRaises(IntegrityError, UserAssociation.objects.create, user=self.__owner,
+                              project=self.__project, role=user_association.ROLE_CLIENT)
+
+    def test_adding_member_again_changes_role(self):
+        client = User.objects.create_user(username="client", password="pass")
+        project_api.add_user_to_project(self.__project.id, 'client', user_association.ROLE_CLIENT)
+        project_api.add_user_to_project(self.__project.id, 'client', user_association.ROLE_DEVELOPER)
+        self.assertEqual(UserAssociation.objects.get(user=client, project=self.__project).role,
+                         user_association.ROLE_DEVELOPER)
+
@@ -0,0 +1,110 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError
+from django.db import transaction
+from django.test import TestCase
+from requirements.models import iteration as mdl_iteration
+from requirements.models import iteration_stats
+from requirements.models import project_api
+from requirements.models import story as mdl_story
+from requirements.models.iteration import Iteration
+from requirements.models.iteration_stats import IterationStats
+from requirements.models.story import Story
+
+
+class IterationStatsTestCase(TestCase):
+
+    def setUp(self):
+        self.__user = User.objects.create_user(username="owner", password="pass")
+        self.__project = project_api.create_project(self.__user, {'title': 'proj', 'description': 'desc'})
+        self.__iteration = Iteration.objects.create(project=self.__project, title='it1',
+                                                    start_date=datetime.date(2016, 10, 1),
+                                                    end_date=datetime.date(2016, 10, 31))
+        self.__story = Story.objects.create(project=self.__project, title='s1',
+                                            status=Story.STATUS_STARTED, points=3, hours=5)
+
+    def __icebox(self):
+        return iteration_stats.get_bucket_stats(self.__project.id, None, iteration_stats.BUCKET_ICEBOX)
+
+    def __backlog(self):
+        return iteration_stats.get_bucket_stats(self.__project.id, None, iteration_stats.BUCKET_BACKLOG)
+
+    def __totals(self, stats):
+        return (stats.story_count, stats.started, stats.points, stats.hours)
+
+    def __assertRebuildAgrees(self):
+        def rows():
+            return sorted((s.iteration_id, s.bucket, s.unstarted, s.started, s.completed, s.accepted,
+                           s.points, s.hours) for s in IterationStats.objects.all() if s.story_count)
+        maintained = rows()
+        iteration_stats.rebuild_iteration_stats()
+        self.assertEqual(maintained, rows())
+
+    def test_create(self):
+        self.assertEqual(self.__totals(self.__icebox()), (1, 1, 3, 5))
+        self.assertEqual(self.__icebox().stories_by_status,
+                         [('Unstarted', 0), ('Started', 1), ('Completed', 0), ('Accepted', 0)])
+        self.assertEqual(iteration_stats.get_iteration_stats(self.__iteration).story_count, 0)
+
+    def test_create_from_request_data(self):
+        mdl_story.create_story(self.__project, {'title': 's2', 'status': '4', 'points': '2', 'hours': '7'})
+        self.assertEqual(self.__icebox().accepted, 1)
+        self.assertEqual((self.__icebox().points, self.__icebox().hours), (5, 12))
+
+    def test_moves(self):
+        mdl_iteration.move_story_to_iteration(self.__story, self.__iteration)
+        self.assertEqual(self.__totals(iteration_stats.get_iteration_stats(self.__iteration)), (1, 1, 3, 5))
+        self.assertEqual(self.__icebox().story_count, 0)
+
+        mdl_iteration.move_story_to_backlog(self.__story)
+        self.assertEqual(self.__totals(self.__backlog()), (1, 1, 3, 5))
+        self.assertEqual(iteration_stats.get_iteration_stats(self.__iteration).story_count, 0)
+
+        mdl_iteration.move_story_to_icebox(self.__story)
+        self.assertEqual(self.__totals(self.__icebox()), (1, 1, 3, 5))
+        self.assertEqual(self.__backlog().story_count, 0)
+        self.__assertRebuildAgrees()
+
+    def test_edit_of_a_reloaded_story(self):
+        story = Story.objects.get(id=self.__story.id)
+        story.status = Story.STATUS_COMPLETED
+        story.points = 1
+        story.save()
+        stats = self.__icebox()
+        self.assertEqual((stats.started, stats.completed, stats.points), (0, 1, 1))
+        self.__assertRebuildAgrees()
+
+    def test_delete(self):
+        mdl_story.delete_story(self.__story.id)
+        self.assertEqual(self.__totals(self.__icebox()), (0, 0, 0, 0))
+
+    def test_delete_iteration(self):
+        mdl_iteration.move_story_to_iteration(self.__story, self.__iteration)
+        self.__iteration.delete()
+        self.assertEqual(self.__totals(self.__icebox()), (1, 1, 3, 5))
+
+    def test_delete_project(self):
+        mdl_iteration.move_story_to_iteration(self.__story, self.__iteration)
+        project_api.delete_project(self.__project)
+        self.assertFalse(IterationStats.objects.exists())
+
+    def test_rebuild_repairs_bulk_updates(self):
+        Story.objects.filter(id=self.__story.id).update(iteration=self.__iteration, belong='ITERATION')
+        self.assertEqual(iteration_stats.get_iteration_stats(self.__iteration).story_count, 0)
+        iteration_stats.rebuild_iteration_stats(self.__project.id)
+        self.assertEqual(self.__totals(iteration_stats.get_iteration_stats(self.__iteration)), (1, 1, 3, 5))
+        self.assertEqual(self.__icebox().story_count, 0)
+
+    def test_iteration_page_reads_one_row(self):
+        mdl_iteration.move_story_to_iteration(self.__story, self.__iteration)
+        self.client.login(username="owner", password="pass")
+        response = self.client.get('/requirements/iterationdetail/%d/%d' % (self.__project.id, self.__iteration.id))
+        self.assertContains(response, '1 stories')
+        self.assertContains(response, '3 points')
+
+    def test_null_buckets_are_unique(self):
+        key = (self.__project.id, None, iteration_stats.BUCKET_ICEBOX)
+        self.assertEqual(IterationStats.objects.filter(bucket_key=iteration_stats._bucket_key(key)).count(), 1)
+        with transaction.atomic():
+            self.assertRaises(IntegrityError, iteration_stats._new_row(key).save)
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from requirements.models import project_api
+from requirements.models import user_association
+from requirements.models import user_manager
+from requirements.models.project import Project
+
+
+class MembershipTestCase(TestCase):
+
+    def setUp(self):
+        self.__user = User.objects.create_user(id=5, username="five", password="pass")
+        self.__other = User.objects.create_user(id=15, username="fifteen", password="pass")
+        self.__zulu = project_api.create_project(self.__user, {'title': 'zulu', 'description': 'desc'})
+        self.__alpha = project_api.create_project(self.__user, {'title': 'alpha', 'description': 'desc'})
+        self.__others = project_api.create_project(self.__other, {'title': 'other', 'description': 'desc'})
+
+    def test_projects_for_user_match_the_user_only(self):
+        self.assertEqual(list(project_api.get_projects_for_user(self.__user.id)), [self.__alpha, self.__zulu])
+        self.assertEqual(list(project_api.get_projects_for_user(self.__other.id)), [self.__others])
+
+    def test_memberships(self):
+        project_api.add_user_to_project(self.__others.id, 'five', user_association.ROLE_CLIENT)
+        memberships = user_manager.get_memberships(self.__user.id)
+        self.assertEqual([(m.project.title, m.role) for m in memberships],
+                         [('alpha', user_association.ROLE_OWNER),
+                          ('other', user_association.ROLE_CLIENT),
+                          ('zulu', user_association.ROLE_OWNER)])
+        self.assertEqual(user_manager.get_user_projects(self.__user.id),
+                         [self.__alpha, self.__others, self.__zulu])
+
+    def test_memberships_take_one_query(self):
+        with self.assertNumQueries(1):
+            user_manager.get_user_projects(self.__user.id)
+
+    def test_memberships_follow_changes(self):
+        user_manager.get_memberships(self.__user.id)
+        project_api.add_user_to_project(self.__others.id, 'five', user_association.ROLE_CLIENT)
+        self.assertEqual(len(user_manager.get_memberships(self.__user.id)), 3)
+        project_api.remove_user_from_project(self.__others.id, 'five')
+        self.assertEqual(len(user_manager.get_memberships(self.__user.id)), 2)
+        self.__zulu.title = 'beta'
+        self.__zulu.save()
+        self.assertEqual([p.title for p in user_manager.get_user_projects(self.__user.id)], ['alpha', 'beta'])
+        project_api.delete_project(self.__alpha)
+        self.assertEqual(user_manager.get_user_projects(self.__user.id), [self.__zulu])
+
+    def test_dashboard(self):
+        self.client.login(username='five', password='pass')
+        response = self.client.get('/requirements/projects')
+        self.assertContains(response, 'data-del-proj="zulu"')
+        self.assertContains(response, 'data-del-proj="alpha"')
+        self.assertNotContains(response, 'data-del-proj="other"')
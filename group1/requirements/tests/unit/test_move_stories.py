@@ -0,0 +1,75 @@
+import datetime
+import json
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from requirements.models import iteration_stats
+from requirements.models import project_api
+from requirements.models.iteration import Iteration
+from requirements.models.story import Story
+
+
+class MoveStoriesTestCase(TestCase):
+
+    def setUp(self):
+        self.__owner = User.objects.create_user(username="owner", password="pass")
+        self.__developer = User.objects.create_user(username="dev", password="pass")
+        self.__project = project_api.create_project(self.__owner, {'title': 'proj', 'description': 'desc'})
+        project_api.add_user_to_project(self.__project.id, 'dev', 'developer')
+        self.__iteration = Iteration.objects.create(project=self.__project, title='it1',
+                                                    start_date=datetime.date.today(),
+                                                    end_date=datetime.date.today())
+        self.__stories = [Story.objects.create(project=self.__project, title='s%d' % i, points=i, hours=1)
+                          for i in range(1, 4)]
+        self.client.login(username="owner", password="pass")
+
+    def __move(self, stories, target, **data):
+        data.update(stories=[story.id for story in stories], target=target)
+        return self.client.post('/requirements/movestories/%d' % self.__project.id, data)
+
+    def test_move_to_iteration(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.__move(self.__stories[:2], 'iteration', iteration=self.__iteration.id)
+        self.assertEqual(response.status_code, 200)
+        story_queries = [q['sql'] for q in queries if '"requirements_story"' in q['sql']]
+        # The membership check, the UPDATE and the rebuild of the totals.
+        self.assertEqual(len(story_queries), 3)
+        self.assertIn('UPDATE "requirements_story"', story_queries[1])
+        delta = json.loads(response.content)
+        self.assertEqual(delta['target'], {'iteration': self.__iteration.id, 'belong': 'ITERATION'})
+        self.assertEqual([moved['story'] for moved in delta['moved']], [s.id for s in self.__stories[:2]])
+        self.assertEqual(delta['moved'][0]['from_belong'], 'ICEBOX')
+        self.assertEqual(sorted((stats['bucket'], stats['stories'], stats['points']) for stats in delta['stats']),
+                         [('ICEBOX', 1, 3), ('ITERATION', 2, 3)])
+        self.assertEqual(Story.objects.filter(iteration=self.__iteration).count(), 2)
+        self.assertEqual(iteration_stats.get_iteration_stats(self.__iteration).points, 3)
+
+    def test_emptied_list_reports_zero(self):
+        delta = json.loads(self.__move(self.__stories, 'backlog').content)
+        self.assertEqual(sorted((stats['bucket'], stats['stories']) for stats in delta['stats']),
+                         [('BACKLOG', 3), ('ICEBOX', 0)])
+
+    def test_story_of_another_project(self):
+        other = project_api.create_project(self.__owner, {'title': 'other', 'description': 'desc'})
+        stranger = Story.objects.create(project=other, title='theirs')
+        response = self.__move([self.__stories[0], stranger], 'backlog')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Story.objects.filter(belong='BACKLOG').count(), 0)
+
+    def test_iteration_of_another_project(self):
+        other = project_api.create_project(self.__owner, {'title': 'other', 'description': 'desc'})
+        iteration = Iteration.objects.create(project=other, title='theirs', start_date=datetime.date.today(),
+                                             end_date=datetime.date.today())
+        response = self.__move(self.__stories, 'iteration', iteration=iteration.id)
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.__move(self.__stories, 'nowhere').status_code, 400)
+        self.assertEqual(self.__move([], 'icebox').status_code, 400)
+        self.assertEqual(self.__move(self.__stories, 'iteration').status_code, 400)
+
+    def test_owner_only(self):
+        self.client.login(username="dev", password="pass")
+        self.assertEqual(self.__move(self.__stories, 'backlog').status_code, 401)
@@ -0,0 +1,76 @@
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.contrib.auth.models import User
+from requirements.models import project_api
+from requirements.models import user_manager
+from requirements.models import user_association
+from requirements.models.project import Project
+from requirements.models.user_association import UserAssociation
+
+
+class PermissionContextTestCase(TestCase):
+
+    def setUp(self):
+        self.__owner = User.objects.create_user(username="owner", password="pass")
+        self.__dev = User.objects.create_user(username="dev", password="pass")
+        self.__project = project_api.create_project(
+            self.__owner, {'title': 'title', 'description': 'desc'})
+        self.__factory = RequestFactory()
+
+    def __request(self, user):
+        request = self.__factory.get('/')
+        request.user = user
+        return request
+
+    def test_context_is_resolved_once_per_request(self):
+        request = self.__request(self.__owner)
+        with self.assertNumQueries(1):
+            context = user_manager.get_permission_context(request, self.__project.id)
+        with self.assertNumQueries(0):
+            again = user_manager.get_permission_context(request, str(self.__project.id))
+        self.assertIs(context, again)
+        self.assertTrue(context.is_owner())
+        self.assertTrue(context.has_permission(user_association.PERM_DELETE_STORY))
+        self.assertIsInstance(context.permissions, frozenset)
+
+    def test_context_is_resolved_again_by_the_next_request(self):
+        project_api.add_user_to_project(
+            self.__project.id, self.__dev.username, user_association.ROLE_DEVELOPER)
+        request = self.__request(self.__dev)
+        self.assertTrue(user_manager.get_permission_context(request, self.__project.id).can_access())
+        # The request already resolved its context; the next one sees the removal.
+        UserAssociation.objects.filter(user=self.__dev).delete()
+        self.assertTrue(user_manager.get_permission_context(request, self.__project.id).can_access())
+        with self.assertNumQueries(1):
+            context = user_manager.get_permission_context(
+                self.__request(self.__dev), self.__project.id)
+        self.assertFalse(context.can_access())
+        self.assertEqual(context.permissions, frozenset())
+
+    def test_add_user_takes_effect(self):
+        self.assertFalse(project_api.can_user_access_project(self.__dev.id, self.__project.id))
+        project_api.add_user_to_project(
+            self.__project.id, self.__dev.username, user_association.ROLE_DEVELOPER)
+        context = user_manager.get_permission_context(
+            self.__request(self.__dev), self.__project.id)
+        self.assertTrue(context.can_access())
+        self.assertEqual(context.role, user_association.ROLE_DEVELOPER)
+
+    def test_change_role_takes_effect(self):
+        project_api.add_user_to_project(
+            self.__project.id, self.__dev.username, user_association.ROLE_CLIENT)
+        self.assertFalse(user_manager.isOwner(self.__project.id, self.__dev.id))
+        project_api.change_user_role(self.__project, self.__dev, user_association.ROLE_OWNER)
+        self.assertTrue(user_manager.isOwner(self.__project.id, self.__dev.id))
+
+    def test_remove_user_takes_effect(self):
+        project_api.add_user_to_project(
+            self.__project.id, self.__dev.username, user_association.ROLE_DEVELOPER)
+        self.assertTrue(project_api.can_user_access_project(self.__dev.id, self.__project.id))
+        project_api.remove_user_from_project(self.__project.id, self.__dev.username)
+        self.assertFalse(project_api.can_user_access_project(self.__dev.id, self.__project.id))
+
+    def test_decorator_denies_non_members(self):
+        self.client.login(username="dev", password="pass")
+        response = self.client.get('/requirements/projectdetail/%d' % self.__project.id)
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,73 @@
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.contrib.auth.models import User
+from requirements.models import project_api
+from requirements.models import story as mdl_story
+from requirements.models import task as mdl_task
+from requirements.models import story_comment as mdl_story_comment
+from issue_tracker.models import Issue
+
+
+class ProjectDetailQueryTestCase(TestCase):
+
+    def setUp(self):
+        self.__owner = User.objects.create_user(
+            username="owner", password="pass")
+        self.__project = project_api.create_project(
+            self.__owner, {'title': 'mine', 'description': 'desc'})
+        self.__other = project_api.create_project(
+            self.__owner, {'title': 'other', 'description': 'desc'})
+        self.client.login(username="owner", password="pass")
+
+    def __populate(self, project, stories, prefix):
+        for i in range(stories):
+            s = mdl_story.create_story(
+                project, {'title': '%s story %d' % (prefix, i)})
+            mdl_task.create_task(s, {'description': '%s task %d' % (prefix, i)})
+            mdl_story_comment.create_comment(
+                s, {'title': '%s comment %d' % (prefix, i)})
+            Issue.objects.create(title='%s issue %d' % (prefix, i),
+                                 project=project, reporter=self.__owner)
+
+    def __count_queries(self, url):
+        # The first request after signing in saves the session's last
+        # activity time; count the queries of a request without that write
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_project_detail_only_shows_project_rows(self):
+        self.__populate(self.__project, 2, 'mine')
+        self.__populate(self.__other, 2, 'other')
+        _, response = self.__count_queries(
+            '/requirements/projectdetail/%d' % self.__project.id)
+        self.assertContains(response, 'mine task 1')
+        self.assertContains(response, 'mine comment 1')
+        self.assertContains(response, 'mine issue 1')
+        self.assertNotContains(response, 'other task')
+        self.assertNotContains(response, 'other issue')
+
+    def test_project_detail_queries_do_not_grow_with_database(self):
+        self.__populate(self.__project, 2, 'mine')
+        url = '/requirements/projectdetail/%d' % self.__project.id
+        before, _ = self.__count_queries(url)
+
+        # Rows in other projects and more rows in this one must not add queries
+        self.__populate(self.__other, 20, 'other')
+        self.__populate(self.__project, 10, 'more')
+        after, _ = self.__count_queries(url)
+        self.assertEqual(before, after)
+
+    def test_issue_list_queries_do_not_grow_with_database(self):
+        self.__populate(self.__project, 2, 'mine')
+        url = '/requirements/bugdetail/%d' % self.__project.id
+        before, response = self.__count_queries(url)
+        self.assertNotContains(response, 'other issue')
+
+        self.__populate(self.__other, 20, 'other')
+        after, response = self.__count_queries(url)
+        self.assertEqual(before, after)
+        self.assertNotContains(response, 'other issue')
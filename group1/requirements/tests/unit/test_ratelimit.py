@@ -0,0 +1,108 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.test import override_settings
+from django.contrib.auth.models import User
+from requirements import ratelimit
+
+NOW = 6000.0
+
+
+class LoginRateLimiterTestCase(TestCase):
+
+    def setUp(self):
+        self.__cache = LocMemCache('test-ratelimit', {})
+        self.__cache.clear()
+        self.__limiter = ratelimit.LoginRateLimiter(limit=3, window=60, cache=self.__cache)
+
+    def __fail(self, ip, username, times, now=NOW):
+        for i in range(times):
+            remaining = self.__limiter.record_failure(ip, username, now)
+        return remaining
+
+    def test_blocks_after_limit(self):
+        self.assertEqual(self.__fail('1.1.1.1', 'alice', 2), 1)
+        self.assertFalse(self.__limiter.is_blocked('1.1.1.1', NOW))
+        self.assertEqual(self.__fail('1.1.1.1', 'alice', 1), 0)
+        self.assertTrue(self.__limiter.is_blocked('1.1.1.1', NOW))
+
+    def test_slows_username_from_any_address(self):
+        self.__fail('1.1.1.1', 'alice', 1)
+        self.__fail('2.2.2.2', 'Alice', 1)
+        self.__fail('3.3.3.3', 'alice', 1)
+        self.assertTrue(self.__limiter.is_slowed('alice', NOW))
+        self.assertFalse(self.__limiter.is_blocked('4.4.4.4', NOW))
+        self.assertFalse(self.__limiter.is_slowed('bob', NOW))
+
+    def test_slowed_username_gets_one_turn_per_interval(self):
+        self.__fail('1.1.1.1', 'alice', 3)
+        # The last failure used up the turn.
+        self.assertFalse(self.__limiter.take_turn('alice'))
+        self.__cache.delete(self.__limiter._turn_key('alice'))
+        self.assertTrue(self.__limiter.take_turn('Alice'))
+        self.assertFalse(self.__limiter.take_turn('alice'))
+
+    def test_blocks_address_for_any_username(self):
+        self.__fail('1.1.1.1', 'alice', 1)
+        self.__fail('1.1.1.1', 'bob', 1)
+        self.__fail('1.1.1.1', 'carol', 1)
+        self.assertTrue(self.__limiter.is_blocked('1.1.1.1', NOW))
+        self.assertFalse(self.__limiter.is_blocked('2.2.2.2', NOW))
+        self.assertFalse(self.__limiter.is_slowed('dave', NOW))
+
+    def test_window_slides(self):
+        # All three failures at the start of a window.
+        self.__fail('1.1.1.1', 'alice', 3, now=NOW)
+        # Half way into the next window half of them still count.
+        self.assertFalse(self.__limiter.is_blocked('1.1.1.1', NOW + 90))
+        self.assertEqual(self.__limiter.remaining('1.1.1.1', 'alice', NOW + 90), 1)
+        self.assertEqual(self.__limiter.remaining('1.1.1.1', 'alice', NOW + 120), 3)
+
+    def test_success_forgets_username_only(self):
+        self.__fail('1.1.1.1', 'alice', 2)
+        self.__limiter.record_success('1.1.1.1', 'alice', NOW)
+        self.assertEqual(self.__limiter.remaining('2.2.2.2', 'alice', NOW), 3)
+        self.assertEqual(self.__limiter.remaining('1.1.1.1', 'bob', NOW), 1)
+
+
+class SigninRateLimitTestCase(TestCase):
+
+    def setUp(self):
+        ratelimit.get_cache().clear()
+        User.objects.create_user(username='alice', password='right')
+
+    def tearDown(self):
+        ratelimit.get_cache().clear()
+
+    def __signin(self, password, ip='1.1.1.1'):
+        return self.client.post('/signin', {'username': 'alice', 'password': password, 'next': ''},
+                                REMOTE_ADDR=ip)
+
+    def test_wrong_password_then_blocked(self):
+        response = self.__signin('wrong')
+        self.assertContains(response, 'If you fail more than 2 times')
+        self.__signin('wrong')
+        self.assertContains(self.__signin('wrong'), 'please signin after 60s later')
+        # The address is blocked, even with the right password.
+        self.assertContains(self.__signin('right'), 'please signin after 60s later')
+
+    def test_wrong_passwords_only_slow_the_username_down(self):
+        for ip in ('1.1.1.1', '2.2.2.2', '3.3.3.3'):
+            response = self.__signin('wrong', ip=ip)
+        self.assertContains(response, 'you need to wait 5s for next try')
+        self.assertContains(self.__signin('right', ip='4.4.4.4'), 'please signin after 5s')
+        # Once the interval is over the right password gets in, from anywhere.
+        limiter = ratelimit.LoginRateLimiter()
+        limiter.cache.delete(limiter._turn_key('alice'))
+        self.assertEqual(self.__signin('right', ip='4.4.4.4').status_code, 302)
+
+    def test_process_local_cache_is_refused(self):
+        with override_settings(LOGIN_RATELIMIT_CACHE='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                ratelimit.get_cache()
+
+    def test_success_resets_username(self):
+        self.__signin('wrong')
+        self.__signin('wrong')
+        self.assertEqual(self.__signin('right').status_code, 302)
+        self.assertContains(self.__signin('wrong', ip='2.2.2.2'), 'If you fail more than 2 times')
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.contrib.auth.models import User
+from requirements.models import filemaker
+from requirements.models import iteration as mdl_iteration
+from requirements.models import project_api
+from requirements.models import report_cache
+from requirements.models import report_queue
+from requirements.models import story as mdl_story
+from requirements.models import task as mdl_task
+from requirements.models.report_job import ReportJob
+
+ALL_OPTIONS = dict((option, True) for option in filemaker.REPORT_OPTIONS)
+
+
+class ReportCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.__root = tempfile.mkdtemp()
+        self.__settings = override_settings(REPORT_WORKER='sync',
+                                            REPORT_ROOT=self.__root)
+        self.__settings.enable()
+        self.__owner = User.objects.create_user(
+            username="owner", password="pass")
+        self.__project = project_api.create_project(
+            self.__owner, {'title': 'mine', 'description': 'desc'})
+        self.__story = mdl_story.create_story(
+            self.__project, {'title': 'story'})
+
+    def tearDown(self):
+        self.__settings.disable()
+        shutil.rmtree(self.__root)
+
+    def __key(self):
+        return report_cache.get_cache_key(self.__project, ALL_OPTIONS)
+
+    def test_key_follows_project_changes(self):
+        keys = [self.__key()]
+        self.__story.title = 'renamed'
+        self.__story.save()
+        keys.append(self.__key())
+        mdl_iteration.create_iteration(self.__project, {'title': 'iter'})
+        keys.append(self.__key())
+        self.__story.delete()
+        keys.append(self.__key())
+        self.assertEqual(len(set(keys)), len(keys))
+        self.assertEqual(self.__key(), keys[-1])
+
+    def test_key_follows_task_changes(self):
+        self.client.login(username="owner", password="pass")
+        keys = [self.__key()]
+        self.client.post('/requirements/addtaskintolist/%d' % self.__story.id, {'description': 'first'})
+        keys.append(self.__key())
+        task = mdl_task.Task.objects.get(story=self.__story)
+        self.client.post('/requirements/edittaskinlist/%d/%d' % (self.__story.id, task.id),
+                         {'description': 'edited'})
+        self.assertEqual(mdl_task.get_task(task.id).description, 'edited')
+        keys.append(self.__key())
+        self.client.post('/requirements/removetaskfromlist/%d/%d' % (self.__story.id, task.id))
+        keys.append(self.__key())
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_key_depends_on_options(self):
+        self.assertNotEqual(self.__key(), report_cache.get_cache_key(
+            self.__project, {'pie_chart': True}))
+
+    def test_cached_report_is_not_rendered_again(self):
+        first = report_queue.request_report(self.__project, ALL_OPTIONS)
+        ReportJob.objects.all().delete()
+
+        def fail(*args):
+            raise AssertionError('rendered again')
+        process_pdf = filemaker.process_pdf
+        filemaker.process_pdf = fail
+        try:
+            job = report_queue.request_report(self.__project, ALL_OPTIONS)
+        finally:
+            filemaker.process_pdf = process_pdf
+        self.assertEqual(job.status, ReportJob.STATUS_DONE)
+        self.assertEqual(job.cache_key, first.cache_key)
+
+    def test_least_recently_used_reports_are_evicted(self):
+        for name in ('old', 'used', 'new'):
+            with open(os.path.join(self.__root, name + '.pdf'), 'wb') as f:
+                f.write('x' * 100)
+        now = time.time()
+        os.utime(os.path.join(self.__root, 'old.pdf'), (now - 300, now - 300))
+        os.utime(os.path.join(self.__root, 'used.pdf'), (now - 200, now - 200))
+        os.utime(os.path.join(self.__root, 'new.pdf'), (now - 100, now - 100))
+        self.assertIsNotNone(report_cache.get('used'))
+
+        with override_settings(REPORT_CACHE_MAX_BYTES=250):
+            report_cache.evict()
+        self.assertEqual(sorted(os.listdir(self.__root)),
+                         ['new.pdf', 'used.pdf'])
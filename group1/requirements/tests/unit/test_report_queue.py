@@ -0,0 +1,105 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.contrib.auth.models import User
+from requirements.models import project_api
+from requirements.models import report_queue
+from requirements.models import story as mdl_story
+from requirements.models.filemaker import REPORT_OPTIONS
+from requirements.models.report_job import ReportJob
+
+ALL_OPTIONS = dict((option, 'on') for option in REPORT_OPTIONS)
+
+
+class ReportQueueTestCase(TestCase):
+
+    def setUp(self):
+        self.__root = tempfile.mkdtemp()
+        self.__settings = override_settings(REPORT_WORKER='sync',
+                                            REPORT_ROOT=self.__root)
+        self.__settings.enable()
+        self.__owner = User.objects.create_user(
+            username="owner", password="pass")
+        self.__project = project_api.create_project(
+            self.__owner, {'title': 'mine', 'description': 'desc'})
+        mdl_story.create_story(self.__project, {'title': 'story'})
+        self.client.login(username="owner", password="pass")
+
+    def tearDown(self):
+        self.__settings.disable()
+        shutil.rmtree(self.__root)
+
+    def __request(self, options=ALL_OPTIONS):
+        response = self.client.post(
+            '/requirements/makepdf/%d' % self.__project.id, options)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_report_is_rendered_and_downloaded(self):
+        job = self.__request()
+        self.assertEqual(job['status'], 'done')
+        status = json.loads(self.client.get(job['status_url']).content)
+        self.assertEqual(status['status'], 'done')
+
+        response = self.client.get(job['download_url'])
+        self.assertEqual(response.status_code, 200)
+        content = ''.join(response.streaming_content)
+        self.assertTrue(content.startswith('%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(content))
+
+    def test_identical_requests_share_a_job(self):
+        first = self.__request()
+        self.assertEqual(self.__request()['job'], first['job'])
+        self.assertNotEqual(self.__request({'pie_chart': 'on'})['job'],
+                            first['job'])
+        self.assertEqual(ReportJob.objects.count(), 2)
+
+    def test_project_change_renders_again(self):
+        first = self.__request()
+        self.__project.description = 'changed'
+        self.__project.save()
+        self.assertNotEqual(self.__request()['job'], first['job'])
+
+    def test_missing_file_renders_again(self):
+        first = self.__request()
+        os.remove(ReportJob.objects.get(id=first['job']).get_path())
+        self.assertNotEqual(self.__request()['job'], first['job'])
+
+    def test_job_runs_once(self):
+        job = ReportJob.objects.get(id=self.__request()['job'])
+        self.assertFalse(report_queue.run_job(job.id))
+
+    def test_other_users_cannot_see_jobs(self):
+        job = self.__request()
+        User.objects.create_user(username="other", password="pass")
+        self.client.login(username="other", password="pass")
+        self.assertEqual(self.client.get(job['status_url']).status_code, 401)
+        self.assertEqual(self.client.get(job['download_url']).status_code, 401)
+
+    def test_stale_jobs_are_queued_again(self):
+        first = self.__request()
+        # As if no worker ever ran it.
+        ReportJob.objects.filter(id=first['job']).update(status=ReportJob.STATUS_QUEUED, finished=None)
+        self.assertEqual(self.__request()['job'], first['job'])
+        ReportJob.objects.filter(id=first['job']).update(
+            created=timezone.now() - datetime.timedelta(hours=1))
+        second = self.__request()
+        self.assertNotEqual(second['job'], first['job'])
+        self.assertEqual(second['status'], 'done')
+        self.assertEqual(ReportJob.objects.get(id=first['job']).status, ReportJob.STATUS_FAILED)
+
+    def test_stuck_running_jobs_are_queued_again(self):
+        first = self.__request()
+        os.remove(ReportJob.objects.get(id=first['job']).get_path())
+        ReportJob.objects.filter(id=first['job']).update(
+            status=ReportJob.STATUS_RUNNING, started=timezone.now() - datetime.timedelta(hours=1))
+        second = self.__request()
+        self.assertNotEqual(second['job'], first['job'])
+        self.assertEqual(second['status'], 'done')
+        self.assertEqual(ReportJob.objects.get(id=first['job']).error, 'Timed out.')
@@ -0,0 +1,80 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import RequestFactory
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.test.utils import override_settings
+from group1.middleware import SessionSecurityMiddleware
+from group1.settings import EXPIRE_TIME
+
+
+@override_settings(SESSION_SECURITY_ACTIVITY_GRANULARITY=60)
+class SessionSecurityMiddlewareTestCase(TestCase):
+
+    def setUp(self):
+        self.__user = User.objects.create_user(username='owner', password='pass')
+        self.__middleware = SessionSecurityMiddleware()
+
+    def __process(self, last_activity):
+        request = RequestFactory().get('/')
+        request.user = self.__user
+        request.session = SessionStore()
+        if last_activity is not None:
+            request.session['last_activity_time'] = last_activity
+            request.session.modified = False
+        return request, self.__middleware.process_request(request)
+
+    def test_first_request_stamps_session(self):
+        request, response = self.__process(None)
+        self.assertIsNone(response)
+        self.assertIsInstance(request.session['last_activity_time'], int)
+
+    def test_recent_activity_is_not_rewritten(self):
+        request, response = self.__process(int(time.time()) - 30)
+        self.assertIsNone(response)
+        self.assertFalse(request.session.modified)
+
+    def test_activity_moves_after_granularity(self):
+        request, response = self.__process(int(time.time()) - 90)
+        self.assertIsNone(response)
+        self.assertTrue(request.session.modified)
+        self.assertGreaterEqual(request.session['last_activity_time'], int(time.time()) - 1)
+
+    def test_idle_session_times_out(self):
+        request, response = self.__process(int(time.time()) - EXPIRE_TIME)
+        self.assertContains(response, 'Time out!')
+
+    def test_old_string_timestamp_starts_over(self):
+        request, response = self.__process('2016-10-01T10:00:00.000000')
+        self.assertIsNone(response)
+        self.assertIsInstance(request.session['last_activity_time'], int)
+
+    def test_page_views_do_not_write_session(self):
+        self.client.login(username='owner', password='pass')
+        self.client.get('/requirements/projects')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/requirements/projects')
+        writes = [query['sql'] for query in queries
+                  if 'django_session' in query['sql'] and not query['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+
+    def test_signing_out_drops_the_cached_session(self):
+        self.client.login(username='owner', password='pass')
+        self.client.get('/requirements/projects')
+        session_key = self.client.session.session_key
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        cache_key = store(session_key).cache_key
+        # The cache the session engine uses is seen by every process.
+        session_cache = caches[settings.SESSION_CACHE_ALIAS]
+        self.assertNotIsInstance(session_cache, LocMemCache)
+        self.assertIsNotNone(session_cache.get(cache_key))
+        self.client.get('/signout')
+        self.assertIsNone(session_cache.get(cache_key))
+        self.assertFalse(store().exists(session_key))
@@ -36,6 +36,10 @@ urlpatterns = patterns(
         iterations.edit_iteration),
     url(r'^deleteiteration/(?P<projectID>\d+)/(?P<iterationID>\d+)',
         iterations.delete_iteration),
+    url(r'^iterationanalytics/(?P<projectID>\d+)/(?P<iterationID>\d+)',
+        iterations.iteration_analytics),
+    url(r'^velocity/(?P<projectID>\d+)',
+        iterations.velocity),
     url(r'^iterations/(?P<projectID>\d+)',
         iterations.list_iterations_for_project),
     url(r'^iterationswithselection/(?P<projectID>\d+)/(?P<iterationID>\d+)',
@@ -53,6 +57,8 @@ urlpatterns = patterns(
     url(r'^movestorytobacklog/(?P<projectID>\d+)/(?P<storyID>\d+)',
         stories.move_story_to_backlog),
 
+    url(r'^movestories/(?P<projectID>\d+)',
+        stories.move_stories),
     url(r'^movestorytoiter/(?P<projectID>\d+)/(?P<storyID>\d+)/(?P<iterationID>\d+)',
         stories.move_story_to_iteration),
     url(r'^tasks/(?P<storyID>\d+)', stories.list_tasks),
@@ -108,4 +114,8 @@ urlpatterns = patterns(
         stories.download_attachment),
     url(r'^makepdf/(?P<projectID>\d+)',
         projects.makepdf),
+    url(r'^reportstatus/(?P<projectID>\d+)/(?P<jobID>\d+)',
+        projects.report_status),
+    url(r'^downloadreport/(?P<projectID>\d+)/(?P<jobID>\d+)',
+        projects.download_report),
 )
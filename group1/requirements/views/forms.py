@@ -294,4 +294,5 @@ class PDFForm(forms.ModelForm):
             'story_status',
             'story_points',
             'pie_chart',
+            'burndown_chart',
         )
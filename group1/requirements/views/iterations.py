@@ -5,14 +5,20 @@ from requirements.models import project_api
 from requirements.models import user_manager
 from requirements.models import story as mdl_story
 from requirements.models.story import Story
+from requirements.models import analytics
 from requirements.models import iteration as mdl_iteration
+from requirements.models import iteration_stats
+from requirements.models.iteration import Iteration
+from requirements.models.project import Project
 from requirements.models.user_manager import user_owns_project
+from requirements.models.user_manager import user_can_access_project
+from requirements.models.user_manager import get_permission_context
 from requirements.models.user_association import UserAssociation
 from forms import IterationForm
 from django.contrib.auth.decorators import login_required, permission_required
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.core.urlresolvers import reverse
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 import datetime
 
 
@@ -21,14 +27,13 @@ PERMISSION_OWN_PROJECT = 'requirements.own_project'
 
 @login_required(login_url='/signin')
 def iteration(request, projectID, iterationID):
-    if project_api.can_user_access_project(request.user.id, projectID):
-        projects = project_api.get_projects_for_user(request.user.id)
+    permissions = get_permission_context(request, projectID)
+    if permissions.can_access():
+        projects = user_manager.get_user_projects(request.user.id)
         project = project_api.get_project(projectID)
         if project is None:
             return redirect('/requirements/projects')
-        association = UserAssociation.objects.get(
-            user=request.user,
-            project=project)
+        association = permissions.association
         iterations = project_api.get_iterations_for_project(project)
         iteration = project_api.get_iteration(iterationID)
         if iteration is not None:
@@ -41,10 +46,14 @@ def iteration(request, projectID, iterationID):
                    'iterations': iterations,
                    'iteration': iteration,
                    'stories': stories,
-                   'owns_project': project_api.user_owns_project(request.user, project)
+                   'owns_project': permissions.is_owner()
                    }
         if iteration is None:
             context['isIceBox'] = True
+            context['stats'] = iteration_stats.get_bucket_stats(
+                project.id, None, iteration_stats.BUCKET_ICEBOX)
+        else:
+            context['stats'] = iteration_stats.get_iteration_stats(iteration)
         return render(request, 'IterationDetail.html', context)
     else:
         # return HttpResponse("You cannot access project " + proj)
@@ -53,14 +62,13 @@ def iteration(request, projectID, iterationID):
 
 @login_required(login_url='/signin')
 def backlog(request, projectID, iterationID):
-    if project_api.can_user_access_project(request.user.id, projectID):
-        projects = project_api.get_projects_for_user(request.user.id)
+    permissions = get_permission_context(request, projectID)
+    if permissions.can_access():
+        projects = user_manager.get_user_projects(request.user.id)
         project = project_api.get_project(projectID)
         if project is None:
             return redirect('/requirements/projects')
-        association = UserAssociation.objects.get(
-            user=request.user,
-            project=project)
+        association = permissions.association
         iterations = project_api.get_iterations_for_project(project)
         iteration = project_api.get_iteration(iterationID)
         priorities = Story.PRIORITY_CHOICES
@@ -75,7 +83,7 @@ def backlog(request, projectID, iterationID):
                    'iterations': iterations,
                    'iteration': iteration,
                    'stories': stories,
-                   'owns_project': project_api.user_owns_project(request.user, project)
+                   'owns_project': permissions.is_owner()
                    }
         return render(request, 'BacklogDetail.html', context)
     else:
@@ -166,7 +174,7 @@ def list_iterations_for_project(request, projectID):
     context = {
         'project': project,
         'iterations': iterations,
-        'owns_project': project_api.user_owns_project(request.user, project),
+        'owns_project': get_permission_context(request, projectID).is_owner(),
     }
     return render(request, 'SideBarIters.html', context)
 
@@ -181,8 +189,22 @@ def list_iterations_for_project_with_selection(
         'project': project,
         'iterations': iterations,
         'iteration': iteration,
-        'owns_project': project_api.user_owns_project(request.user, project),
+        'owns_project': get_permission_context(request, projectID).is_owner(),
     }
     if iteration is None:
         context['isIceBox'] = True
     return render(request, 'SideBarIters.html', context)
+
+
+@user_can_access_project()
+def iteration_analytics(request, projectID, iterationID):
+    # Burndown, velocity and cycle time of the iteration as JSON.
+    iteration = get_object_or_404(Iteration, id=iterationID, project_id=projectID)
+    return JsonResponse(analytics.get_iteration_analytics([iteration])[iteration.id])
+
+
+@user_can_access_project()
+def velocity(request, projectID):
+    # Committed and completed points of every iteration of the project as JSON.
+    project = get_object_or_404(Project, id=projectID)
+    return JsonResponse(analytics.get_velocity(project))
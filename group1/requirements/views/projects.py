@@ -5,13 +5,11 @@ from requirements.models import files as mdl_attachment
 from requirements.models import user_manager, user_association
 from requirements.models import story as mdl_story
 from requirements.models.story import Story
-from requirements.models import task as mdl_task
-from requirements.models import story_comment as mdl_story_comment
-from requirements.models import story_attachment as mdl_story_attachment
 from requirements.models import iteration as mdl_iteration
 from issue_tracker import models as mdl_issue
 from requirements.models.user_association import UserAssociation
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.http import Http404, JsonResponse
 from forms import IterationForm
 from forms import ProjectForm
 from forms import SelectAccessLevelForm
@@ -24,12 +22,18 @@ from django.shortcuts import render, render_to_response, redirect
 import datetime
 from requirements.models.user_manager import user_owns_project
 from requirements.models.user_manager import user_can_access_project
+from requirements.models.user_manager import get_permission_context
 from requirements.models.files import ProjectFile
 from django.utils.encoding import smart_str
+import os
 import uuid
+from wsgiref.util import FileWrapper
+from requirements.models import dashboard
 from requirements.models import filemaker
-from django.shortcuts import render, redirect
-from reportlab.platypus import SimpleDocTemplate
+from requirements.models import report_cache
+from requirements.models import report_queue
+from requirements.models.report_job import ReportJob
+from django.shortcuts import render, redirect, get_object_or_404
 from forms import TaskFormSet
 from forms import PDFForm
 
@@ -40,11 +44,15 @@ PERMISSION_OWN_PROJECT = 'requirements.own_project'
 def list_projects(request):
     # Loads the DashBoard template, which contains a list of the project the user is  associated with, and an option to
     # create new projects if one has that permission.
+    memberships = user_manager.get_memberships(request.user.id)
+    summaries = dashboard.get_project_summaries(request.user.id)
     context = {
         'canOwnProject': request.user.has_perm(PERMISSION_OWN_PROJECT),
-        'projects': project_api.get_projects_for_user(request.user.id),
+        'projects': [association.project for association in memberships],
         'theUser': request.user,
-        'associationsWithUser': project_api.get_associations_for_user(request.user.id)
+        # (association, ProjectSummary) for each project of the user.
+        'projectRows': [(association, summaries.get(association.project_id) or dashboard.ProjectSummary())
+                        for association in memberships],
     }
     # list = (str(project_api.get_projects_for_user(request.user.id))).replace(
     #     "<Project: ",
@@ -67,24 +75,22 @@ def list_projects(request):
 
 
 @login_required(login_url='/signin')
+@user_can_access_project()
 def project(request, projectID):
     p = project_api.get_project(projectID)
     if p is None:
         return redirect('/requirements/projects')
 
     iterations = mdl_iteration.get_iterations_for_project(p)
-    association = UserAssociation.objects.get(user=request.user, project=p)
+    association = get_permission_context(request, projectID).association
     priorities = Story.PRIORITY_CHOICES
 
     context = {
-        'projects': project_api.get_projects_for_user(request.user.id),
+        'projects': user_manager.get_user_projects(request.user.id),
         'project': p,
-        'stories': mdl_story.get_stories_for_project(p),
-        'tasks': mdl_task.get_all_tasks(),
-        'comments': mdl_story_comment.get_all_comments(),
+        'stories': mdl_story.get_stories_with_details_for_project(p),
         'priorities': priorities,
-        'attachments': mdl_story_attachment.get_all_attachments(),
-        'issues': mdl_issue.get_all_issues(),
+        'issues': mdl_issue.get_issues_for_project(p),
         'iterations': iterations,
         'association': association,
         'canOwnProject': request.user.has_perm(PERMISSION_OWN_PROJECT),
@@ -112,7 +118,7 @@ def new_project(request):
         form = ProjectForm()
 
     context = {
-        'projects': project_api.get_projects_for_user(request.user.id),
+        'projects': user_manager.get_user_projects(request.user.id),
         'canOwnProject': request.user.has_perm(PERMISSION_OWN_PROJECT),
         'title': 'New Project',
         'form': form, 'action': '/requirements/newproject', 'button_desc': 'Create Project'
@@ -134,7 +140,7 @@ def edit_project(request, projectID):
         form = ProjectForm(instance=p)
 
     context = {
-        'projects': project_api.get_projects_for_user(request.user.id),
+        'projects': user_manager.get_user_projects(request.user.id),
         'canOwnProject': request.user.has_perm(PERMISSION_OWN_PROJECT),
         'title': 'Edit Project',
         'form': form, 'action': '/requirements/editproject/' + projectID, 'button_desc': 'Save Changes'
@@ -157,7 +163,7 @@ def delete_project(request, projectID):
         form = ProjectForm(instance=p)
 
     context = {
-        'projects': project_api.get_projects_for_user(request.user.id),
+        'projects': user_manager.get_user_projects(request.user.id),
         'canOwnProject': request.user.has_perm(PERMISSION_OWN_PROJECT),
         'title': 'Delete Project',
         'confirm_message': 'This is an unrevert procedure ! You will lose all information about this project !',
@@ -168,11 +174,12 @@ def delete_project(request, projectID):
 
 
 @login_required(login_url='/signin')
+@user_can_access_project()
 def list_users_in_project(request, projectID):
     p = project_api.get_project(projectID)
     if p is None:
         return redirect('/requirements/projects')
-    association = UserAssociation.objects.get(user=request.user, project=p)
+    association = get_permission_context(request, projectID).association
     users = p.users.all()
     pmusers = User.objects.filter(project__id=p.id, userassociation__role=user_association.ROLE_OWNER)
     devusers = User.objects.filter(project__id=p.id, userassociation__role=user_association.ROLE_DEVELOPER)
@@ -309,6 +316,7 @@ def upload_attachment(request, projectID):
 
 
 @login_required(login_url='/signin')
+@user_can_access_project()
 def issues(request, projectID):
     # Loads the IssueList template, which contains a list of the issues the user is associated with, within a project
     p = project_api.get_project(projectID)
@@ -316,16 +324,12 @@ def issues(request, projectID):
         return redirect('/requirements/projects')
 
     iterations = mdl_iteration.get_iterations_for_project(p)
-    association = UserAssociation.objects.get(user=request.user, project=p)
+    association = get_permission_context(request, projectID).association
 
     context = {
-        'projects': project_api.get_projects_for_user(request.user.id),
+        'projects': user_manager.get_user_projects(request.user.id),
         'project': p,
-        'stories': mdl_story.get_stories_for_project(p),
-        'tasks': mdl_task.get_all_tasks(),
-        'comments': mdl_story_comment.get_all_comments(),
-        'attachments': mdl_story_attachment.get_all_attachments(),
-        'issues': mdl_issue.get_all_issues(),
+        'issues': mdl_issue.get_issues_for_project(p),
         'iterations': iterations,
         'association': association,
         'canOwnProject': request.user.has_perm(PERMISSION_OWN_PROJECT),
@@ -364,31 +368,30 @@ def makefile(request, projectID):
     return response
 
 
+def _report_job_json(projectID, job):
+    return JsonResponse({
+        'job': job.id,
+        'status': job.status,
+        'error': job.error,
+        'status_url': '/requirements/reportstatus/%s/%d' % (projectID, job.id),
+        'download_url': '/requirements/downloadreport/%s/%d' % (projectID, job.id),
+    })
+
+
 @user_can_access_project()
 def makepdf(request, projectID):
-    args = {}
-
     if request.method == 'POST':
         form = PDFForm(request.POST)
 
-        args['iteration_description'] = 'iteration_description' in request.POST
-        args['iteration_duration'] = 'iteration_duration' in request.POST
-        args['story_description'] = 'story_description' in request.POST
-        args['story_reason'] = 'story_reason' in request.POST
-        args['story_test'] = 'story_test' in request.POST
-        args['story_task'] = 'story_task' in request.POST
-        args['story_owner'] = 'story_owner' in request.POST
-        args['story_hours'] = 'story_hours' in request.POST
-        args['story_status'] = 'story_status' in request.POST
-        args['story_points'] = 'story_points' in request.POST
-        args['pie_chart'] = 'pie_chart' in request.POST
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename=pdf_report.pdf'
-        tempcanvas = SimpleDocTemplate(response)
-
-        filemaker.process_pdf(tempcanvas, projectID, args)
-        return response
+        args = {}
+        for option in filemaker.REPORT_OPTIONS:
+            args[option] = option in request.POST
+
+        # Rendering takes a while for big projects, so it happens in the
+        # background; the dialog polls reportstatus and then downloads.
+        project = project_api.get_project(projectID)
+        job = report_queue.request_report(project, args, request.user)
+        return _report_job_json(projectID, job)
     else:
         form = PDFForm()
     context = {
@@ -399,3 +402,22 @@ def makepdf(request, projectID):
     }
 
     return render(request, 'PDFDialog.html', context)
+
+
+@user_can_access_project()
+def report_status(request, projectID, jobID):
+    job = get_object_or_404(ReportJob, id=jobID, project_id=projectID)
+    return _report_job_json(projectID, job)
+
+
+@user_can_access_project()
+def download_report(request, projectID, jobID):
+    job = get_object_or_404(ReportJob, id=jobID, project_id=projectID, status=ReportJob.STATUS_DONE)
+    path = report_cache.get(job.cache_key)
+    if path is None:
+        raise Http404('The report is no longer available.')
+    report = open(path, 'rb')
+    response = StreamingHttpResponse(FileWrapper(report), content_type='application/pdf')
+    response['Content-Disposition'] = 'attachment; filename=pdf_report.pdf'
+    response['Content-Length'] = os.fstat(report.fileno()).st_size
+    return response
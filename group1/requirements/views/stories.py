@@ -5,6 +5,7 @@ from requirements.models.story import Story
 from requirements.models.user_association import UserAssociation
 from requirements.models import project_api
 from requirements.models import iteration as mdl_iteration
+from requirements.models import iteration_stats
 from requirements.models import story as mdl_story
 from requirements.models import task as mdl_task
 from requirements.models import story_comment as mdl_comment
@@ -12,12 +13,13 @@ from requirements.models import story_attachment as mdl_attachment
 from requirements.models.story_attachment import StoryAttachment
 from forms import StoryForm, TaskFormSet
 from forms import TaskForm, CommentForm, AttachmentForm
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth import authenticate, login, logout
 from django.template import RequestContext
 from django.shortcuts import render, redirect
 from requirements.models.user_manager import user_has_role, user_owns_project
+from requirements.models.user_manager import get_permission_context
 from requirements.models import user_association
 import datetime
 
@@ -29,9 +31,7 @@ PERMISSION_OWN_PROJECT = 'requirements.own_project'
 def new_story(request, projectID):
     story = Story()
     project = project_api.get_project(projectID)
-    association = UserAssociation.objects.get(
-        user=request.user,
-        project=project)
+    association = get_permission_context(request, projectID).association
     if request.method == 'POST':
         form = StoryForm(request.POST, project=project)
 
@@ -72,9 +72,7 @@ def new_story(request, projectID):
 @user_has_role(user_association.PERM_EDIT_STORY)
 def edit_story(request, projectID, storyID):
     project = project_api.get_project(projectID)
-    association = UserAssociation.objects.get(
-        user=request.user,
-        project=project)
+    association = get_permission_context(request, projectID).association
     story = mdl_story.get_story(storyID)
     if story is None:
         # return empty string and do the redirect stuff in front-end
@@ -124,9 +122,7 @@ def edit_story(request, projectID, storyID):
 @user_has_role(user_association.PERM_DELETE_STORY)
 def delete_story(request, projectID, storyID):
     project = project_api.get_project(projectID)
-    association = UserAssociation.objects.get(
-        user=request.user,
-        project=project)
+    association = get_permission_context(request, projectID).association
     story = models.story.get_story(storyID)
     if story is None:
         # return empty string and do the redirect stuff in front-end
@@ -176,14 +172,73 @@ def move_story_to_backlog(request, projectID, storyID):
     return redirect('/requirements/projectdetail/' + projectID)
 
 
+# The targets of move_stories and the belong value stories get there.
+MOVE_TARGETS = {
+    'iteration': Story.STORY_BELONGS_ITERATION,
+    'backlog': Story.STORY_BELONGS_BACKLOG,
+    'icebox': Story.STORY_BELONGS_ICEBOX,
+}
+
+
+def _stats_json(stats):
+    return {
+        'iteration': stats.iteration_id,
+        'bucket': stats.bucket,
+        'stories': stats.story_count,
+        'points': stats.points,
+        'hours': stats.hours,
+    }
+
+
+@login_required(login_url='/signin')
+@user_owns_project()
+def move_stories(request, projectID):
+    # Moves the POSTed stories to target (iteration, backlog or icebox) at once
+    # and returns what moved from where, and the new totals of every list that
+    # changed, as JSON.
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST the stories to move.'}, status=405)
+    project = project_api.get_project(projectID)
+    target = request.POST.get('target', '')
+    if target not in MOVE_TARGETS:
+        return JsonResponse({'error': 'Unknown target.'}, status=400)
+    try:
+        storyIDs = [int(storyID) for storyID in request.POST.getlist('stories')]
+    except ValueError:
+        return JsonResponse({'error': 'Invalid story id.'}, status=400)
+    if not storyIDs:
+        return JsonResponse({'error': 'No stories to move.'}, status=400)
+    iteration = None
+    if target == 'iteration':
+        iteration = mdl_iteration.get_iteration(request.POST.get('iteration'))
+        if iteration is None:
+            return JsonResponse({'error': 'Unknown iteration.'}, status=400)
+    belong = MOVE_TARGETS[target]
+    try:
+        previous = project_api.move_stories(project, storyIDs, belong, iteration)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    iterationID = iteration.id if iteration is not None else None
+    buckets = set(iteration_stats.get_bucket(project.id, old_iteration, old_belong)
+                  for old_iteration, old_belong in previous.values())
+    buckets.add(iteration_stats.get_bucket(project.id, iterationID, belong))
+    return JsonResponse({
+        'target': {'iteration': iterationID, 'belong': belong},
+        'moved': [{'story': storyID, 'from_iteration': old_iteration, 'from_belong': old_belong}
+                  for storyID, (old_iteration, old_belong) in sorted(previous.items())],
+        'stats': [_stats_json(stats) for stats in iteration_stats.get_stats_for_buckets(sorted(buckets))],
+    })
+
+
 @login_required(login_url='/signin')
 def list_tasks(request, storyID):
     story = mdl_story.get_story(storyID)
     project = story.project
-    association = UserAssociation.objects.get(
-        user=request.user,
-        project=project
-    )
+    association = get_permission_context(request, project.id).association
+    if association is None:
+        return HttpResponse(
+            'You do not have permision to perform this function', status=401)
     tasks = mdl_task.get_tasks_for_story(story)
     form = TaskForm()
     context = {
@@ -200,10 +255,10 @@ def list_tasks(request, storyID):
 def add_task_into_list(request, storyID):
     story = mdl_story.get_story(storyID)
     project = story.project
-    association = UserAssociation.objects.get(
-        user=request.user,
-        project=project
-    )
+    association = get_permission_context(request, project.id).association
+    if association is None:
+        return HttpResponse(
+            'You do not have permision to perform this function', status=401)
     if request.method == 'POST':
         form = TaskForm(request.POST)
         if form.is_valid():
@@ -226,10 +281,10 @@ def edit_task_in_list(request, storyID, taskID):
     story = mdl_story.get_story(storyID)
     task = mdl_task.get_task(taskID)
     project = story.project
-    association = UserAssociation.objects.get(
-        user=request.user,
-        project=project
-    )
+    association = get_permission_context(request, project.id).association
+    if association is None:
+        return HttpResponse(
+            'You do not have permision to perform this function', status=401)
     if request.method == 'POST':
         form = TaskForm(request.POST, instance=task)
         if form.is_valid():
@@ -255,9 +310,10 @@ def remove_task_from_list(request, storyID, taskID):
     story = mdl_story.get_story(storyID)
     task = mdl_task.get_task(taskID)
     project = story.project
-    association = UserAssociation.objects.get(
-        user=request.user,
-        project=project)
+    association = get_permission_context(request, project.id).association
+    if association is None:
+        return HttpResponse(
+            'You do not have permision to perform this function', status=401)
     if request.method == 'POST':
         task.delete()
     tasks = mdl_task.get_tasks_for_story(story)
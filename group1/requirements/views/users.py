@@ -1,6 +1,4 @@
 from django import forms
-from django.utils import timezone
-import datetime
 import requirements.models.user_manager
 from requirements.models import user_manager
 from django.http import HttpResponse, HttpResponseRedirect
@@ -9,7 +7,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.template import RequestContext
 from django.shortcuts import render, render_to_response, redirect
-from requirements.models.ip import IPaddress
+from requirements import ratelimit
 
 
 def signin(request):
@@ -25,58 +23,40 @@ def signin(request):
         password = request.POST['password']
         next = request.POST['next']
 
-        # get IP address
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip1 = x_forwarded_for.split(',')[-1].strip()
-        else:
-            ip1 = request.META.get("REMOTE_ADDR")
-
-        # get latest time
-        now = timezone.now()
-        t = now - datetime.timedelta(seconds=60)
-        wrong_times = IPaddress.objects.filter(ip=ip1).count()
-        latest_time = IPaddress.objects.filter(last_time__gte=t)
-
-        # if input wrong pwd more than 3 times, the ip will be blocked for 60s
-        if wrong_times >= 3 and latest_time:
-            print latest_time
-            errormsg = 'you have tried many times, please signin after 60s later.'
+        ip = ratelimit.get_client_ip(request)
+        limiter = ratelimit.LoginRateLimiter()
+
+        # after too many wrong passwords the IP is blocked for a while, and
+        # the username only gets a try every few seconds, so that nobody can
+        # lock its owner out; see requirements.ratelimit
+        if limiter.is_blocked(ip):
+            errormsg = 'you have tried many times, please signin after %ds later.' % limiter.window
+        elif limiter.is_slowed(username) and not limiter.take_turn(username):
+            errormsg = 'this username was tried many times, please signin after %ds.' % limiter.interval
         else:
-            # if input wrong but, this time is 60s after last time, first clear the record of this IP
-            if not latest_time:
-                IPaddress.objects.filter(ip=ip1).all().delete()
-                wrong_times = 0
-                print IPaddress.objects.all()
             user = authenticate(username=username, password=password)
             # check whether user name and pwd is correct
             if user is not None:
                 if user.is_active:
                     login(request, user)
-                    IPaddress.objects.all().filter(ip=ip1).delete()
-                    print IPaddress.objects.all()
+                    limiter.record_success(ip, username)
                     if next == '':
                         return HttpResponseRedirect('/requirements/projects')
                     else:
                         return HttpResponseRedirect(next)
             else:
-                x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-                if x_forwarded_for:
-                    ip1 = x_forwarded_for.split(',')[-1].strip()
-                else:
-                    ip1 = request.META.get("REMOTE_ADDR")
-
-                # IP address : '+str(ip1)+ "
-                if wrong_times == 2:
+                remaining = limiter.record_failure(ip, username)
+                errormsg0 = 'Username or Password is incorrect ! Please try again !'
+                if limiter.is_blocked(ip):
                     errormsg0 = ''
-                    errormsg1 = 'you have tried many times, please signin after 60s later.'
+                    errormsg1 = 'you have tried many times, please signin after %ds later.' % limiter.window
+                elif remaining == 0:
+                    errormsg1 = ' This username was tried many times, you need to wait %ds for next try!' % (
+                        limiter.interval)
                 else:
-                    errormsg0 = 'Username or Password is incorrect ! Please try again !'
                     errormsg1 = ' If you fail more than ' + str(
-                        2 - wrong_times) + ' times, you need to wait 60s for next try!'
+                        remaining) + ' times, you need to wait %ds for next try!' % limiter.window
                 errormsg = errormsg0 + errormsg1
-                ipform = IPaddress(ip=ip1, last_time=now)
-                ipform.save(force_insert=True)
 
     return render_to_response(
         'SignIn.html',